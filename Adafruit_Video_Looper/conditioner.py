@@ -0,0 +1,267 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import cPickle as pickle
+import distutils.spawn
+import os
+import subprocess
+import threading
+
+from media_index import probe_header
+from process import ProcessSupervisor
+
+
+# Bump when the output naming or the ffmpeg arguments change, so outputs of an
+# older version are not reused.
+CONDITIONER_VERSION = 1
+
+# Name of the file with the content hashes and the failed conversions, in the
+# output directory.
+HASH_INDEX = 'hashes.index'
+
+
+def _low_priority(args):
+    """Prefix a command so it runs at the lowest CPU and idle I/O priority."""
+    prefix = []
+    if distutils.spawn.find_executable('nice'):
+        prefix.extend(['nice', '-n', '19'])
+    if distutils.spawn.find_executable('ionice'):
+        prefix.extend(['ionice', '-c', '3'])
+    return prefix + args
+
+
+class ContentConditioner(object):
+    """Converts the movies of the playlist in the background into the form
+    that plays best, and plays the converted copy instead once it is ready:
+
+    - Silent H264 movies are remuxed (no re-encoding) into raw H264 streams,
+      which hello_video loops seamlessly when it is one of the video players.
+    - With transcoding enabled, movies in another codec or larger than the
+      display are re-encoded to H264 at the display size.
+
+    Outputs are named after the SHA1 of the source content, so renamed or
+    copied files reuse them.  ffmpeg and the hashing run at the lowest CPU
+    and I/O priority.  Outputs are written to a .part file and renamed when
+    complete, so after a power loss the work simply starts again with the
+    movies that are not done yet.  A conversion that fails is not tried
+    again until the content of the movie changes.
+    """
+
+    def __init__(self, output_path, describe=None, remux_to_h264=True,
+                 transcode=False, max_size=None, bitrate='4M',
+                 encoder='libx264', report=None):
+        """Output_path is the directory of the converted movies (keep it
+        outside the content directory).  Describe is a function returning the
+        MediaInfo of a movie or None, the header parser is used otherwise.
+        Max_size is the (width, height) to transcode to, like the display.
+        Report is a function called with a message when a conversion fails,
+        from the background thread.
+        """
+        self._output_path = output_path
+        self._describe = describe
+        self._remux_to_h264 = remux_to_h264
+        self._transcode = transcode
+        self._max_size = max_size
+        self._bitrate = bitrate
+        self._encoder = encoder
+        self._report = report
+        self._ffmpeg = distutils.spawn.find_executable('ffmpeg')
+        self._supervisor = ProcessSupervisor()
+        self._process = None
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending = []
+        self._running = True
+        self._thread = None
+        # Path -> ((size, mtime), sha1) of the sources, and path -> output.
+        self._hashes = {}
+        self._ready = {}
+        # (sha1, profile) of the conversions ffmpeg failed.
+        self._failed = set()
+        self._prepare_output()
+
+    def available(self):
+        """Return true if ffmpeg is installed."""
+        return self._ffmpeg is not None
+
+    def _prepare_output(self):
+        try:
+            if not os.path.isdir(self._output_path):
+                os.makedirs(self._output_path)
+            # Leftovers of conversions interrupted by a power loss.
+            for name in os.listdir(self._output_path):
+                if name.endswith('.part'):
+                    os.remove(os.path.join(self._output_path, name))
+            with open(os.path.join(self._output_path, HASH_INDEX), 'rb') as infile:
+                version, hashes, failed = pickle.load(infile)
+            if version == CONDITIONER_VERSION:
+                self._hashes = hashes
+                self._failed = failed
+        except Exception:
+            pass
+
+    def _save_hashes(self):
+        path = os.path.join(self._output_path, HASH_INDEX)
+        with self._lock:
+            hashes = dict(self._hashes)
+            failed = set(self._failed)
+        try:
+            with open(path + '.part', 'wb') as outfile:
+                pickle.dump((CONDITIONER_VERSION, hashes, failed), outfile,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(path + '.part', path)
+        except (IOError, OSError):
+            pass
+
+    def _key(self, path):
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime)
+
+    def resolve(self, path):
+        """Return the path of the converted copy of a movie if it is ready and
+        the source did not change since, the movie path otherwise.
+        """
+        with self._lock:
+            ready = self._ready.get(path)
+        if ready is None:
+            return path
+        try:
+            if self._key(path) != ready[0]:
+                return path
+        except OSError:
+            return path
+        return ready[1]
+
+    def request(self, paths):
+        """Queue the movies to convert, in the background."""
+        if not self.available():
+            return
+        unique = []
+        for path in paths:
+            if path not in unique:
+                unique.append(path)
+        with self._cond:
+            self._pending = unique
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name='conditioner')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = []
+            self._cond.notify()
+        process = self._process
+        if process is not None:
+            self._supervisor.stop(process, 1)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                path = self._pending.pop(0)
+            try:
+                self._condition(path)
+            except (IOError, OSError):
+                pass  # Removed or unreadable, tried again on the next request.
+
+    def _hash(self, path, key):
+        """Return the SHA1 of the content of path, cached by size and mtime."""
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        output = self._run_output(_low_priority(['sha1sum', '-b', path]))
+        if output is None:
+            return None
+        digest = output.split()[0]
+        with self._lock:
+            self._hashes[path] = (key, digest)
+        self._save_hashes()
+        return digest
+
+    def _plan(self, path):
+        """Return (profile, extension, ffmpeg output arguments) of the
+        conversion a movie needs, or None if it plays best as it is.
+        """
+        info = self._describe(path) if self._describe is not None else None
+        if info is None:
+            info = probe_header(path)
+        if info is None or info.kind == 'h264':
+            return None
+        too_big = self._max_size is not None and info.width is not None \
+            and (info.width > self._max_size[0] or info.height > self._max_size[1])
+        if self._transcode and (info.codec != 'h264' or too_big):
+            width, height = self._max_size or (-2, -2)
+            return ('fit{0}x{1}'.format(width, height), '.mp4',
+                    ['-map', '0:v:0', '-map', '0:a?',
+                     '-vf', 'scale={0}:{1}:force_original_aspect_ratio=decrease'.format(width, height),
+                     '-c:v', self._encoder, '-b:v', self._bitrate, '-c:a', 'copy',
+                     '-movflags', '+faststart', '-f', 'mp4'])
+        if self._remux_to_h264 and info.codec == 'h264' and info.has_audio is False:
+            return ('raw', '.h264',
+                    ['-map', '0:v:0', '-c:v', 'copy', '-bsf:v', 'h264_mp4toannexb',
+                     '-f', 'h264'])
+        return None
+
+    def _condition(self, path):
+        key = self._key(path)
+        plan = self._plan(path)
+        if plan is None:
+            return
+        profile, extension, output_args = plan
+        digest = self._hash(path, key)
+        if digest is None:
+            return
+        with self._lock:
+            if (digest, profile) in self._failed:
+                return
+        output = os.path.join(self._output_path, '{0}.v{1}.{2}{3}'.format(
+            digest, CONDITIONER_VERSION, profile, extension))
+        if not os.path.exists(output):
+            part = output + '.part'
+            args = _low_priority([self._ffmpeg, '-y', '-v', 'error', '-i', path] +
+                                 output_args + [part])
+            returncode = self._run(args)
+            if returncode != 0:
+                if os.path.exists(part):
+                    os.remove(part)
+                # Killed by stop() is not a failure of the movie.
+                if returncode > 0:
+                    self._failed_conversion(path, digest, profile, returncode)
+                return
+            os.rename(part, output)
+        with self._lock:
+            self._ready[path] = (key, output)
+
+    def _failed_conversion(self, path, digest, profile, returncode):
+        """Remember a failed conversion so it is not tried again."""
+        with self._lock:
+            self._failed.add((digest, profile))
+        self._save_hashes()
+        if self._report is not None:
+            self._report('Could not convert {0} ({1}, ffmpeg exit code {2}), '
+                         'playing it as it is'.format(path, profile, returncode))
+
+    def _run(self, args):
+        """Run a command under the supervisor, returns its exit code."""
+        with self._lock:
+            if not self._running:
+                return None
+            self._process = self._supervisor.spawn(args)
+        self._supervisor.wait(self._process, None)
+        returncode = self._process.returncode
+        self._process = None
+        return returncode
+
+    def _run_output(self, args):
+        """Run a command and return its output, None if it failed."""
+        try:
+            return subprocess.check_output(args, stderr=open(os.devnull, 'wb'))
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,234 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import cPickle as pickle
+import hashlib
+import os
+import stat
+import time
+
+
+# Bump when the record layout changes so stale indexes are ignored.
+INDEX_VERSION = 1
+
+# A directory modified less than this many seconds before it was listed may
+# change again without its mtime changing (FAT keeps mtimes in 2 second
+# steps), it is listed again on the next scan.
+_RACY_SECONDS = 2.0
+
+# Bytes read at the start and at the end of a file for its fast hash.
+_HASH_CHUNK = 64 * 1024
+
+
+def fast_hash(path, size):
+    """Return a SHA1 of the size, the start and the end of a file.  Cheap even
+    for large movies and good enough to recognize a file that was renamed or
+    copied again.
+    """
+    digest = hashlib.sha1(str(size))
+    with open(path, 'rb') as infile:
+        digest.update(infile.read(_HASH_CHUNK))
+        if size > 2 * _HASH_CHUNK:
+            infile.seek(size - _HASH_CHUNK)
+        digest.update(infile.read(_HASH_CHUNK))
+    return digest.hexdigest()
+
+
+class FileRecord(object):
+    """Indexed file: size, mtime, inode and the fast hash (None if hashing is
+    disabled).
+    """
+
+    __slots__ = ('size', 'mtime', 'inode', 'hash')
+
+    def __init__(self, size, mtime, inode, hash=None):
+        self.size = size
+        self.mtime = mtime
+        self.inode = inode
+        self.hash = hash
+
+    def __repr__(self):
+        return 'FileRecord({0}, {1}, {2}, {3!r})'.format(
+            self.size, self.mtime, self.inode, self.hash)
+
+
+class ContentIndex(object):
+    """Persistent index of the files of the content directory and, if
+    recursive, of its subdirectories.
+
+    A directory's mtime changes when files are added, removed or renamed in
+    it, so a rescan stats each directory and lists only the ones whose mtime
+    or inode changed; the files of the other directories are not touched.
+    The index is saved after each scan that found changes, so a start reads
+    it instead of walking slow USB or SD media.  Files modified in place
+    keep their record until their directory changes or scan(full=True).
+    Generation is bumped by every change, to key caches derived from the
+    content.
+    """
+
+    def __init__(self, root, index_path=None, recursive=True, hash_files=False):
+        """Root is the content directory.  Index_path is the file the index
+        is saved to (None keeps it in memory only).  Hash_files computes the
+        fast hash of every file.
+        """
+        self._root = root
+        self._index_path = index_path
+        self._recursive = recursive
+        self._hash_files = hash_files
+        # Relative directory path -> ((mtime, inode) or None if it must be
+        # listed again, file names, subdirectory names).
+        self._dirs = {}
+        # Relative file path -> FileRecord.
+        self._files = {}
+        # Starts from the clock, so a new index never repeats the generations
+        # of a deleted one.
+        self.generation = int(time.time() * 1000)
+        self._read()
+
+    def _read(self):
+        if self._index_path is None:
+            return
+        try:
+            with open(self._index_path, 'rb') as index_file:
+                version, settings, generation, dirs, rows = pickle.load(index_file)
+        except Exception:
+            # Missing, truncated or incompatible index, scan again.
+            return
+        if version != INDEX_VERSION or settings != self._settings():
+            return
+        self.generation = generation
+        self._dirs = dirs
+        self._files = dict((path, FileRecord(*fields)) for path, fields in rows)
+
+    def _settings(self):
+        return (self._root, self._recursive, self._hash_files)
+
+    def _write(self):
+        if self._index_path is None:
+            return
+        rows = [(path, tuple(getattr(record, name) for name in FileRecord.__slots__))
+                for path, record in self._files.iteritems()]
+        temp_path = self._index_path + '.tmp'
+        try:
+            index_dir = os.path.dirname(self._index_path)
+            if index_dir and not os.path.isdir(index_dir):
+                os.makedirs(index_dir)
+            with open(temp_path, 'wb') as index_file:
+                pickle.dump((INDEX_VERSION, self._settings(), self.generation,
+                             self._dirs, rows), index_file, pickle.HIGHEST_PROTOCOL)
+            # Atomic replace so a power cut never leaves a half written index.
+            os.rename(temp_path, self._index_path)
+        except (IOError, OSError):
+            pass
+
+    def _full_path(self, rel):
+        return os.path.join(self._root, rel) if rel else self._root
+
+    def scan(self, full=False):
+        """Bring the index up to date, listing only the directories that
+        changed (and checking every file if full).  Returns true if anything
+        changed.
+        """
+        now = time.time()
+        changed = False
+        seen = set()
+        visited = set()
+        stack = ['']
+        while stack:
+            rel = stack.pop()
+            try:
+                st = os.stat(self._full_path(rel))
+            except OSError:
+                continue
+            if not stat.S_ISDIR(st.st_mode) or (st.st_dev, st.st_ino) in visited:
+                continue  # Not a directory or a link back to a listed one.
+            visited.add((st.st_dev, st.st_ino))
+            seen.add(rel)
+            record = self._dirs.get(rel)
+            key = (st.st_mtime, st.st_ino)
+            if record is None or record[0] != key or full:
+                if self._list(rel, record):
+                    changed = True
+                if now - st.st_mtime < _RACY_SECONDS:
+                    key = None
+                record = self._dirs[rel] = (key,) + self._dirs[rel][1:]
+            if self._recursive:
+                stack.extend(os.path.join(rel, name) for name in record[2])
+        for rel in [x for x in self._dirs if x not in seen]:
+            for name in self._dirs.pop(rel)[1]:
+                self._files.pop(os.path.join(rel, name), None)
+            changed = True
+        if changed:
+            self.generation += 1
+        if changed or full:
+            self._write()
+        return changed
+
+    def _list(self, rel, record):
+        """List a directory into the index, returns true if its files or
+        subdirectories changed.
+        """
+        path = self._full_path(rel)
+        try:
+            listing = sorted(os.listdir(path))
+        except OSError:
+            listing = []
+        names = []
+        subdirs = []
+        changed = False
+        for name in listing:
+            file_rel = os.path.join(rel, name)
+            try:
+                st = os.stat(os.path.join(path, name))
+            except OSError:
+                continue  # Removed meanwhile or a dangling link.
+            if stat.S_ISDIR(st.st_mode):
+                subdirs.append(name)
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            names.append(name)
+            old = self._files.get(file_rel)
+            if old is not None and (old.size, old.mtime, old.inode) == \
+                    (st.st_size, st.st_mtime, st.st_ino) and \
+                    (old.hash is not None or not self._hash_files):
+                continue
+            digest = None
+            if self._hash_files:
+                try:
+                    digest = fast_hash(os.path.join(path, name), st.st_size)
+                except IOError:
+                    pass
+            self._files[file_rel] = FileRecord(st.st_size, st.st_mtime, st.st_ino, digest)
+            changed = True
+        old_names = set() if record is None else set(record[1])
+        for name in old_names - set(names):
+            del self._files[os.path.join(rel, name)]
+        if record is None or set(names) != old_names or subdirs != record[2]:
+            changed = True
+        self._dirs[rel] = (None, names, subdirs)
+        return changed
+
+    def contains(self, name):
+        """Return true if the file name, relative to root, exists.  Files in
+        subdirectories are checked on disk if the index is not recursive.
+        """
+        name = os.path.normpath(name)
+        if not self._recursive and os.sep in name:
+            return os.path.isfile(os.path.join(self._root, name))
+        return name in self._files
+
+    def get(self, name):
+        """Return the FileRecord of the file name relative to root, or None."""
+        return self._files.get(os.path.normpath(name))
+
+    def files(self):
+        """Return the relative paths of all indexed files, sorted."""
+        return sorted(self._files)
+
+    def directories(self):
+        """Return the relative paths of the indexed directories ('' is root)."""
+        return sorted(self._dirs)
+
+    def __len__(self):
+        return len(self._files)
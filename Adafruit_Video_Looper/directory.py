@@ -1,6 +1,33 @@
 # Copyright 2015 Adafruit Industries.
 # Author: Tony DiCola
 # License: GNU GPLv2, see LICENSE.txt
+import os
+import time
+
+from inotify import Inotify, IN_ATTRIB, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, \
+                    IN_DELETE_SELF, IN_IGNORED, IN_ISDIR, IN_MODIFY, \
+                    IN_MOVE_SELF, IN_MOVED_FROM, IN_MOVED_TO, IN_ONLYDIR, \
+                    IN_Q_OVERFLOW
+
+
+# Directory events that change the playlist or its content.  IN_MODIFY keeps
+# the settle window open while a file is being written.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MODIFY | IN_CREATE | IN_DELETE | \
+             IN_MOVED_FROM | IN_MOVED_TO | IN_ATTRIB | IN_DELETE_SELF | \
+             IN_MOVE_SELF | IN_ONLYDIR
+
+# Events of playlist.ini itself, watched too in case it links out of path.
+PLAYLIST_WATCH_MASK = IN_CLOSE_WRITE | IN_MODIFY | IN_ATTRIB | \
+                      IN_DELETE_SELF | IN_MOVE_SELF
+
+# Events after which the watches must be added again: a watched file or the
+# directory was replaced, or events were lost.
+_REWATCH_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED | IN_Q_OVERFLOW
+
+# Events of a new subdirectory, which must be watched too when recursive.
+_NEW_DIR_MASK = IN_CREATE | IN_MOVED_TO
+
+
 class DirectoryReader(object):
 
     def __init__(self, config):
@@ -8,22 +35,127 @@ class DirectoryReader(object):
         directory on disk.
         """
         self._load_config(config)
+        self._playlist_path = os.path.join(self._path, 'playlist.ini')
+        self._last_check = time.time()
+        self._signature = self._read_signature()
+        # Time of the last event of a burst not reported yet, None if none.
+        self._event_at = None
+        # Watch the directory with inotify where possible, otherwise fall back
+        # to polling the stat signature.
+        try:
+            self._inotify = Inotify()
+        except OSError:
+            self._inotify = None
+        self._watching = self._add_watches()
 
     def _load_config(self, config):
         self._path = config.get('directory', 'path')
+        self._check_interval = config.getfloat('directory', 'change_check_interval')
+        self._settle_time = config.getfloat('directory', 'settle_time')
+        self._recursive = config.getboolean('directory', 'recursive')
+
+    def _add_watches(self):
+        """Watch the directory (and its subdirectories if recursive) and
+        playlist.ini, returns false if the directory can't be watched (inotify
+        unavailable or no directory).  Adding the watch of an already watched
+        path only updates it.
+        """
+        if self._inotify is None:
+            return False
+        try:
+            self._inotify.add_watch(self._path, WATCH_MASK)
+        except OSError:
+            return False
+        if self._recursive:
+            for dirpath, dirnames, _ in os.walk(self._path):
+                for name in dirnames:
+                    try:
+                        self._inotify.add_watch(os.path.join(dirpath, name), WATCH_MASK)
+                    except OSError:
+                        pass  # Removed meanwhile, or out of watches.
+        try:
+            self._inotify.add_watch(self._playlist_path, PLAYLIST_WATCH_MASK)
+        except OSError:
+            pass  # No playlist.ini, its creation shows up in the directory.
+        return True
+
+    def _read_signature(self):
+        """Return the mtime and size of playlist.ini and the mtime of the
+        directory (which changes when files are added, removed or renamed).
+        """
+        try:
+            playlist_stat = os.stat(self._playlist_path)
+            path_stat = os.stat(self._path)
+        except OSError:
+            return None
+        return (playlist_stat.st_mtime, playlist_stat.st_size, path_stat.st_mtime)
 
     def search_paths(self):
         """Return a list of paths to search for files."""
         return [self._path]
 
+    def fileno(self):
+        """Return a file descriptor that becomes readable when the directory
+        changes, or None if changes can only be polled with is_changed.
+        """
+        if self._inotify is None:
+            return None
+        return self._inotify.fileno()
+
+    def time_until_settled(self, now):
+        """Return the seconds until a burst of changes settles and is_changed
+        reports it, infinity if no change is pending.
+        """
+        if self._event_at is not None:
+            return max(0.0, self._event_at + self._settle_time - now)
+        if self._inotify is not None and not self._watching:
+            # Waiting for the directory to come back.
+            return max(0.0, self._last_check + self._check_interval - now)
+        return float('inf')
+
     def is_changed(self):
-        """Return true if the file search paths have changed."""
-        # For now just return false and assume the path never changes.  In the
-        # future it might be interesting to watch for file changes and return
-        # true if new files are added/removed from the directory.  This is 
-        # called in a tight loop of the main program so it needs to be fast and
-        # not resource intensive.
-        return False
+        """Return true if playlist.ini or the directory content has changed
+        and no change happened for settle_time seconds since, so a burst of
+        changes (like a copy of many files) is reported once, when it is over.
+        """
+        # This is called in a tight loop of the main program so it needs to be
+        # fast and not resource intensive.  With inotify just drain the pending
+        # events, otherwise only stat two paths and at most once per check
+        # interval.
+        if self._inotify is not None:
+            return self._is_changed_inotify()
+        now = time.time()
+        if now - self._last_check < self._check_interval:
+            return False
+        self._last_check = now
+        signature = self._read_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def _is_changed_inotify(self):
+        now = time.time()
+        if not self._watching and now - self._last_check >= self._check_interval:
+            # The directory was gone, poll for it to come back.
+            self._last_check = now
+            self._watching = self._add_watches()
+            if self._watching:
+                self._event_at = now
+        events = self._inotify.read_events()
+        if events:
+            self._event_at = now
+            for _, mask, _, _ in events:
+                if mask & _REWATCH_MASK or (self._recursive and mask & IN_ISDIR
+                                            and mask & _NEW_DIR_MASK):
+                    # Watch the new playlist.ini or directories, an overflow
+                    # lost events but a reload catches up with all of them.
+                    self._watching = self._add_watches()
+                    break
+        if self._event_at is None or now - self._event_at < self._settle_time:
+            return False
+        self._event_at = None
+        return True
 
     def idle_message(self):
         """Return a message to display when idle and no files are found."""
@@ -0,0 +1,179 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import fcntl
+import mmap
+import os
+import stat
+import struct
+
+import pygame
+
+
+# Framebuffer ioctls and structures, see linux/fb.h.
+FBIOGET_VSCREENINFO = 0x4600
+FBIOPUT_VSCREENINFO = 0x4601
+FBIOGET_FSCREENINFO = 0x4602
+FBIOPAN_DISPLAY = 0x4606
+
+# struct fb_var_screeninfo is 40 32 bit fields.
+_VAR_FORMAT = '=40I'
+_XRES, _YRES, _XRES_VIRTUAL, _YRES_VIRTUAL, _XOFFSET, _YOFFSET, _BITS = range(7)
+# Offset and length of the red, green, blue and alpha bitfields.
+_BITFIELDS = ((8, 9), (11, 12), (14, 15), (17, 18))
+
+# struct fb_fix_screeninfo, native alignment (unsigned longs are 4 or 8 bytes).
+_FIX_FORMAT = '16sL4I3HI'
+_FIX_SMEM_LEN = 2
+_FIX_LINE_LENGTH = 9
+# Bytes passed to the ioctls, more than any version of the structures.
+_IOCTL_BUFFER = 256
+
+# Pixel format of fake framebuffers.
+_FAKE_BITS = 32
+_FAKE_MASKS = (0xff0000, 0xff00, 0xff, 0)
+
+
+class Framebuffer(object):
+    """Display that draws straight into the memory of a Linux framebuffer
+    device (like /dev/fb0) instead of going through the pygame display.  The
+    looper draws into surface, a pygame surface in the pixel format of the
+    framebuffer, and flip() copies it into the mapped framebuffer memory.
+    When the driver can pan (the Raspberry Pi one can) the framebuffer is
+    made twice as tall and flip() draws into the hidden half and then pans
+    to it, so a frame never shows half drawn.  With fake a regular file is
+    used as a fake framebuffer of the given size (for tests).
+    """
+
+    def __init__(self, device='/dev/fb0', size=None, double_buffer=True,
+                 fake=False):
+        """Device is the path of the framebuffer device, or of the file of a
+        fake framebuffer (created if missing).  Size is the (width, height) of
+        a fake framebuffer, ignored for devices.  Raises OSError if the device
+        can't be opened and ValueError if it is not a character device.
+        """
+        flags = os.O_RDWR | os.O_CREAT if fake else os.O_RDWR
+        self._fd = os.open(device, flags)
+        self._saved_var = None
+        if fake:
+            self._open_fake(size, double_buffer)
+        elif stat.S_ISCHR(os.fstat(self._fd).st_mode):
+            self._open_device(double_buffer)
+        else:
+            os.close(self._fd)
+            raise ValueError('{0} is not a framebuffer device'.format(device))
+        self._map = mmap.mmap(self._fd, self._page_bytes * self._pages,
+                              mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self.surface = pygame.Surface(self.size, 0, self._bits, self._masks)
+        # Page shown by the display.
+        self.visible_page = 0
+        if self._var is not None:
+            self.visible_page = min(self._var[_YOFFSET] // self.size[1], self._pages - 1)
+
+    def _get_var(self):
+        return list(struct.unpack_from(_VAR_FORMAT, fcntl.ioctl(
+            self._fd, FBIOGET_VSCREENINFO, '\0' * _IOCTL_BUFFER)))
+
+    def _put_var(self, var):
+        buf = struct.pack(_VAR_FORMAT, *var)
+        fcntl.ioctl(self._fd, FBIOPUT_VSCREENINFO, buf + '\0' * (_IOCTL_BUFFER - len(buf)))
+
+    def _open_device(self, double_buffer):
+        var = self._get_var()
+        self._saved_var = list(var)
+        width, height = var[_XRES], var[_YRES]
+        if double_buffer and var[_YRES_VIRTUAL] < 2 * height:
+            var[_YRES_VIRTUAL] = 2 * height
+            try:
+                self._put_var(var)
+            except IOError:
+                pass  # Not enough video memory, stay single buffered.
+            var = self._get_var()
+        fix = struct.unpack_from(_FIX_FORMAT, fcntl.ioctl(
+            self._fd, FBIOGET_FSCREENINFO, '\0' * _IOCTL_BUFFER))
+        self.size = (width, height)
+        self._pitch = fix[_FIX_LINE_LENGTH]
+        self._page_bytes = self._pitch * height
+        pages = min(var[_YRES_VIRTUAL] // height, fix[_FIX_SMEM_LEN] // self._page_bytes)
+        self._pages = 2 if double_buffer and pages >= 2 else 1
+        self._bits = var[_BITS]
+        self._masks = tuple(((1 << var[length]) - 1) << var[offset]
+                            for offset, length in _BITFIELDS)
+        self._var = var
+
+    def _open_fake(self, size, double_buffer):
+        if size is None:
+            raise ValueError('A fake framebuffer needs a size')
+        self.size = tuple(size)
+        self._bits = _FAKE_BITS
+        self._masks = _FAKE_MASKS
+        self._pitch = self.size[0] * _FAKE_BITS // 8
+        self._page_bytes = self._pitch * self.size[1]
+        self._pages = 2 if double_buffer else 1
+        self._var = None
+        os.ftruncate(self._fd, self._page_bytes * self._pages)
+
+    def is_double_buffered(self):
+        return self._pages > 1
+
+    def _copy(self, page, pitch, top, bottom, left=0, right=None):
+        """Copy rows top to bottom (columns left to right, in bytes) of
+        surface, whose rows are pitch bytes apart, into a page of the
+        framebuffer.  Reads the surface memory in place, only the copied
+        bytes are touched.
+        """
+        data = self.surface.get_buffer()
+        base = page * self._page_bytes
+        if left == 0 and right is None and pitch == self._pitch:
+            self._map.seek(base + top * pitch)
+            self._map.write(buffer(data, top * pitch, (bottom - top) * pitch))
+            return
+        if right is None:
+            right = min(pitch, self._pitch)
+        for row in xrange(top, bottom):
+            self._map.seek(base + row * self._pitch + left)
+            self._map.write(buffer(data, row * pitch + left, right - left))
+
+    def _pan(self, page):
+        if self._var is not None:
+            self._var[_XOFFSET] = 0
+            self._var[_YOFFSET] = page * self.size[1]
+            buf = struct.pack(_VAR_FORMAT, *self._var)
+            fcntl.ioctl(self._fd, FBIOPAN_DISPLAY, buf + '\0' * (_IOCTL_BUFFER - len(buf)))
+        self.visible_page = page
+
+    def flip(self):
+        """Show surface, drawn into the hidden page first if double buffered."""
+        page = self.visible_page
+        if self._pages > 1:
+            page = 1 - self.visible_page
+        self._copy(page, self.surface.get_pitch(), 0, self.size[1])
+        if page != self.visible_page:
+            self._pan(page)
+
+    def update(self, rects=None):
+        """Show the rectangles of surface that changed (all of it if None).
+        Small updates are copied into the visible page directly.
+        """
+        if not rects:
+            if rects is None:
+                self.flip()
+            return
+        pitch = self.surface.get_pitch()
+        bytes_per_pixel = self.surface.get_bytesize()
+        bounds = pygame.Rect((0, 0), self.size)
+        for rect in rects:
+            rect = pygame.Rect(rect).clip(bounds)
+            if rect.width and rect.height:
+                self._copy(self.visible_page, pitch, rect.top, rect.bottom,
+                           rect.left * bytes_per_pixel, rect.right * bytes_per_pixel)
+
+    def close(self):
+        """Unmap the framebuffer and restore its original geometry."""
+        self._map.close()
+        if self._saved_var is not None:
+            try:
+                self._put_var(self._saved_var)
+            except IOError:
+                pass
+        os.close(self._fd)
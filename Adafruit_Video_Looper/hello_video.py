@@ -1,10 +1,10 @@
 # Copyright 2015 Adafruit Industries.
 # Author: Tony DiCola
 # License: GNU GPLv2, see LICENSE.txt
-import os
-import subprocess
 import time
 
+from process import ProcessSupervisor
+
 
 class HelloVideoPlayer(object):
 
@@ -13,6 +13,11 @@ class HelloVideoPlayer(object):
         background.
         """
         self._process = None
+        self._supervisor = ProcessSupervisor()
+        self._stopped_at = None
+        # Optional hook called as on_transition(movie, gap_sec, promoted) each
+        # time a movie starts, see OMXPlayer.
+        self.on_transition = None
         self._load_config(config)
 
     def _load_config(self, config):
@@ -25,7 +30,9 @@ class HelloVideoPlayer(object):
         return self._extensions
 
     def play(self, movie, loop=False, **kwargs):
-        """Play the provided movied file, optionally looping it repeatedly."""
+        """Play the provided movied file, optionally looping it repeatedly.
+        Returns False, hello_video has no standby player to promote.
+        """
         self.stop(3)  # Up to 3 second delay to let the old player stop.
         # Assemble list of arguments.
         args = ['hello_video.bin']
@@ -33,33 +40,82 @@ class HelloVideoPlayer(object):
             args.append('--loop')         # Add loop parameter if necessary.
         args.append(movie)                # Add movie file path.
         # Run hello_video process and direct standard output to /dev/null.
-        self._process = subprocess.Popen(args,
-                                         stdout=open(os.devnull, 'wb'),
-                                         close_fds=True)
+        self._process = self._supervisor.spawn(args)
+        gap = None
+        if self._stopped_at is not None:
+            gap = time.time() - self._stopped_at
+        self._stopped_at = None
+        if self.on_transition is not None:
+            self.on_transition(movie, gap, False)
+        return False
+
+    def prepare(self, movie, loop=False, **kwargs):
+        """Standby players are not supported by hello_video, does nothing."""
+        pass
+
+    def is_prepared(self, movie, loop=False, **kwargs):
+        """Return false, hello_video has no standby player."""
+        return False
+
+    def discard(self):
+        """No standby player to stop, does nothing."""
+        pass
+
+    def pause(self):
+        """hello_video can't be controlled while playing, returns false."""
+        return False
+
+    def resume(self):
+        """hello_video can't be controlled while playing, returns false."""
+        return False
+
+    def seek(self, offset):
+        """hello_video can't be controlled while playing, returns false."""
+        return False
+
+    def restart(self):
+        """hello_video can't be controlled while playing, returns false."""
+        return False
+
+    def position(self):
+        """The playback position of hello_video is unknown, returns None."""
+        return None
+
+    def set_volume(self, vol):
+        """hello_video plays no sound, returns false."""
+        return False
 
     def is_playing(self):
         """Return true if the video player is running, false otherwise."""
+        self._supervisor.reap()
         if self._process is None:
             return False
         self._process.poll()
+        if self._process.returncode is not None and self._stopped_at is None:
+            self._stopped_at = time.time()
         return self._process.returncode is None
 
+    def last_teardown(self):
+        """Return how many seconds the last stopped player took to exit."""
+        return self._supervisor.last_teardown
+
     def stop(self, block_timeout_sec=None):
         """Stop the video player.  block_timeout_sec is how many seconds to
-        block waiting for the player to stop before moving on.
+        block waiting for the player to stop before moving on (None waits the
+        supervisor's grace period, kills it and waits KILL_WAIT more, then
+        gives up on a player that still did not exit).  With a timeout of 0
+        the player is asked to exit and is_playing stays true until it did.
         """
-        # Stop the player if it's running.
-        if self._process is not None and self._process.returncode is None:
-            # process.kill() doesn't seem to work reliably if USB drive is
-            # removed, instead just run a kill -9 on it.
-            subprocess.call(['kill', '-9', str(self._process.pid)])
-        # If a blocking timeout was specified, wait up to that amount of time
-        # for the process to stop.
-        start = time.time()
-        while self._process is not None and self._process.returncode is None:
-            if (time.time() - start) >= block_timeout_sec:
-                break
-            time.sleep(0)
+        if self._process is None:
+            return
+        # The player is killed if it ignores SIGTERM (like when the USB drive
+        # it plays from was removed).
+        if block_timeout_sec == 0:
+            self._supervisor.terminate(self._process)
+            return
+        self._supervisor.stop(self._process, block_timeout_sec)
+        if self._stopped_at is None:
+            self._stopped_at = time.time()
         # Let the process be garbage collected.
         self._process = None
 
@@ -0,0 +1,198 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import cPickle as pickle
+import hashlib
+import mmap
+import os
+import threading
+
+import pygame
+
+
+# Bump when the raw file layout changes so old stores are ingested again.
+INGEST_VERSION = 1
+
+# Name of the manifest in the store directory.
+MANIFEST = 'manifest'
+
+
+class ImageIngest(object):
+    """Store of the playlist images converted ahead of time to raw pixel
+    files at the display size and in the display pixel format, listed in a
+    manifest next to them.  Loading an ingested image maps its file and
+    copies the pixels into a display surface: no decode, no scaling and no
+    format conversion when it is blitted.  Images are ingested on a
+    background thread and again when their file changes; until then load()
+    returns None and the image is decoded as before.
+
+    The display pixel format is taken from a 1x1 template surface made on the
+    main thread, so the worker converts images by blitting between software
+    surfaces of its own and never touches the display.
+    """
+
+    def __init__(self, store_path, screen, size, decode):
+        """Store_path is the directory of the raw files and the manifest (keep
+        it outside the content directory).  Screen is the display surface
+        whose pixel format is used, size the display size and decode a
+        thread safe function decode(path, size) returning the scaled surface
+        of an image.
+        """
+        self._store_path = store_path
+        self._template = pygame.Surface((1, 1), 0, screen)
+        self._size = tuple(size)
+        self._decode = decode
+        # Images ingested for another display size or format are not used.
+        self._format = (self._size, self._template.get_bitsize(),
+                        tuple(self._template.get_masks()))
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._manifest = self._read()
+        self._pending = []
+        # Manifest changed without anything to ingest, the worker writes it.
+        self._dirty = False
+        self._running = True
+        self._thread = None
+
+    def _key(self, path):
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime)
+
+    def _read(self):
+        try:
+            with open(os.path.join(self._store_path, MANIFEST), 'rb') as infile:
+                version, fmt, manifest = pickle.load(infile)
+        except Exception:
+            # Missing, truncated or incompatible manifest, ingest again.
+            return {}
+        if version != INGEST_VERSION or fmt != self._format:
+            return {}
+        return manifest
+
+    def _write(self):
+        with self._lock:
+            manifest = dict(self._manifest)
+        path = os.path.join(self._store_path, MANIFEST)
+        try:
+            with open(path + '.tmp', 'wb') as outfile:
+                pickle.dump((INGEST_VERSION, self._format, manifest), outfile,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(path + '.tmp', path)
+            # Drop the raw files of images that left the playlist.
+            used = set(name for _, name, _ in manifest.values())
+            for name in os.listdir(self._store_path):
+                if name.endswith('.raw') and name not in used:
+                    os.remove(os.path.join(self._store_path, name))
+        except (IOError, OSError):
+            pass
+
+    def _record(self, path):
+        """Return the manifest record (key, file name, pitch) of path if it is
+        ingested and did not change since, None otherwise.
+        """
+        with self._lock:
+            record = self._manifest.get(path)
+        if record is None:
+            return None
+        try:
+            if record[0] != self._key(path):
+                return None
+        except OSError:
+            return None
+        return record
+
+    def load(self, path, size):
+        """Return the display surface of an ingested image, None if it is not
+        ingested (yet) for this size.  Safe to call from any thread.
+        """
+        if tuple(size) != self._size:
+            return None
+        record = self._record(path)
+        if record is None:
+            return None
+        _, name, pitch = record
+        surface = pygame.Surface(self._size, 0, self._template)
+        if surface.get_pitch() != pitch:
+            return None
+        try:
+            with open(os.path.join(self._store_path, name), 'rb') as infile:
+                data = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return None  # Removed or empty, ingested again on the next request.
+        try:
+            if len(data) != pitch * self._size[1]:
+                return None
+            # Straight from the mapping, slicing it would copy the pixels once more.
+            surface.get_buffer().write(data, 0)
+        finally:
+            data.close()
+        return surface
+
+    def request(self, paths):
+        """Ingest the images of paths that are not ingested or changed, in the
+        background.  Images not in paths are dropped from the store.
+        """
+        wanted = set(paths)
+        dropped = False
+        with self._lock:
+            for path in self._manifest.keys():
+                if path not in wanted:
+                    del self._manifest[path]
+                    dropped = True
+        missing = []
+        for path in paths:
+            if path not in wanted:
+                continue
+            wanted.discard(path)
+            if self._record(path) is None:
+                missing.append(path)
+        with self._cond:
+            self._pending = missing
+            # The manifest is only written by the worker, so the cleanup never
+            # removes a file an ingest just renamed into place.
+            if dropped:
+                self._dirty = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name='image-ingest')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = []
+            self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending and not self._dirty:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                path = self._pending.pop(0) if self._pending else None
+                last = not self._pending
+                if last:
+                    self._dirty = False
+            if path is not None:
+                try:
+                    self._ingest(path)
+                except Exception:
+                    pass  # Unreadable image, the main loop reports it when shown.
+            if last:
+                self._write()
+
+    def _ingest(self, path):
+        key = self._key(path)
+        name = hashlib.sha1(repr((path, key, self._format))).hexdigest() + '.raw'
+        surface = pygame.Surface(self._size, 0, self._template)
+        surface.blit(self._decode(path, self._size), (0, 0))
+        if not os.path.isdir(self._store_path):
+            os.makedirs(self._store_path)
+        raw_path = os.path.join(self._store_path, name)
+        with open(raw_path + '.tmp', 'wb') as outfile:
+            outfile.write(surface.get_buffer().raw)
+        os.rename(raw_path + '.tmp', raw_path)
+        with self._lock:
+            self._manifest[path] = (key, name, surface.get_pitch())
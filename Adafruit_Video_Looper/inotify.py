@@ -0,0 +1,98 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+
+
+# Event masks from <sys/inotify.h>.
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_ISDIR       = 0x40000000
+
+# Flags of inotify_init1, same values as O_NONBLOCK and O_CLOEXEC.
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC  = 0o2000000
+
+# Header of struct inotify_event: wd, mask, cookie, len (name follows).
+_EVENT_HEADER = struct.Struct('iIII')
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                            use_errno=True)
+    return _libc
+
+
+class Inotify(object):
+    """Minimal non-blocking wrapper of the Linux inotify API (through ctypes,
+    the standard library of this Python has none).  The file descriptor can be
+    waited on with select/epoll and read_events never blocks.
+    """
+
+    def __init__(self):
+        """Create an inotify instance, raises OSError if unsupported."""
+        try:
+            libc = _get_libc()
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+
+    def fileno(self):
+        return self._fd
+
+    def add_watch(self, path, mask):
+        """Watch path for the events in mask and return the watch descriptor."""
+        wd = _get_libc().inotify_add_watch(self._fd, path, mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self):
+        """Return the list of pending events as (wd, mask, cookie, name)
+        tuples, empty if nothing is pending.
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError, err:
+                if err.errno in (errno.EAGAIN, errno.EINTR):
+                    return events
+                raise
+            if not data:
+                return events
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip('\0')
+                offset += length
+                events.append((wd, mask, cookie, name))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,322 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import cPickle as pickle
+import distutils.spawn
+import json
+import os
+import struct
+import subprocess
+import threading
+
+
+# Bump when the MediaInfo layout changes so stale indexes are ignored.
+INDEX_VERSION = 1
+
+# MP4/MOV boxes that contain other boxes, the ones the header parser descends.
+_CONTAINER_BOXES = ('moov', 'trak', 'mdia', 'minf', 'stbl')
+
+# Most bytes of a moov box the header parser reads.
+_MAX_MOOV_SIZE = 16 * 1024 * 1024
+
+# NAL unit types a raw H264 stream starts with: SPS and access unit delimiter.
+# MPEG program and elementary streams share the start code but not these.
+_H264_FIRST_NAL_TYPES = (7, 9)
+
+
+class MediaInfo(object):
+    """Probed metadata of a movie file.  Duration is in seconds, kind is the
+    stream format the player routing understands ('h264' for a raw H264
+    stream, the container name otherwise), codec is the video codec.  Fields
+    that could not be probed are None.
+    """
+
+    __slots__ = ('duration', 'kind', 'codec', 'width', 'height', 'has_audio')
+
+    def __init__(self, duration=None, kind=None, codec=None, width=None,
+                 height=None, has_audio=None):
+        self.duration = duration
+        self.kind = kind
+        self.codec = codec
+        self.width = width
+        self.height = height
+        self.has_audio = has_audio
+
+    def __repr__(self):
+        return 'MediaInfo({0})'.format(', '.join(
+            '{0}={1!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+
+def probe_ffprobe(path, ffprobe='ffprobe'):
+    """Probe a movie with ffprobe, returns a MediaInfo or None on failure."""
+    try:
+        output = subprocess.check_output(
+            [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format',
+             '-show_streams', path],
+            stderr=open(os.devnull, 'wb'))
+        data = json.loads(output)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+    info = MediaInfo(has_audio=False)
+    fmt = data.get('format', {})
+    try:
+        info.duration = float(fmt['duration'])
+    except (KeyError, ValueError):
+        pass
+    info.kind = fmt.get('format_name', '').split(',')[0] or None
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') == 'video' and info.codec is None:
+            info.codec = stream.get('codec_name')
+            info.width = stream.get('width')
+            info.height = stream.get('height')
+        elif stream.get('codec_type') == 'audio':
+            info.has_audio = True
+    return info
+
+
+def _iter_boxes(data, offset, end):
+    """Yield (type, payload offset, box end) of the MP4 boxes in data."""
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from('>I4s', data, offset)
+        header = 8
+        if size == 1 and offset + 16 <= end:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _parse_moov(data, info):
+    """Fill info from the boxes of a moov box."""
+    for kind, start, end in _iter_boxes(data, 0, len(data)):
+        if kind in _CONTAINER_BOXES:
+            _parse_moov(data[start:end], info)
+        elif kind == 'mvhd' and end - start >= 20:
+            if ord(data[start]) == 1:
+                timescale, duration = struct.unpack_from('>IQ', data, start + 20)
+            else:
+                timescale, duration = struct.unpack_from('>II', data, start + 12)
+            if timescale:
+                info.duration = float(duration) / timescale
+        elif kind == 'hdlr' and end - start >= 12:
+            handler = data[start + 8:start + 12]
+            if handler == 'soun':
+                info.has_audio = True
+        elif kind == 'tkhd' and end - start >= 8:
+            width, height = struct.unpack_from('>II', data, end - 8)
+            if width and height and info.width is None:
+                info.width, info.height = width >> 16, height >> 16
+        elif kind == 'stsd' and end - start >= 16:
+            entry = data[start + 12:start + 16]
+            if entry in ('avc1', 'avc3'):
+                info.codec = 'h264'
+            elif entry in ('hev1', 'hvc1'):
+                info.codec = 'hevc'
+            elif entry == 'mp4v':
+                info.codec = 'mpeg4'
+
+
+def probe_header(path):
+    """Probe a movie by parsing its header, without external tools.  Knows
+    raw H264 streams and MP4/MOV files (duration, video codec, resolution
+    and audio).  Returns a MediaInfo or None if the format is unknown.
+    """
+    try:
+        with open(path, 'rb') as infile:
+            head = infile.read(16)
+            if head.startswith('\0\0\0\1') or head.startswith('\0\0\1'):
+                header = head[head.index('\1') + 1:][:1]
+                nal = ord(header) if header else 0x80
+                # Forbidden zero bit clear and a NAL type that starts a stream.
+                if not nal & 0x80 and nal & 0x1f in _H264_FIRST_NAL_TYPES:
+                    return MediaInfo(kind='h264', codec='h264', has_audio=False)
+                return None
+            if head[4:8] not in ('ftyp', 'moov', 'mdat', 'free', 'wide', 'skip'):
+                return None
+            info = MediaInfo(kind='mp4', has_audio=False)
+            size = os.fstat(infile.fileno()).st_size
+            offset = 0
+            while offset + 8 <= size:
+                infile.seek(offset)
+                header = infile.read(16)
+                if len(header) < 8:
+                    break
+                box_size, kind = struct.unpack_from('>I4s', header)
+                header_size = 8
+                if box_size == 1 and len(header) == 16:
+                    box_size = struct.unpack_from('>Q', header, 8)[0]
+                    header_size = 16
+                elif box_size == 0:
+                    box_size = size - offset
+                if box_size < header_size:
+                    break
+                if kind == 'moov':
+                    if box_size > _MAX_MOOV_SIZE:
+                        break
+                    infile.seek(offset + header_size)
+                    _parse_moov(infile.read(box_size - header_size), info)
+                    return info
+                offset += box_size
+    except (IOError, struct.error):
+        pass
+    return None
+
+
+class MediaIndex(object):
+    """Index of the probed metadata of the movies, stored next to the
+    playlist cache and keyed on path, size and mtime, so a file is probed
+    once and again only when it changes.  Probing runs on a background
+    thread with ffprobe if it is installed, the header parser otherwise.
+    Lookups never block: a file that is not probed yet has no info, except
+    through probe() which probes it right away.
+    """
+
+    def __init__(self, index_path=None, probe=None):
+        """Index_path is the file the index is saved to (None keeps it in
+        memory only).  Probe is a function probe(path) returning a MediaInfo
+        or None, by default ffprobe or the header parser.
+        """
+        self._index_path = index_path
+        if probe is None:
+            ffprobe = distutils.spawn.find_executable('ffprobe')
+            if ffprobe is not None:
+                probe = lambda path: probe_ffprobe(path, ffprobe) or probe_header(path)
+            else:
+                probe = probe_header
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._records = self._read()
+        self._pending = []
+        self._running = True
+        self._thread = None
+
+    def _key(self, path):
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime)
+
+    def _read(self):
+        if self._index_path is None:
+            return {}
+        try:
+            with open(self._index_path, 'rb') as index_file:
+                version, rows = pickle.load(index_file)
+        except Exception:
+            # Missing, truncated or incompatible index, probe again.
+            return {}
+        if version != INDEX_VERSION:
+            return {}
+        return dict((path, (key, MediaInfo(*fields))) for path, key, fields in rows)
+
+    def _write(self):
+        if self._index_path is None:
+            return
+        with self._lock:
+            rows = [(path, key, tuple(getattr(info, name) for name in MediaInfo.__slots__))
+                    for path, (key, info) in self._records.items()]
+        temp_path = self._index_path + '.tmp'
+        try:
+            index_dir = os.path.dirname(self._index_path)
+            if index_dir and not os.path.isdir(index_dir):
+                os.makedirs(index_dir)
+            with open(temp_path, 'wb') as index_file:
+                pickle.dump((INDEX_VERSION, rows), index_file, pickle.HIGHEST_PROTOCOL)
+            # Atomic replace so a power cut never leaves a half written index.
+            os.rename(temp_path, self._index_path)
+        except (IOError, OSError):
+            pass
+
+    def get(self, path):
+        """Return the MediaInfo of path, None if it is not probed (yet) or
+        changed since it was probed.
+        """
+        with self._lock:
+            record = self._records.get(path)
+        if record is None:
+            return None
+        try:
+            if record[0] != self._key(path):
+                return None
+        except OSError:
+            return None
+        return record[1]
+
+    def probe(self, path):
+        """Return the MediaInfo of path, probing it right away if it is not
+        indexed or changed.  Blocks, for background threads that need the
+        info before going on.  Returns None if the file can't be read.
+        """
+        info = self.get(path)
+        if info is not None:
+            return info
+        try:
+            key = self._key(path)
+        except OSError:
+            return None
+        info = self._probe(path) or MediaInfo()
+        with self._lock:
+            self._records[path] = (key, info)
+        return info
+
+    def duration(self, path):
+        """Return the duration of path in seconds, None if unknown."""
+        info = self.get(path)
+        return None if info is None else info.duration
+
+    def kind(self, path):
+        """Return the stream format of path (see MediaInfo), None if unknown."""
+        info = self.get(path)
+        return None if info is None else info.kind
+
+    def request(self, paths):
+        """Probe the paths that are not indexed or changed, in the background.
+        Entries of files not in paths are dropped from the index.
+        """
+        wanted = set(paths)
+        with self._lock:
+            for path in self._records.keys():
+                if path not in wanted:
+                    del self._records[path]
+        missing = []
+        for path in paths:
+            if path not in wanted:
+                continue
+            wanted.discard(path)  # Repeated playlist positions probe once.
+            if self.get(path) is None:
+                missing.append(path)
+        with self._cond:
+            self._pending = missing
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name='media-index')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = []
+            self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                path = self._pending.pop(0)
+                last = not self._pending
+            try:
+                key = self._key(path)
+                info = self._probe(path) or MediaInfo()
+                with self._lock:
+                    self._records[path] = (key, info)
+            except OSError:
+                pass  # Removed meanwhile.
+            if last:
+                self._write()
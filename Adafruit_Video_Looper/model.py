@@ -1,117 +1,226 @@
 # Copyright 2019 ITS NEW VISION
 # Author: Paul Bozan
 # License: GNU GPLv2, see LICENSE.txt
-import random
+import collections
 import datetime
-from datetime import datetime
+import os
+import time
+
+from schedule import ScheduleIndex, ShuffleBag, WeightedScheduler
+
+
+# Playlist items with these extensions are shown as still images.
+IMAGE_EXTENSIONS = ('.jpg', '.png')
+
+
+def is_image(path):
+    """Return True if the playlist item is a still image."""
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def parse_timestamp(value):
+    """Parse a %Y%m%d%H%M%S local timestamp into epoch seconds.  Dates out of
+    the range of the platform time_t (like 2099 or 9999 as "forever" on a 32
+    bit system) are clamped to plus or minus infinity.
+    """
+    value = value.strip()
+    if len(value) != 14 or not value.isdigit():
+        raise ValueError('Invalid timestamp: {0!r}'.format(value))
+    # datetime validates the field ranges.
+    stamp = datetime.datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                              int(value[8:10]), int(value[10:12]), int(value[12:14]))
+    try:
+        return time.mktime(stamp.timetuple())
+    except (OverflowError, ValueError):
+        return float('inf') if stamp.year >= 1970 else float('-inf')
+
+
+def parse_time_of_day(value):
+    """Parse a %H%M%S time of day into seconds since midnight."""
+    value = value.strip()
+    if len(value) != 6 or not value.isdigit():
+        raise ValueError('Invalid time of day: {0!r}'.format(value))
+    hours, minutes, seconds = int(value[0:2]), int(value[2:4]), int(value[4:6])
+    if hours > 23 or minutes > 59 or seconds > 59:
+        raise ValueError('Invalid time of day: {0!r}'.format(value))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _entry_key(entry):
+    """Return a hashable tuple of all fields of a PlaylistEntry."""
+    return tuple(getattr(entry, name) for name in PlaylistEntry.__slots__)
+
+
+class PlaylistEntry(object):
+    """Compact record of a playlist position and its play restrictions.  All
+    fields are parsed once at load time: start/end are epoch seconds,
+    istart/iend are seconds since midnight, screen_time is an int number of
+    seconds and send_feedback is a bool.  Missing restrictions are None.
+    Weight (float) and hourly_budget (int plays per hour or None) are only used
+    by the weighted scheduler.
+    """
+
+    __slots__ = ('path', 'start', 'end', 'istart', 'iend', 'screen_time',
+                 'send_feedback', 'weight', 'hourly_budget')
+
+    def __init__(self, path, start=None, end=None, istart=None, iend=None,
+                 screen_time=None, send_feedback=True, weight=1.0,
+                 hourly_budget=None):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.istart = istart
+        self.iend = iend
+        self.screen_time = screen_time
+        self.send_feedback = send_feedback
+        self.weight = weight
+        self.hourly_budget = hourly_budget
+
+    def __repr__(self):
+        return 'PlaylistEntry({0})'.format(', '.join(
+            '{0}={1!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
 
 class Playlist(object):
     """Representation of a playlist of movies."""
 
-    def __init__(self, movies, playRestrictions, is_random):
-        """Create a playlist from the provided list of movies."""
-        self._movies = movies
-        self._play_restrictions = playRestrictions
+    def __init__(self, entries, is_random, clock=time.time, is_weighted=False):
+        """Create a playlist from the provided list of PlaylistEntry records.
+        Clock is a function returning the current time in epoch seconds, used
+        to evaluate the play restrictions.  If is_weighted is True the order is
+        a weighted share of voice (see WeightedScheduler), which takes
+        precedence over is_random.
+        """
+        self._entries = entries
         self._index = None
-        self._is_random = is_random
+        self._is_random = is_random or is_weighted
+        self._is_weighted = is_weighted
         self._new_iteration = True
-        self._period_ok = False
-        self._interval_ok = False
+        self._clock = clock
+        self._schedule = ScheduleIndex(entries, clock)
+        self._bag = ShuffleBag()
+        self._weighted = WeightedScheduler(entries) if is_weighted else None
+        self._pending = None
+
+    def update(self, entries):
+        """Stage a new list of PlaylistEntry records, e.g. after playlist.ini
+        or the content directory changed.  The schedule is compiled right away
+        but the swap happens atomically at the next get_next, so the item
+        currently on screen keeps playing and playback continues after it in
+        the new list.  Returns a tuple
+        (added, removed) with the number of entries that differ.
+        """
+        old_keys = collections.Counter(_entry_key(x) for x in self._entries)
+        new_keys = collections.Counter(_entry_key(x) for x in entries)
+        weighted = None
+        if self._is_weighted:
+            weighted = WeightedScheduler(entries)
+            weighted.inherit(self._weighted)
+        self._pending = (entries, ScheduleIndex(entries, self._clock), weighted)
+        return (sum((new_keys - old_keys).values()),
+                sum((old_keys - new_keys).values()))
+
+    def has_pending(self):
+        """Return True if an update is staged and not swapped in yet."""
+        return self._pending is not None
+
+    def _apply_pending(self):
+        """Swap in staged entries and move the current position onto them."""
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        entries, schedule, weighted = pending
+        self._index = self._locate(entries)
+        self._entries = entries
+        self._schedule = schedule
+        self._weighted = weighted
+        # Drawn positions refer to the old entries.
+        self._bag.clear()
+
+    def _locate(self, entries):
+        """Return the position in entries that matches the current position,
+        or the closest preceding position that survived.  Repeated files are
+        matched by their occurrence number.  Returns None if nothing matches.
+        """
+        if self._index is None:
+            return None
+        positions = {}
+        for i, entry in enumerate(entries):
+            positions.setdefault(entry.path, []).append(i)
+        occurrences = []
+        seen = {}
+        for entry in self._entries[:self._index + 1]:
+            occurrences.append(seen.get(entry.path, 0))
+            seen[entry.path] = occurrences[-1] + 1
+        for i in xrange(self._index, -1, -1):
+            matches = positions.get(self._entries[i].path, ())
+            if occurrences[i] < len(matches):
+                return matches[occurrences[i]]
+        return None
 
     def is_on_schedule(self,play_index):
         """Check that the current position (play_index) is within the time range and can be displayed. The function returns True or False. """
-        on_schedule = True
-        play_restriction=self._play_restrictions[play_index]
-        #print(play_restriction)
-        if not (play_restriction["start"] is None or play_restriction["end"] is None):
-          now = datetime.now()
-          if(now>=play_restriction["start"] and now<play_restriction["end"]):
-            self._period_ok = True
-          else:
-            self._period_ok = False
-            on_schedule = False
-        else:
-          self._period_ok = True
-
-        if not (play_restriction["istart"] is None or play_restriction["iend"] is None):
-          now = datetime.now().time()
-          if(now>=play_restriction["istart"].time() and now<play_restriction["iend"].time()):
-            self._interval_ok = True
-          else:
-            self._interval_ok = False
-            on_schedule = False
-        else:
-          self._interval_ok = True
-        
-        return on_schedule
+        self._schedule.refresh()
+        return self._schedule.is_active(play_index)
 
     def get_file_meta(self,play_index):
-        """Returns the meta information(time range, screen_time, etc) for a playlist index(play_index). """
-        play_restriction=self._play_restrictions[play_index]
-        return play_restriction
-
+        """Returns the meta information(time range, screen_time, etc) for a playlist index(play_index)
+           as a dict keyed by the PlaylistEntry field names, with the parsed values.
+        """
+        entry = self._entries[play_index]
+        return dict((name, getattr(entry, name)) for name in PlaylistEntry.__slots__)
     def get_position_screen_time(self,play_index):
         """Returns the meta information screen_time for a playlist index(play_index). """
-        play_restriction=self._play_restrictions[play_index]
-        if not (play_restriction["screen_time"] is None or play_restriction["screen_time"]== "-" ):
-           return int(play_restriction["screen_time"])
-        else:	
-           return None
+        return self._entries[play_index].screen_time
 
     def get_movie_send_feedback(self,play_index):
         """Returns the meta information send_feedback for a playlist index(play_index). """
-        play_restriction=self._play_restrictions[play_index]
-        if not (play_restriction["send_feedback"] is None ):
-           return play_restriction["send_feedback"]
-        else:
-           return "F"
+        return "T" if self._entries[play_index].send_feedback else "F"
 
     def get_next(self):
         """Get the next movie in the playlist. Will loop to start of playlist
         after reaching end.
         """
+        self._apply_pending()
         # Check if no movies are in the playlist and return nothing.
-        if len(self._movies) == 0:
+        if len(self._entries) == 0:
             return None
-        # Start Random movie
+        now = self._schedule.refresh()
+        # Weighted share of voice order.
+        if self._is_weighted:
+            index = self._weighted.pop(self._schedule, now)
+            if index is None:
+                return None
+            self._index = index
+            return self._entries[index].path
+        # Start Random movie, drawn from a shuffle bag of the active ones.
         if self._is_random:
-            self._index = random.randrange(0, len(self._movies))
-        else:
-            # Start at the first movie and increment through them in order.
-            if self._index is None:
-                self._index = 0
+            found = self._bag.pop(self._schedule)
+            if found is None:
+                return None
+            self._index, new_bag = found
+            if new_bag:
                 self._new_iteration = True
-            else:
-                self._index += 1
-            # Wrap around to the start after finishing.
-            if self._index >= len(self._movies):
-                self._index = 0
-	
-	if self.is_on_schedule(self._index):
-           return self._movies[self._index]
-
-	else:
-	   movie_found= False
-           movies_nr =  len(self._movies)
-	   while movies_nr >=0:
-	     movies_nr -= 1
-	     self._index += 1
-             if self._index >= len(self._movies):
-               self._index = 0
-               self._new_iteration = True
-	     if self.is_on_schedule(self._index):
-               movie_found= True;
-	       break;
-
-	   if movie_found:
-             return self._movies[self._index]
-	   else:
-	     return None;
+            return self._entries[self._index].path
+        # Start at the first movie and move to the next active one in order.
+        if self._index is None:
+            self._new_iteration = True
+            found = self._schedule.next_active(0)
+        else:
+            found = self._schedule.next_active(self._index + 1)
+        if found is None:
+            return None
+        self._index, wrapped = found
+        # Wrapped around to the start after finishing.
+        if wrapped:
+            self._new_iteration = True
+        return self._entries[self._index].path
 
     def get_current_index(self):
         # Get current index in the playlist. 
         # Check if no movies are in the playlist and returns nothing if so.
-        if len(self._movies) == 0:
+        if len(self._entries) == 0:
             return -1
         else:
             return self._index 
@@ -129,64 +238,66 @@ class Playlist(object):
            after reaching end.
            This function is mostly used to paint next image in background to reduce black screen time between movies
         """
-        # Check if no movies are in the playlist and return nothing.
-        if len(self._movies) == 0:
+        upcoming = self.lookahead(1)
+        if not upcoming:
             return None
-        # Start Random movie
-        if self._is_random:
-           return None
-        if self._index is None:
-           return None
+        return upcoming[0]
 
-        nextIndex=self._index+1
+    def lookahead(self, count):
+        """Return the list of the next count movies that get_next will return
+        (fewer if not enough are active), without moving through the playlist.
+        """
+        return [entry.path for entry in self.upcoming(count)]
 
-        if nextIndex >= len(self._movies):
-           nextIndex = 0
+    def upcoming(self, count):
+        """Same as lookahead but returns the PlaylistEntry records."""
+        # Check if no movies are in the playlist and return nothing.
+        if len(self._entries) == 0:
+            return []
+        now = self._schedule.refresh()
+        if self._is_weighted:
+            return [self._entries[i] for i in self._weighted.peek(self._schedule, now, count)]
+        if self._is_random:
+            return [self._entries[i] for i in self._bag.peek(self._schedule, count)]
+        if self._index is None:
+            return []
+        upcoming = []
+        index = self._index
+        while len(upcoming) < count:
+            found = self._schedule.next_active(index + 1)
+            if found is None:
+                break
+            index = found[0]
+            upcoming.append(self._entries[index])
+        return upcoming
 
-        if self.is_on_schedule(nextIndex):
-           return self._movies[nextIndex]
-        else:
-           movie_found= False
-           movies_nr =  len(self._movies)
-           while movies_nr >=0:
-             movies_nr -= 1
-             nextIndex += 1
-             if nextIndex >= len(self._movies):
-               nextIndex = 0
-             if self.is_on_schedule(nextIndex):
-               movie_found= True;
-               break;
-
-           if movie_found:
-             return self._movies[nextIndex]
-           else:
-             return None;
+    def next_schedule_change(self):
+        """Return the epoch time at which the set of active positions changes
+        next (infinity if it never changes).
+        """
+        self._schedule.refresh()
+        return self._schedule.next_boundary()
 
     def length(self):
         """Return the number of movies in the playlist."""
-        return len(self._movies)
+        return len(self._entries)
 
     def onlyOneActive(self):
         """Returns True if only one movie is active in playlist.
            This is used for setting loop flag when the only one active item in playlist is a movie.
         """
-        activeCnt=0
-        for i in range(len(self._movies)):
-           if self.is_on_schedule(i):
-              activeCnt += 1
-              if activeCnt >= 2:
-                 break
-        if activeCnt == 1:
-           return True
-        else: 
-           return False
+        self._schedule.refresh()
+        return self._schedule.count() == 1
 
     def set_prev_index(self):
         """This is used when user wants to navigate back through playlist using Left Arrow Key
-	   to calculate previous active position in playlist.
+           to calculate previous active position in playlist. The next call of get_next
+           returns the previous active position.  A staged update is not swapped in
+           here: the movie on screen may keep playing (restarted in loop mode) with
+           its position in the current entries.
         """
-        playlistLength = len(self._movies)
-        if playlistLength == 0:
+        playlistLength = len(self._entries)
+        if playlistLength <= 1:
             return None
 
         # Start Random movie
@@ -194,51 +305,15 @@ class Playlist(object):
             return None
 
         if self._index is None:
-            return None        
-
-        currentIndex = self._index
-        if playlistLength == 1:
-	    return None;
-
-        if playlistLength == 2 and  currentIndex == 0:
-             self._index = 1
-             return self._movies[0]
-
-        if playlistLength == 2 and  currentIndex == 1:
-             self._index = 0;
-             return self._movies[1]
-
-        if playlistLength > 2:
-                prevIndex = currentIndex-1
-                if prevIndex < 0:
-                    prevIndex = len(self._movies)-1;
-
-                if self.is_on_schedule(prevIndex):
-                    prev2Index = prevIndex-1;
-                    if prev2Index < 0 :
-                        self._index = len(self._movies)-1
-                    else:
-                        self._index = prev2Index
-                        return self._movies[self._index]
-
-                else:
-                    movie_found= False
-                    movies_nr =  len(self._movies)
-                    while movies_nr >=0:
-                       movies_nr -= 1
-                       prevIndex -= 1
-                       if prevIndex < 0:
-                            prevIndex = len(self._movies)-1
-                       if self.is_on_schedule(prevIndex):
-                           movie_found= True;
-                           break;
-
-                    if movie_found:
-                       prev2Index = prevIndex-1;
-                       if prev2Index < 0 :
-                          self._index = len(self._movies)-1
-                       else:
-                          self._index = prev2Index
-                       return self._movies[self._index]
-                    else:
-                       return None;
+            return None
+
+        self._schedule.refresh()
+        prevIndex = self._schedule.prev_active(self._index)
+        if prevIndex is None:
+            return None
+        # Position right before the previous active one, so get_next lands on it.
+        if prevIndex == 0:
+            self._index = playlistLength - 1
+        else:
+            self._index = prevIndex - 1
+        return self._entries[prevIndex].path
@@ -5,6 +5,14 @@ import os
 import subprocess
 import time
 
+import omxplayer_dbus
+from process import ProcessSupervisor
+
+# Display layer of a freshly started player when standby is enabled.  Each
+# promoted standby player sits one layer below the previous one, so the next
+# standby can always be started underneath the player on screen.
+BASE_LAYER = 10000
+
 
 class OMXPlayer(object):
 
@@ -13,6 +21,17 @@ class OMXPlayer(object):
         background.
         """
         self._process = None
+        self._controller = None
+        self._supervisor = ProcessSupervisor()
+        self._spawned = 0
+        self._standby = None
+        self._layer = BASE_LAYER
+        self._stopped_at = None
+        # Optional hook called as on_transition(movie, gap_sec, promoted) each
+        # time a movie starts.  gap_sec is the time since the previous player
+        # stopped (None if unknown) and promoted is True if a standby player
+        # was used.
+        self.on_transition = None
         self._load_config(config)
 
     def _load_config(self, config):
@@ -22,14 +41,19 @@ class OMXPlayer(object):
         self._extra_args = config.get('omxplayer', 'extra_args').split()
         self._sound = config.get('omxplayer', 'sound').lower()
         assert self._sound in ('hdmi', 'local', 'both'), 'Unknown omxplayer sound configuration value: {0} Expected hdmi, local, or both.'.format(self._sound)
+        self._standby_enabled = config.getboolean('omxplayer', 'standby')
+        self._dbus_enabled = config.getboolean('omxplayer', 'dbus') \
+                             and omxplayer_dbus.available()
 
     def supported_extensions(self):
         """Return list of supported file extensions."""
         return self._extensions
 
-    def play(self, movie, loop=False, vol=0):
-        """Play the provided movied file, optionally looping it repeatedly."""
-        self.stop(3)  # Up to 3 second delay to let the old player stop.
+    def _spawn(self, movie, loop, vol, layer=None, paused=False):
+        """Start an omxplayer process for movie, optionally on a given display
+        layer and paused right away.  Returns the process and its D-Bus
+        controller (None if D-Bus control is disabled).
+        """
         # Assemble list of arguments.
         args = ['omxplayer']
         args.extend(['-o', self._sound])  # Add sound arguments.
@@ -38,35 +62,197 @@ class OMXPlayer(object):
             args.extend(['--vol', str(vol)])
         if loop:
             args.append('--loop')         # Add loop parameter if necessary.
+        if layer is not None:
+            args.extend(['--layer', str(layer)])
+        controller = None
+        if self._dbus_enabled:
+            # Unique bus name, the standby player runs next to this one.
+            self._spawned += 1
+            controller = omxplayer_dbus.OMXPlayerController('{0}.looper{1}_{2}'.format(
+                omxplayer_dbus.BUS_NAME_PREFIX, os.getpid(), self._spawned))
+            args.extend(['--dbus_name', controller.bus_name])
         args.append(movie)                # Add movie file path.
-        # Run omxplayer process and direct standard output to /dev/null.
-        self._process = subprocess.Popen(args,
-                                         stdout=open(os.devnull, 'wb'),
-                                         close_fds=True)
+        # Run omxplayer process and direct standard output to /dev/null.  It
+        # gets its own process group so stopping it never affects other
+        # omxplayer instances (like the standby player).  With standby enabled
+        # the keyboard input is a pipe used to pause and resume it.
+        process = self._supervisor.spawn(args,
+            stdin=subprocess.PIPE if self._standby_enabled else None)
+        if paused:
+            # Key presses are buffered until the player reads them, the D-Bus
+            # name is only registered once the player is up.
+            self._send_key(process, 'p')
+        return process, controller
+
+    def _send_key(self, process, key):
+        """Send a key press to omxplayer, returns False if it is gone."""
+        try:
+            process.stdin.write(key)
+            process.stdin.flush()
+            return True
+        except (IOError, OSError):
+            return False
+
+    def _report_transition(self, movie, promoted):
+        gap = None
+        if self._stopped_at is not None:
+            gap = time.time() - self._stopped_at
+        self._stopped_at = None
+        if self.on_transition is not None:
+            self.on_transition(movie, gap, promoted)
+
+    def play(self, movie, loop=False, vol=0):
+        """Play the provided movied file, optionally looping it repeatedly.
+        Returns True if a prepared standby player was promoted (the movie is
+        already on screen), False if a new player was started.
+        """
+        standby = self._standby
+        self._standby = None
+        if standby is not None:
+            process, key, layer, controller = standby
+            if key[:2] == (movie, loop) and process.poll() is None \
+                    and (key[2] == vol or self._apply_volume(controller, vol)):
+                self.stop(3)  # Normally the old player already exited.
+                if self._send_key(process, 'p'):  # Resume the paused player.
+                    self._process = process
+                    self._controller = controller
+                    self._layer = layer
+                    self._report_transition(movie, True)
+                    return True
+            self._supervisor.terminate(process)
+            if controller is not None:
+                controller.close()
+        self.stop(3)  # Up to 3 second delay to let the old player stop.
+        layer = None
+        if self._standby_enabled:
+            self._layer = BASE_LAYER
+            layer = self._layer
+        self._process, self._controller = self._spawn(movie, loop, vol, layer)
+        self._report_transition(movie, False)
+        return False
+
+    def prepare(self, movie, loop=False, vol=0):
+        """Start a standby player for the movie that plays next, paused on a
+        display layer below the current player, so play can promote it
+        without a gap.  Does nothing if standby is disabled.
+        """
+        if not self._standby_enabled or loop:
+            return
+        if self.is_prepared(movie, loop, vol):
+            return
+        self.discard()
+        layer = self._layer - 1
+        if layer < 1:
+            # No room left below the current player, the next movie will be
+            # started fresh on the base layer.
+            return
+        process, controller = self._spawn(movie, loop, vol, layer, paused=True)
+        self._standby = (process, (movie, loop, vol), layer, controller)
+
+    def is_prepared(self, movie, loop=False, vol=0):
+        """Return true if a standby player is ready for the movie."""
+        return self._standby is not None \
+            and self._standby[1] == (movie, loop, vol) \
+            and self._standby[0].poll() is None
+
+    def _apply_volume(self, controller, vol):
+        """Set the volume of a player over D-Bus, returns true if it worked."""
+        if controller is None:
+            return False
+        try:
+            controller.set_volume(vol)
+            return True
+        except omxplayer_dbus.ControlError:
+            return False
+
+    def _control(self, method, *args):
+        """Call a method of the D-Bus controller of the playing movie.  Returns
+        a tuple (ok, result), ok is False if the player can't be controlled.
+        """
+        if self._controller is None or not self.is_playing():
+            return False, None
+        try:
+            return True, getattr(self._controller, method)(*args)
+        except omxplayer_dbus.ControlError:
+            return False, None
+
+    def pause(self):
+        """Pause the playing movie, returns true if it worked."""
+        return self._control('pause')[0]
+
+    def resume(self):
+        """Resume the paused movie, returns true if it worked."""
+        return self._control('resume')[0]
+
+    def seek(self, offset):
+        """Seek offset seconds from the current position, returns true if it
+        worked.
+        """
+        return self._control('seek', offset)[0]
+
+    def restart(self):
+        """Play the movie on screen from the start again without restarting
+        the player, returns true if it worked.
+        """
+        return self._control('set_position', 0)[0]
+
+    def position(self):
+        """Return the playback position in seconds, None if unknown."""
+        return self._control('position')[1]
+
+    def set_volume(self, vol):
+        """Change the volume (in millibels) of the playing movie and the
+        standby player without restarting them.  Returns true if the playing
+        movie took it, otherwise it applies from the next movie.
+        """
+        if self._standby is not None and self._standby[1][2] != vol:
+            process, key, layer, controller = self._standby
+            if self._apply_volume(controller, vol):
+                self._standby = (process, key[:2] + (vol,), layer, controller)
+        return self._control('set_volume', vol)[0]
+
+    def discard(self):
+        """Stop the standby player, if any."""
+        if self._standby is not None:
+            self._supervisor.terminate(self._standby[0])
+            if self._standby[3] is not None:
+                self._standby[3].close()
+            self._standby = None
 
     def is_playing(self):
         """Return true if the video player is running, false otherwise."""
+        self._supervisor.reap()
         if self._process is None:
             return False
         self._process.poll()
+        if self._process.returncode is not None and self._stopped_at is None:
+            self._stopped_at = time.time()
         return self._process.returncode is None
 
+    def last_teardown(self):
+        """Return how many seconds the last stopped player took to exit."""
+        return self._supervisor.last_teardown
+
     def stop(self, block_timeout_sec=None):
         """Stop the video player.  block_timeout_sec is how many seconds to
-        block waiting for the player to stop before moving on.
+        block waiting for the player to stop before moving on (None waits the
+        supervisor's grace period, kills it and waits KILL_WAIT more, then
+        gives up on a player that still did not exit).  With a timeout of 0
+        the player is asked to exit and is_playing stays true until it did.
         """
-        # Stop the player if it's running.
-        if self._process is not None and self._process.returncode is None:
-            # There are a couple processes used by omxplayer, so kill both
-            # with a pkill command.
-            subprocess.call(['pkill', '-9', 'omxplayer'])
-        # If a blocking timeout was specified, wait up to that amount of time
-        # for the process to stop.
-        start = time.time()
-        while self._process is not None and self._process.returncode is None:
-            if (time.time() - start) >= block_timeout_sec:
-                break
-            time.sleep(0)
+        if self._process is None:
+            return
+        # There are a couple processes used by omxplayer, so the whole
+        # process group is stopped.
+        if block_timeout_sec == 0:
+            self._supervisor.terminate(self._process)
+            return
+        self._supervisor.stop(self._process, block_timeout_sec)
+        if self._stopped_at is None:
+            self._stopped_at = time.time()
+        if self._controller is not None:
+            self._controller.close()
+            self._controller = None
         # Let the process be garbage collected.
         self._process = None
 
@@ -0,0 +1,143 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import math
+import os
+
+# dbus-python is optional, without it omxplayer is controlled through its
+# keyboard input only.
+try:
+    import dbus
+except ImportError:
+    dbus = None
+
+
+# D-Bus names of the MPRIS interface omxplayer implements.
+BUS_NAME_PREFIX = 'org.mpris.MediaPlayer2.omxplayer'
+OBJECT_PATH = '/org/mpris/MediaPlayer2'
+PLAYER_INTERFACE = 'org.mpris.MediaPlayer2.Player'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+
+# File where the omxplayer launch script stores the address of its session bus.
+ADDRESS_FILE = '/tmp/omxplayerdbus.{0}'
+
+
+def available():
+    """Return true if the dbus module is installed."""
+    return dbus is not None
+
+
+class ControlError(Exception):
+    """Raised when a player can't be reached or refused a command."""
+    pass
+
+
+class OMXPlayerController(object):
+    """Controls a running omxplayer over its D-Bus MPRIS interface: pause,
+    resume, seek, volume and position, without restarting the process.  The
+    player must be started with --dbus_name set to the bus name given here.
+    The connection is made on first use, so the controller can be created
+    before the player registered its name.  Every call raises ControlError
+    if the player can't be reached.
+    """
+
+    def __init__(self, bus_name, address=None, timeout=1.0):
+        """Bus_name is the --dbus_name of the player.  Address is the D-Bus
+        address to connect to, by default the session bus of omxplayer (read
+        from ADDRESS_FILE) or DBUS_SESSION_BUS_ADDRESS.  Timeout is the number
+        of seconds to wait for each reply.
+        """
+        if dbus is None:
+            raise ControlError('The dbus module is not installed')
+        self.bus_name = bus_name
+        self._address = address
+        self._timeout = timeout
+        self._bus = None
+        self._player = None
+        self._properties = None
+
+    def _bus_address(self):
+        if self._address is not None:
+            return self._address
+        path = ADDRESS_FILE.format(os.environ.get('USER', 'root'))
+        try:
+            with open(path) as infile:
+                address = infile.read().strip()
+        except IOError:
+            address = os.environ.get('DBUS_SESSION_BUS_ADDRESS')
+        if not address:
+            raise ControlError('No D-Bus address for omxplayer')
+        return address
+
+    def _connect(self):
+        if self._player is not None:
+            return
+        try:
+            bus = dbus.bus.BusConnection(self._bus_address())
+            if not bus.name_has_owner(self.bus_name):
+                raise ControlError('{0} is not on the bus'.format(self.bus_name))
+            proxy = bus.get_object(self.bus_name, OBJECT_PATH, introspect=False)
+        except dbus.exceptions.DBusException, err:
+            raise ControlError(str(err))
+        self._bus = bus
+        self._player = dbus.Interface(proxy, PLAYER_INTERFACE)
+        self._properties = dbus.Interface(proxy, PROPERTIES_INTERFACE)
+
+    def _call(self, interface, method, *args):
+        self._connect()
+        target = self._player if interface == PLAYER_INTERFACE else self._properties
+        try:
+            return getattr(target, method)(*args, timeout=self._timeout)
+        except dbus.exceptions.DBusException, err:
+            # The player may have exited, connect again on the next call.
+            self.close()
+            raise ControlError(str(err))
+
+    def is_ready(self):
+        """Return true if the player registered its name on the bus."""
+        try:
+            self._connect()
+            return True
+        except ControlError:
+            return False
+
+    def pause(self):
+        self._call(PLAYER_INTERFACE, 'Pause')
+
+    def resume(self):
+        self._call(PLAYER_INTERFACE, 'Play')
+
+    def seek(self, offset):
+        """Seek offset seconds relative to the current position."""
+        self._call(PLAYER_INTERFACE, 'Seek', dbus.Int64(int(offset * 1000000)))
+
+    def set_position(self, position):
+        """Seek to position seconds from the start."""
+        self._call(PLAYER_INTERFACE, 'SetPosition',
+                   dbus.ObjectPath('/not/used'), dbus.Int64(int(position * 1000000)))
+
+    def position(self):
+        """Return the playback position in seconds."""
+        return self._call(PROPERTIES_INTERFACE, 'Get', PLAYER_INTERFACE,
+                          'Position') / 1000000.0
+
+    def duration(self):
+        """Return the length of the movie in seconds."""
+        return self._call(PROPERTIES_INTERFACE, 'Get', PLAYER_INTERFACE,
+                          'Duration') / 1000000.0
+
+    def set_volume(self, millibels):
+        """Set the volume in millibels, like the --vol option."""
+        self._call(PROPERTIES_INTERFACE, 'Set', PLAYER_INTERFACE, 'Volume',
+                   dbus.Double(math.pow(10, millibels / 2000.0)))
+
+    def close(self):
+        """Drop the connection, the next call connects again."""
+        if self._bus is not None:
+            try:
+                self._bus.close()
+            except dbus.exceptions.DBusException:
+                pass
+        self._bus = None
+        self._player = None
+        self._properties = None
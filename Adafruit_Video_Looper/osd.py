@@ -0,0 +1,108 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import pygame
+
+
+# Font sizes of the on screen display.
+SMALL_FONT = 50
+BIG_FONT = 250
+
+
+class OSDRenderer(object):
+    """Draws the on screen display messages (countdown, idle and waiting for
+    content) with as little work per frame as possible.  Rendered labels and
+    digit glyphs are cached, so numbers are composed from glyphs instead of
+    rendering text every frame.  Only the rectangles that changed since the
+    previous frame are erased and pushed to the display, the whole screen is
+    only repainted after something else drew on it (see invalidate).  The
+    font module and the fonts are loaded on first use.
+    """
+
+    def __init__(self, screen, fgcolor, bgcolor, update=None):
+        """Update is a function update(rects) showing the rectangles of the
+        screen that changed (everything if rects is None), by default the
+        pygame display update.
+        """
+        self._screen = screen
+        self._update = update
+        self._fgcolor = fgcolor
+        self._bgcolor = bgcolor
+        self._fonts = {}
+        self._labels = {}
+        # Blits and rectangles of the frame on screen.
+        self._blits = None
+        self._rects = []
+
+    def _font(self, size):
+        """Return the default font at size, loaded on first use."""
+        font = self._fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self._fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def label(self, text, size=SMALL_FONT):
+        """Return the cached surface of text rendered with the configured
+        foreground and background color.
+        """
+        key = (text, size)
+        surface = self._labels.get(key)
+        if surface is None:
+            surface = self._font(size).render(text, True, self._fgcolor,
+                                              self._bgcolor)
+            self._labels[key] = surface
+        return surface
+
+    def glyphs(self, text, size=SMALL_FONT):
+        """Return text as a list of cached single character surfaces, for text
+        that changes every frame like the countdown digits.
+        """
+        return [self.label(ch, size) for ch in text]
+
+    def centered(self, surfaces, y):
+        """Return the blits that draw the surfaces side by side, centered
+        horizontally with the top at y.
+        """
+        sw = self._screen.get_width()
+        x = sw/2 - sum(x.get_width() for x in surfaces)/2
+        blits = []
+        for surface in surfaces:
+            blits.append((surface, (x, y)))
+            x += surface.get_width()
+        return blits
+
+    def _show(self, rects):
+        if self._update is not None:
+            self._update(rects)
+        elif rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+    def invalidate(self):
+        """Forget the frame on screen, the next draw repaints everything."""
+        self._blits = None
+        self._rects = []
+
+    def draw(self, blits):
+        """Show a frame made of (surface, position) blits on the background
+        color.  Only the regions of the previous and the new frame are updated.
+        """
+        if blits == self._blits:
+            return
+        rects = [pygame.Rect(pos, surface.get_size()) for surface, pos in blits]
+        if self._blits is None:
+            self._screen.fill(self._bgcolor)
+            for surface, pos in blits:
+                self._screen.blit(surface, pos)
+            self._show(None)
+        else:
+            for rect in self._rects:
+                self._screen.fill(self._bgcolor, rect)
+            for surface, pos in blits:
+                self._screen.blit(surface, pos)
+            self._show(self._rects + rects)
+        self._blits = blits
+        self._rects = rects
@@ -0,0 +1,139 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import os
+import time
+
+from model import is_image
+
+
+# Event kinds of a playout plan.
+ITEM_START = 'start'
+ITEM_END = 'end'
+FEEDBACK = 'feedback'
+SCHEDULE_CHANGE = 'schedule'
+
+# Upper bound of planned feedback ticks of a looped movie.
+MAX_FEEDBACK_TICKS = 100
+
+
+class PlannedEvent(object):
+    """One entry of the playout timeline.  Time is in epoch seconds, or None if
+    it depends on something that can't be predicted (like the end of a video).
+    """
+
+    __slots__ = ('time', 'kind', 'path')
+
+    def __init__(self, time, kind, path=None):
+        self.time = time
+        self.kind = kind
+        self.path = path
+
+
+class PlayoutPlanner(object):
+    """Computes the upcoming playout timeline from the playlist and the screen
+    times: the end of the item on screen, feedback ticks of a looped movie,
+    schedule window boundaries and the start/end of the next items.  The main
+    loop uses it to sleep until the next due event instead of waking on a
+    fixed interval, and the plan can be dumped for inspection.
+    """
+
+    def __init__(self, lookahead=5, horizon=3600, duration_of=None):
+        """Lookahead is the number of upcoming playlist items to plan and
+        horizon the number of seconds of feedback ticks to plan ahead.
+        Duration_of is an optional function returning the duration of a movie
+        in seconds (or None if unknown), used to plan when videos end.
+        """
+        self._lookahead = lookahead
+        self._horizon = horizon
+        self._duration_of = duration_of
+        self._events = []
+        self._planned_at = None
+
+    def plan(self, playlist, now, path, start, screen_time, loop=False):
+        """Build the timeline for the item path that started on screen at
+        start (epoch seconds).  Screen_time is its screen time in seconds or
+        None.  Loop is True if it is a movie playing in loop mode, whose
+        screen time is the feedback period.
+        """
+        events = [PlannedEvent(start, ITEM_START, path)]
+        end = None
+        if screen_time is not None and loop:
+            tick = start + screen_time
+            for _ in xrange(MAX_FEEDBACK_TICKS):
+                if tick > now + self._horizon:
+                    break
+                events.append(PlannedEvent(tick, FEEDBACK, path))
+                tick += screen_time
+        elif not loop:
+            length = self._length(path, screen_time)
+            if length is not None:
+                end = start + length
+        if not loop:
+            events.append(PlannedEvent(end, ITEM_END, path))
+            # Chain the following items as long as their length is known.
+            for entry in playlist.upcoming(self._lookahead):
+                events.append(PlannedEvent(end, ITEM_START, entry.path))
+                length = self._length(entry.path, entry.screen_time)
+                if end is not None and length is not None:
+                    end += length
+                else:
+                    end = None
+                events.append(PlannedEvent(end, ITEM_END, entry.path))
+        boundary = playlist.next_schedule_change()
+        if boundary != float('inf'):
+            events.append(PlannedEvent(boundary, SCHEDULE_CHANGE))
+        # Known times first in order, unpredictable ones keep playlist order.
+        events.sort(key=lambda x: (x.time is None, x.time))
+        self._events = events
+        self._planned_at = now
+
+    def _length(self, path, screen_time):
+        """Return how long an item stays on screen: the screen time of an
+        image, the probed duration of a movie, None if unknown.
+        """
+        if is_image(path):
+            return screen_time
+        if self._duration_of is not None:
+            return self._duration_of(path)
+        return None
+
+    def clear(self):
+        """Forget the current plan, e.g. while nothing is on screen."""
+        self._events = []
+        self._planned_at = None
+
+    def next_due(self, now):
+        """Return the time of the first event after now, or None if no event
+        with a known time is planned.
+        """
+        for event in self._events:
+            if event.time is not None and event.time > now:
+                return event.time
+        return None
+
+    def time_until_next(self, now):
+        """Return the number of seconds until the next due event (infinity if
+        none is planned).
+        """
+        due = self.next_due(now)
+        if due is None:
+            return float('inf')
+        return max(0.0, due - now)
+
+    def dump(self):
+        """Return the plan as human readable text."""
+        if self._planned_at is None:
+            return 'No playout plan.'
+        lines = ['Playout plan made at {0}:'.format(_format_time(self._planned_at))]
+        for event in self._events:
+            lines.append('  {0:<19}  {1:<8}  {2}'.format(
+                _format_time(event.time), event.kind,
+                os.path.basename(event.path) if event.path else ''))
+        return '\n'.join(lines)
+
+
+def _format_time(value):
+    if value is None:
+        return '?'
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(value))
@@ -0,0 +1,91 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import collections
+import time
+
+
+# Playback states.
+COUNTDOWN = 'countdown'
+IDLE = 'idle'
+SHOWING_IMAGE = 'showing image'
+STARTING_VIDEO = 'starting video'
+PLAYING = 'playing'
+STOPPING = 'stopping'
+WAITING_FOR_CONTENT = 'waiting for content'
+
+# States that can follow each state.
+TRANSITIONS = {
+    COUNTDOWN: (IDLE,),
+    IDLE: (SHOWING_IMAGE, STARTING_VIDEO, WAITING_FOR_CONTENT),
+    SHOWING_IMAGE: (IDLE,),
+    STARTING_VIDEO: (PLAYING, STOPPING, IDLE),
+    PLAYING: (STOPPING, IDLE),
+    STOPPING: (IDLE,),
+    WAITING_FOR_CONTENT: (IDLE,),
+}
+
+# Number of transitions kept for inspection.
+HISTORY_LENGTH = 20
+
+
+class PlaybackState(object):
+    """State of the playback state machine and the deadline of its next timed
+    transition.  Nothing here ever sleeps: the main loop runs the handler of
+    the current state whenever it wakes up and blocks in the reactor no
+    longer than time_until_deadline, so it reacts to keys, content changes
+    and player exits in every state.
+    """
+
+    def __init__(self, initial=IDLE, clock=time.time):
+        self._clock = clock
+        self.state = initial
+        self.entered_at = clock()
+        self.deadline = None
+        self.history = collections.deque(maxlen=HISTORY_LENGTH)
+
+    def enter(self, state, dwell=None):
+        """Move to state, with a deadline dwell seconds from now (None for no
+        deadline).  Raises ValueError on a transition the state machine does
+        not allow.
+        """
+        if state not in TRANSITIONS[self.state]:
+            raise ValueError('Invalid playback transition: {0} -> {1}'.format(
+                self.state, state))
+        now = self._clock()
+        self.history.append((now, self.state, state))
+        self.state = state
+        self.entered_at = now
+        self.set_deadline(dwell, now)
+
+    def set_deadline(self, dwell, now=None):
+        """Set the deadline to dwell seconds from now, None clears it."""
+        if dwell is None:
+            self.deadline = None
+        else:
+            self.deadline = (self._clock() if now is None else now) + dwell
+
+    def is_due(self, now=None):
+        """Return true if the deadline has passed."""
+        if self.deadline is None:
+            return False
+        return (self._clock() if now is None else now) >= self.deadline
+
+    def time_until_deadline(self, now=None):
+        """Return the seconds until the deadline (infinity if none)."""
+        if self.deadline is None:
+            return float('inf')
+        return max(0.0, self.deadline - (self._clock() if now is None else now))
+
+    def dump(self):
+        """Return the state and the recent transitions as human readable text."""
+        lines = ['Playback state: {0} since {1}'.format(
+            self.state, _format_time(self.entered_at))]
+        for at, old, new in self.history:
+            lines.append('  {0}  {1} -> {2}'.format(_format_time(at), old, new))
+        return '\n'.join(lines)
+
+
+def _format_time(value):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(value)) + \
+        '.{0:03d}'.format(int(value * 1000) % 1000)
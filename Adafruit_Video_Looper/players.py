@@ -0,0 +1,126 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import os
+
+
+class PlayerRouter(object):
+    """Video player that dispatches each movie to the first of several player
+    backends that supports it, so one playlist can mix raw H264 loops played
+    seamlessly by hello_video with movies played by omxplayer.  All backends
+    are created up front and stay loaded.  The standby player for the next
+    movie is prepared by its own backend, also when that is not the backend
+    playing now, so switching backends is as quick as staying on one where
+    the backend supports standby players (omxplayer does, hello_video can't
+    start paused).  It has the same interface as the players it routes to.
+    """
+
+    def __init__(self, players):
+        """Players is a list of (name, player) tuples in order of preference."""
+        self._players = players
+        self._active = None
+        self._on_transition = None
+        # Optional function probe(path) returning the format of a movie (like
+        # 'h264' for a raw H264 stream) or None, used before the extension.
+        self.probe = None
+
+    def _get_on_transition(self):
+        return self._on_transition
+
+    def _set_on_transition(self, hook):
+        self._on_transition = hook
+        for _, player in self._players:
+            player.on_transition = hook
+
+    on_transition = property(_get_on_transition, _set_on_transition)
+
+    def supported_extensions(self):
+        """Return list of file extensions supported by any backend."""
+        extensions = []
+        for _, player in self._players:
+            for extension in player.supported_extensions():
+                if extension not in extensions:
+                    extensions.append(extension)
+        return extensions
+
+    def player_for(self, movie):
+        """Return the (name, player) tuple of the backend that plays movie."""
+        kinds = []
+        if self.probe is not None:
+            kind = self.probe(movie)
+            if kind:
+                kinds.append(kind.lower())
+        kinds.append(os.path.splitext(movie)[1][1:].lower())
+        for kind in kinds:
+            for name, player in self._players:
+                if kind in player.supported_extensions():
+                    return name, player
+        # Let the preferred backend report what it can't play.
+        return self._players[0]
+
+    def play(self, movie, loop=False, vol=0):
+        """Play movie with its backend, stopping the movie of another backend
+        first.  Returns what the backend returns (True if a standby player
+        was promoted).
+        """
+        _, player = self.player_for(movie)
+        if self._active is not None and self._active is not player:
+            self._active.stop(3)
+        self._active = player
+        return player.play(movie, loop=loop, vol=vol)
+
+    def prepare(self, movie, loop=False, vol=0):
+        for _, player in self._players:
+            if player is not self.player_for(movie)[1]:
+                player.discard()
+        self.player_for(movie)[1].prepare(movie, loop=loop, vol=vol)
+
+    def is_prepared(self, movie, loop=False, vol=0):
+        return self.player_for(movie)[1].is_prepared(movie, loop=loop, vol=vol)
+
+    def discard(self):
+        for _, player in self._players:
+            player.discard()
+
+    def is_playing(self):
+        return self._active is not None and self._active.is_playing()
+
+    def stop(self, block_timeout_sec=None):
+        if self._active is not None:
+            self._active.stop(block_timeout_sec)
+
+    def last_teardown(self):
+        if self._active is None:
+            return None
+        return self._active.last_teardown()
+
+    def pause(self):
+        return self._active is not None and self._active.pause()
+
+    def resume(self):
+        return self._active is not None and self._active.resume()
+
+    def seek(self, offset):
+        return self._active is not None and self._active.seek(offset)
+
+    def restart(self):
+        return self._active is not None and self._active.restart()
+
+    def position(self):
+        if self._active is None:
+            return None
+        return self._active.position()
+
+    def set_volume(self, vol):
+        """Set the volume of every backend, returns true if the playing movie
+        took it.
+        """
+        applied = False
+        for _, player in self._players:
+            if player.set_volume(vol) and player is self._active:
+                applied = True
+        return applied
+
+    def describe(self):
+        """Return the backend names in order of preference."""
+        return ', '.join(name for name, _ in self._players)
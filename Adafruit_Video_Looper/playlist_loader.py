@@ -0,0 +1,244 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import cPickle as pickle
+import os
+import time
+
+from model import PlaylistEntry, parse_timestamp, parse_time_of_day
+
+
+# Bump when the parsed entry layout changes so stale caches are ignored.
+CACHE_VERSION = 2
+
+# Maximum number of line numbers kept per issue kind in the report.
+MAX_REPORTED_LINES = 10
+
+
+class LoadReport(object):
+    """Structured validation report of a playlist.ini load.  Issues are
+    grouped by kind with the line numbers they occurred on, so a broken
+    playlist produces one summary instead of a log line per field.
+    """
+
+    def __init__(self, playlist_path):
+        self.playlist_path = playlist_path
+        self.lines = 0
+        self.entries = 0
+        self.from_cache = False
+        self.elapsed = 0.0
+        self.error = None
+        self.issues = {}
+        self._counts = {}
+
+    def add(self, kind, line_no):
+        """Record an issue of the given kind on a (1 based) line number."""
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        lines = self.issues.setdefault(kind, [])
+        if len(lines) < MAX_REPORTED_LINES:
+            lines.append(line_no)
+
+    def count(self, kind=None):
+        """Return the number of issues of a kind, or of all kinds if None."""
+        if kind is None:
+            return sum(self._counts.values())
+        return self._counts.get(kind, 0)
+
+    def summary(self):
+        """Return the report as a single human readable line."""
+        message = 'Loaded {0} of {1} playlist entries from {2} in {3:.3f}s ({4})'.format(
+            self.entries, self.lines, self.playlist_path, self.elapsed,
+            'cached' if self.from_cache else 'parsed')
+        if self.error is not None:
+            message += '; error: {0}'.format(self.error)
+        if self._counts:
+            details = []
+            for kind in sorted(self._counts):
+                lines = ', '.join(str(x) for x in self.issues[kind])
+                if self._counts[kind] > len(self.issues[kind]):
+                    lines += ', ...'
+                details.append('{0} x{1} (lines {2})'.format(kind, self._counts[kind], lines))
+            message += '; {0} issues: {1}'.format(self.count(), '; '.join(details))
+        return message
+
+
+class PlaylistLoader(object):
+    """Loads playlist.ini from the content directory into PlaylistEntry
+    records.
+
+    The parsed entries are written to a binary cache keyed on the mtime and
+    size of playlist.ini and the mtime of the content directory (which changes
+    whenever files are added, removed or renamed).  A warm start only stats
+    those two paths and unpickles the cache, skipping parsing and the per
+    entry existence checks entirely.
+
+    With a content index the cache is keyed on its generation instead, so
+    changes in subdirectories are seen too, and entries are checked against
+    the index instead of the disk.
+    """
+
+    def __init__(self, content_path, cache_path=None, content_index=None):
+        """Create a loader for the playlist.ini in content_path.  Cache_path is
+        an optional file path for the compiled cache, None or empty disables
+        caching.  Content_index is an optional ContentIndex of content_path,
+        rescanned on each load.
+        """
+        self._content_path = content_path
+        self._playlist_path = os.path.join(content_path, 'playlist.ini')
+        self._cache_path = cache_path or None
+        self._index = content_index
+
+    def _cache_key(self):
+        playlist_stat = os.stat(self._playlist_path)
+        if self._index is not None:
+            content_key = ('index', self._index.generation)
+        else:
+            content_key = os.stat(self._content_path).st_mtime
+        return (CACHE_VERSION, self._content_path, playlist_stat.st_mtime,
+                playlist_stat.st_size, content_key)
+
+    def load(self):
+        """Return a tuple (entries, report) with the list of PlaylistEntry
+        records of all existing files and the LoadReport of the load.
+        """
+        start = time.time()
+        report = LoadReport(self._playlist_path)
+        entries = []
+        if self._index is not None:
+            self._index.scan()
+        try:
+            key = self._cache_key()
+        except OSError, err:
+            report.error = str(err)
+            report.elapsed = time.time() - start
+            return entries, report
+        cached = self._read_cache(key)
+        if cached is not None:
+            rows, report = cached
+            entries = [PlaylistEntry(*row) for row in rows]
+            report.from_cache = True
+        else:
+            try:
+                with open(self._playlist_path) as playlist_file:
+                    entries = self._parse(playlist_file, report)
+            except (IOError, OSError), err:
+                report.error = str(err)
+            else:
+                self._write_cache(key, entries, report)
+        report.elapsed = time.time() - start
+        return entries, report
+
+    def _parse(self, lines, report):
+        """Parse playlist lines into entries, recording issues in report.
+        Line format (everything after FILENAME is optional):
+        POSITION:=:FILENAME:=:START(%Y%m%d%H%M%S):=:END(%Y%m%d%H%M%S):=:ISTART(%H%M%S):=:IEND(%H%M%S):=:SCREEN_TIME(SECONDS):=:SEND_FEEDBACK(T/F):=:WEIGHT:=:PLAYS_PER_HOUR
+        """
+        names = set()
+        if self._index is None:
+            try:
+                # One directory listing instead of an exists() call per entry.
+                names = set(os.listdir(self._content_path))
+            except OSError:
+                pass
+        entries = []
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            report.lines += 1
+            fields = [x.strip() for x in line.split(':=:')]
+            fields.extend([''] * (10 - len(fields)))
+            name = fields[1]
+            if not name:
+                report.add('malformed line', line_no)
+                continue
+            start = end = None
+            if fields[2] or fields[3]:
+                try:
+                    start = parse_timestamp(fields[2])
+                    end = parse_timestamp(fields[3])
+                except (OverflowError, ValueError):
+                    start = end = None
+                    report.add('invalid period', line_no)
+            istart = iend = None
+            if fields[4] or fields[5]:
+                try:
+                    istart = parse_time_of_day(fields[4])
+                    iend = parse_time_of_day(fields[5])
+                except ValueError:
+                    istart = iend = None
+                    report.add('invalid daily window', line_no)
+            screen_time = 10
+            if fields[6] and fields[6] != '-':
+                try:
+                    screen_time = int(fields[6])
+                except ValueError:
+                    report.add('invalid screen time', line_no)
+            send_feedback = True
+            if fields[7]:
+                send_feedback = fields[7] == 'T'
+                if fields[7] != 'F' and not send_feedback:
+                    report.add('invalid feedback flag', line_no)
+            weight = 1.0
+            if fields[8]:
+                try:
+                    weight = float(fields[8])
+                    if weight <= 0:
+                        raise ValueError(fields[8])
+                except ValueError:
+                    weight = 1.0
+                    report.add('invalid weight', line_no)
+            hourly_budget = None
+            if fields[9]:
+                try:
+                    hourly_budget = int(fields[9])
+                    if hourly_budget <= 0:
+                        raise ValueError(fields[9])
+                except ValueError:
+                    hourly_budget = None
+                    report.add('invalid plays per hour', line_no)
+            if self._index is not None:
+                exists = self._index.contains(name)
+            elif '/' in name:
+                exists = os.path.exists(os.path.join(self._content_path, name))
+            else:
+                exists = name in names
+            if not exists:
+                report.add('missing file', line_no)
+                continue
+            entries.append(PlaylistEntry(self._content_path + '/' + name,
+                                         start, end, istart, iend,
+                                         screen_time, send_feedback,
+                                         weight, hourly_budget))
+        report.entries = len(entries)
+        return entries
+
+    def _read_cache(self, key):
+        """Return (rows, report) from the cache if it matches key, else None."""
+        if self._cache_path is None:
+            return None
+        try:
+            with open(self._cache_path, 'rb') as cache_file:
+                cached_key, rows, report = pickle.load(cache_file)
+        except Exception:
+            # Missing, truncated or incompatible cache, just parse again.
+            return None
+        if cached_key != key:
+            return None
+        return rows, report
+
+    def _write_cache(self, key, entries, report):
+        if self._cache_path is None:
+            return
+        rows = [tuple(getattr(entry, name) for name in PlaylistEntry.__slots__)
+                for entry in entries]
+        temp_path = self._cache_path + '.tmp'
+        try:
+            cache_dir = os.path.dirname(self._cache_path)
+            if cache_dir and not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            with open(temp_path, 'wb') as cache_file:
+                pickle.dump((key, rows, report), cache_file, pickle.HIGHEST_PROTOCOL)
+            # Atomic replace so a power cut never leaves a half written cache.
+            os.rename(temp_path, self._cache_path)
+        except (IOError, OSError):
+            pass
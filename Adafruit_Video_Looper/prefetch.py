@@ -0,0 +1,171 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import errno
+import fcntl
+import os
+import Queue
+import threading
+
+from model import is_image
+
+
+# Size of the reads used to pull the start of a video into the page cache.
+_READ_SIZE = 256 * 1024
+
+
+class Prefetcher(object):
+    """Prepares the upcoming playlist items on a worker thread: images are
+    decoded and scaled to screen size, and the start of video files is read
+    so the player finds it in the page cache.  The main loop hands it the
+    lookahead of the playlist with request() and picks up finished images
+    with collect(), which stores them in the surface cache.  Nothing ever
+    waits for the worker; an image that is not ready in time is decoded by
+    the main loop as before.  The file descriptor becomes readable when a
+    decoded image is ready to be collected.  Images are not decoded ahead if
+    the cache is disabled, they would be thrown away.
+
+    The worker only makes software surfaces of its own and never touches the
+    display; anything that needs the display (like convert() to its pixel
+    format) is done by finish, on the main thread in collect().
+    """
+
+    def __init__(self, cache, decode, finish=None, warm_bytes=1024 * 1024):
+        """Cache is the SurfaceCache to fill.  Decode is a thread safe
+        function decode(path, size) returning the scaled surface and finish
+        an optional function run on the main thread on each decoded surface
+        before it is cached (like converting it to the display format).
+        Warm_bytes is how much of the start of each video file to read.
+        """
+        self._cache = cache
+        self._decode = decode
+        self._finish = finish
+        self._warm_bytes = warm_bytes
+        self._cond = threading.Condition()
+        self._pending = []
+        self._running = True
+        self._results = Queue.Queue()
+        self._read_fd, self._write_fd = os.pipe()
+        for fd in (self._read_fd, self._write_fd):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+        # Cache keys requested but not collected yet, and warmed video files.
+        self._in_flight = set()
+        self._warmed = set()
+        self._thread = threading.Thread(target=self._work, name='prefetch')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def request(self, paths, size):
+        """Replace the pending work with the upcoming paths, in play order.
+        Images already cached or being decoded are skipped, jobs still queued
+        keep their place in the new order.
+        """
+        requested = []
+        for path in paths:
+            try:
+                requested.append((path, self._cache.key(path, size)))
+            except OSError:
+                continue  # File is gone, the playlist will catch up.
+        with self._cond:
+            queued = set(key for _, key in self._pending)
+            jobs = []
+            kept = set()
+            for path, key in requested:
+                if key in queued:
+                    if key not in kept:
+                        kept.add(key)
+                        jobs.append((path, key))
+                    continue
+                if is_image(path):
+                    if not self._cache.enabled() or key in self._cache \
+                            or key in self._in_flight:
+                        continue
+                    self._in_flight.add(key)
+                elif key[:3] in self._warmed:
+                    continue
+                else:
+                    self._warmed.add(key[:3])
+                jobs.append((path, key))
+            # Dropped jobs are requested again once they come up.
+            for _, key in self._pending:
+                if key not in kept:
+                    self._in_flight.discard(key)
+                    self._warmed.discard(key[:3])
+            self._pending = jobs
+            self._cond.notify()
+
+    def played(self, path):
+        """Forget that a video was warmed up once it played, so it is warmed
+        up again before its next showing (the page cache may have dropped it
+        meanwhile).
+        """
+        self._warmed = set(x for x in self._warmed if x[0] != path)
+
+    def fileno(self):
+        return self._read_fd
+
+    def is_pending(self, key):
+        """Return true if the image with the cache key is still being decoded."""
+        return key in self._in_flight
+
+    def collect(self):
+        """Move the finished images into the cache, returns how many."""
+        try:
+            while os.read(self._read_fd, 512):
+                pass
+        except OSError, err:
+            if err.errno not in (errno.EAGAIN, errno.EINTR):
+                raise
+        count = 0
+        while True:
+            try:
+                key, surface = self._results.get_nowait()
+            except Queue.Empty:
+                return count
+            self._in_flight.discard(key)
+            if surface is None:
+                continue
+            if self._finish is not None:
+                surface = self._finish(surface)
+            self._cache.put(key, surface)
+            count += 1
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = []
+            self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                path, key = self._pending.pop(0)
+            if is_image(path):
+                try:
+                    surface = self._decode(path, key[3])
+                except Exception:
+                    surface = None  # The main loop reports it when shown.
+                self._results.put((key, surface))
+                try:
+                    os.write(self._write_fd, 'x')
+                except OSError:
+                    pass  # Pipe full, the main loop is awake anyway.
+            else:
+                self._warm(path)
+
+    def _warm(self, path):
+        """Read the start of a video file into the page cache."""
+        try:
+            with open(path, 'rb') as infile:
+                remaining = self._warm_bytes
+                while remaining > 0:
+                    data = infile.read(min(_READ_SIZE, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+        except IOError:
+            pass
@@ -0,0 +1,124 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import errno
+import os
+import signal
+import subprocess
+import time
+
+
+# Seconds a player gets to exit after SIGTERM before it is killed.
+TERMINATE_GRACE = 1.0
+
+# Seconds to wait for a killed process to be reaped when stop has no timeout.
+KILL_WAIT = 5.0
+
+# Shortest and longest sleep between two polls while waiting for an exit.
+_MIN_POLL_SLEEP = 0.001
+_MAX_POLL_SLEEP = 0.05
+
+
+class ProcessSupervisor(object):
+    """Starts player processes in their own process group and stops them:
+    SIGTERM to the whole group first, SIGKILL once the grace period is over,
+    and the process is reaped with waitpid (through Popen.poll) either way.
+    Waits sleep between polls with a real timeout instead of spinning.
+    Processes stopped without waiting are escalated and reaped by reap(),
+    which the players call whenever they are polled.
+    """
+
+    def __init__(self, grace=TERMINATE_GRACE):
+        self._grace = grace
+        # Processes being stopped, mapped to the time SIGTERM was sent.
+        self._stopping = {}
+        # Seconds between SIGTERM and the exit of the last stopped process.
+        self.last_teardown = None
+
+    def spawn(self, args, stdin=None):
+        """Start args in a new process group with standard output directed to
+        /dev/null and return the Popen object.
+        """
+        return subprocess.Popen(args,
+                                stdin=stdin,
+                                stdout=open(os.devnull, 'wb'),
+                                close_fds=True,
+                                preexec_fn=os.setsid)
+
+    def _signal(self, process, signum):
+        try:
+            os.killpg(process.pid, signum)
+        except OSError, err:
+            if err.errno != errno.ESRCH:
+                raise
+
+    def _exited(self, process):
+        """Poll process and finish its teardown if it exited."""
+        if process.poll() is None:
+            return False
+        signalled_at = self._stopping.pop(process, None)
+        if signalled_at is not None:
+            self.last_teardown = time.time() - signalled_at
+        if process.stdin is not None:
+            try:
+                process.stdin.close()
+            except (IOError, OSError):
+                pass
+        return True
+
+    def terminate(self, process):
+        """Ask the process group to exit without waiting for it."""
+        if self._exited(process) or process in self._stopping:
+            return
+        self._stopping[process] = time.time()
+        self._signal(process, signal.SIGTERM)
+
+    def wait(self, process, timeout):
+        """Wait up to timeout seconds (forever if None) for process to exit,
+        returns true if it did.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        delay = _MIN_POLL_SLEEP
+        while not self._exited(process):
+            now = time.time()
+            if deadline is not None and now >= deadline:
+                return False
+            if deadline is not None:
+                delay = min(delay, deadline - now)
+            time.sleep(delay)
+            delay = min(delay * 2, _MAX_POLL_SLEEP)
+        return True
+
+    def stop(self, process, timeout=None):
+        """Stop the process group, blocking at most timeout seconds (None for
+        the grace period plus KILL_WAIT).  Returns the teardown time in
+        seconds, or None if the process is still running after timeout.
+        """
+        if self._exited(process):
+            return 0.0
+        self.terminate(process)
+        signalled_at = self._stopping[process]
+        end = None if timeout is None else time.time() + timeout
+        grace_end = signalled_at + self._grace
+        if end is not None:
+            grace_end = min(grace_end, end)
+        if self.wait(process, max(0.0, grace_end - time.time())):
+            return self.last_teardown
+        self._signal(process, signal.SIGKILL)
+        remaining = KILL_WAIT if end is None else max(0.0, end - time.time())
+        if self.wait(process, remaining):
+            return self.last_teardown
+        return None
+
+    def reap(self):
+        """Reap stopped processes that exited and kill the ones whose grace
+        period is over.  Never blocks.
+        """
+        now = time.time()
+        for process, signalled_at in self._stopping.items():
+            if not self._exited(process) and now >= signalled_at + self._grace:
+                self._signal(process, signal.SIGKILL)
+
+    def is_stopping(self):
+        """Return true if stopped processes are still waiting to exit."""
+        return len(self._stopping) > 0
@@ -0,0 +1,100 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import errno
+import fcntl
+import os
+import select
+import signal
+
+
+def _set_nonblocking(fd):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+
+class ChildWatcher(object):
+    """Self-pipe that becomes readable when a child process (like the video
+    player) exits.  SIGCHLD is delivered to a no-op handler and the signal
+    wakeup fd writes a byte to the pipe, so a reactor blocked in epoll wakes
+    up the moment the player exits.  Must be created in the main thread.
+    """
+
+    def __init__(self):
+        self._read_fd, self._write_fd = os.pipe()
+        _set_nonblocking(self._read_fd)
+        _set_nonblocking(self._write_fd)
+        signal.signal(signal.SIGCHLD, self._on_sigchld)
+        # Restart interrupted system calls instead of failing with EINTR.
+        signal.siginterrupt(signal.SIGCHLD, False)
+        signal.set_wakeup_fd(self._write_fd)
+
+    def _on_sigchld(self, signum, frame):
+        # Nothing to do, the wakeup fd already woke the reactor.  Children are
+        # reaped by their owners through Popen.poll.
+        pass
+
+    def fileno(self):
+        return self._read_fd
+
+    def drain(self):
+        """Consume all pending wakeup bytes."""
+        try:
+            while os.read(self._read_fd, 512):
+                pass
+        except OSError, err:
+            if err.errno not in (errno.EAGAIN, errno.EINTR):
+                raise
+
+
+class Reactor(object):
+    """Waits on file descriptors (player exit, udev, inotify, ...) with epoll,
+    or poll where epoll is not available, instead of sleeping on a fixed
+    interval.  Timers are handled by the wait timeout, which the caller sets
+    to the time left until the next planned event.
+    """
+
+    def __init__(self):
+        if hasattr(select, 'epoll'):
+            self._poller = select.epoll()
+            self._scale = 1.0
+        else:
+            self._poller = select.poll()
+            self._scale = 1000.0
+        self._callbacks = {}
+
+    def register(self, source, callback=None):
+        """Wake up when source (a file descriptor or an object with fileno())
+        becomes readable and call callback(), if provided, when it does.
+        """
+        fd = source if isinstance(source, int) else source.fileno()
+        self._poller.register(fd, select.POLLIN)
+        self._callbacks[fd] = callback
+
+    def unregister(self, source):
+        fd = source if isinstance(source, int) else source.fileno()
+        if fd in self._callbacks:
+            self._poller.unregister(fd)
+            del self._callbacks[fd]
+
+    def wait(self, timeout=None):
+        """Block until a registered source is readable or timeout seconds
+        passed (forever if None or infinite).  Runs the callbacks of the ready
+        sources and returns how many were ready.
+        """
+        if timeout is None or timeout == float('inf'):
+            timeout = -1
+        else:
+            timeout = max(0.0, timeout) * self._scale
+        try:
+            ready = self._poller.poll(timeout)
+        except (IOError, OSError, select.error), err:
+            if err.args[0] != errno.EINTR:
+                raise
+            # Interrupted by a signal (like SIGCHLD), collect what is ready now.
+            ready = self._poller.poll(0)
+        for fd, _ in ready:
+            callback = self._callbacks.get(fd)
+            if callback is not None:
+                callback()
+        return len(ready)
@@ -0,0 +1,316 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import bisect
+import collections
+import heapq
+import random
+import time
+
+
+class ScheduleIndex(object):
+    """Interval index over the start/end and istart/iend restrictions of a
+    playlist.
+
+    Restrictions of the PlaylistEntry records are compiled once into epoch
+    periods and seconds-of-day windows.  The set of active playlist positions
+    is kept as a bitmap plus a sorted list of indices and is only recomputed
+    when the clock crosses the next period or daily window boundary.  Between
+    boundaries every lookup is O(1) or O(log n) and costs a single clock read.
+    """
+
+    def __init__(self, entries, clock=time.time):
+        """Compile the play restrictions of a list of PlaylistEntry records.
+        Clock is a function returning the current time in epoch seconds.
+        """
+        self._clock = clock
+        self._periods = []
+        self._windows = []
+        period_bounds = set()
+        daily_bounds = set()
+        for entry in entries:
+            period = None
+            if not (entry.start is None or entry.end is None):
+                period = (entry.start, entry.end)
+                period_bounds.update(period)
+            window = None
+            if not (entry.istart is None or entry.iend is None):
+                window = (entry.istart, entry.iend)
+                daily_bounds.update(window)
+            self._periods.append(period)
+            self._windows.append(window)
+        self._period_bounds = sorted(period_bounds)
+        self._daily_bounds = sorted(daily_bounds)
+        self._flags = bytearray(len(self._periods))
+        self._active = []
+        self._valid_from = None
+        self._valid_until = None
+        # Incremented on every rebuild of the active set.
+        self.generation = 0
+
+    def refresh(self):
+        """Read the clock once and rebuild the active set if a schedule
+        boundary was crossed (or the clock went backwards).  Returns the time
+        that was read.
+        """
+        now = self._clock()
+        if self._valid_until is None or now >= self._valid_until \
+                or now < self._valid_from:
+            self._rebuild(now)
+        return now
+
+    def _rebuild(self, now):
+        local = time.localtime(now)
+        sod = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+        flags = bytearray(len(self._periods))
+        active = []
+        periods = self._periods
+        windows = self._windows
+        for i in xrange(len(periods)):
+            period = periods[i]
+            if period is not None and not (period[0] <= now < period[1]):
+                continue
+            window = windows[i]
+            if window is not None and not (window[0] <= sod < window[1]):
+                continue
+            flags[i] = 1
+            active.append(i)
+        self._flags = flags
+        self._active = active
+        self._valid_from = now
+        self._valid_until = self._next_boundary(now, local, sod)
+        self.generation += 1
+
+    def _next_boundary(self, now, local, sod):
+        """Return the epoch time of the first period or daily window boundary
+        strictly after now.
+        """
+        until = float('inf')
+        k = bisect.bisect_right(self._period_bounds, now)
+        if k < len(self._period_bounds):
+            until = self._period_bounds[k]
+        if self._daily_bounds:
+            k = bisect.bisect_right(self._daily_bounds, sod)
+            day = local.tm_mday
+            if k == len(self._daily_bounds):
+                # Wrap to the first window boundary of tomorrow.
+                k = 0
+                day += 1
+            hours, rest = divmod(self._daily_bounds[k], 3600)
+            minutes, seconds = divmod(rest, 60)
+            boundary = time.mktime((local.tm_year, local.tm_mon, day,
+                                    hours, minutes, seconds, 0, 0, -1))
+            # Guard against DST folds mapping the boundary into the past.
+            if boundary <= now:
+                boundary = now + 1
+            until = min(until, boundary)
+        return until
+
+    def next_boundary(self):
+        """Return the epoch time at which the active set changes next, as of
+        the last refresh (infinity if it never changes).
+        """
+        return self._valid_until
+
+    def is_active(self, index):
+        """Return True if the position is active as of the last refresh."""
+        return self._flags[index] == 1
+
+    def count(self):
+        """Return the number of active positions as of the last refresh."""
+        return len(self._active)
+
+    def active(self):
+        """Return the sorted list of active positions as of the last refresh.
+        The list must not be modified by the caller.
+        """
+        return self._active
+
+    def next_active(self, index):
+        """Return a tuple (position, wrapped) with the first active position at
+        or after index, wrapping around to the start of the playlist.  Returns
+        None if nothing is active.
+        """
+        if not self._active:
+            return None
+        wrapped = False
+        if index >= len(self._flags):
+            index = 0
+            wrapped = True
+        k = bisect.bisect_left(self._active, index)
+        if k < len(self._active):
+            return (self._active[k], wrapped)
+        return (self._active[0], True)
+
+    def prev_active(self, index):
+        """Return the last active position strictly before index, wrapping
+        around to the end of the playlist.  Returns None if nothing is active.
+        """
+        if not self._active:
+            return None
+        k = bisect.bisect_left(self._active, index) - 1
+        if k >= 0:
+            return self._active[k]
+        return self._active[-1]
+
+
+class ShuffleBag(object):
+    """Random play order drawn as successive permutations ("bags") of the
+    active playlist positions.  Every active position plays once per bag, the
+    first position of a bag never repeats the last one of the previous bag,
+    and the upcoming positions can be looked ahead without consuming them.
+    """
+
+    def __init__(self, rng=random):
+        self._rng = rng
+        # Queue of (position, first_of_bag) tuples.
+        self._queue = collections.deque()
+        self._tail = None
+
+    def clear(self):
+        """Drop all drawn positions, e.g. after the playlist entries changed."""
+        self._queue.clear()
+        self._tail = None
+
+    def _refill(self, active):
+        bag = list(active)
+        self._rng.shuffle(bag)
+        if len(bag) > 1 and bag[0] == self._tail:
+            swap = self._rng.randrange(1, len(bag))
+            bag[0], bag[swap] = bag[swap], bag[0]
+        self._queue.append((bag[0], True))
+        self._queue.extend((x, False) for x in bag[1:])
+        self._tail = bag[-1]
+
+    def peek(self, schedule, count=1):
+        """Return the list of the next count active positions without
+        consuming them.  Positions that went off schedule since they were drawn
+        are dropped, and new bags are drawn as needed.
+        """
+        upcoming = []
+        i = 0
+        while len(upcoming) < count:
+            if i >= len(self._queue):
+                if schedule.count() == 0:
+                    break
+                self._refill(schedule.active())
+            index = self._queue[i][0]
+            if schedule.is_active(index):
+                upcoming.append(index)
+                i += 1
+            else:
+                del self._queue[i]
+        return upcoming
+
+    def pop(self, schedule):
+        """Consume and return a tuple (position, first_of_bag) for the next
+        active position, or None if nothing is active.
+        """
+        if not self.peek(schedule, 1):
+            return None
+        return self._queue.popleft()
+
+
+class WeightedScheduler(object):
+    """Share-of-voice order using stride scheduling.
+
+    Every position has a virtual pass value that advances by 1/weight each
+    time it plays, and the active position with the lowest pass plays next.
+    This interleaves items smoothly in proportion to their weights while a
+    pick stays O(log n) through a heap.  Positions with an hourly budget are
+    parked once they played that many times in the current clock hour, and
+    only fill in when nothing else is left to play.  The heaps are rebuilt
+    when the schedule's active set changes or the hour rolls over.
+    """
+
+    def __init__(self, entries):
+        self._paths = [entry.path for entry in entries]
+        self._strides = [1.0 / entry.weight for entry in entries]
+        self._budgets = [entry.hourly_budget for entry in entries]
+        self._passes = [0.0] * len(entries)
+        self._plays = {}
+        self._heap = []
+        self._spent = []
+        self._virtual = 0.0
+        self._hour = None
+        self._generation = None
+
+    def inherit(self, other):
+        """Carry pass values and this hour's play counts over from the
+        scheduler of a previous version of the playlist, matched by path.
+        """
+        passes = {}
+        plays = {}
+        for index, path in enumerate(other._paths):
+            passes[path] = other._passes[index]
+            if index in other._plays:
+                plays[path] = plays.get(path, 0) + other._plays[index]
+        for index, path in enumerate(self._paths):
+            if path in passes:
+                self._passes[index] = passes[path]
+            if path in plays:
+                self._plays[index] = plays.pop(path)
+        self._virtual = other._virtual
+        self._hour = other._hour
+
+    def _exhausted(self, index):
+        budget = self._budgets[index]
+        return budget is not None and self._plays.get(index, 0) >= budget
+
+    def _sync(self, schedule, now):
+        """Rebuild the heaps if the active set changed or the hour rolled."""
+        hour = time.localtime(now)[:4]
+        if hour != self._hour:
+            self._hour = hour
+            self._plays = {}
+        elif schedule.generation == self._generation and (self._heap or self._spent):
+            return
+        self._generation = schedule.generation
+        self._heap = []
+        self._spent = []
+        for index in schedule.active():
+            # Positions (re)joining start at the current virtual time instead
+            # of bursting to catch up on the plays they missed.
+            self._passes[index] = max(self._passes[index], self._virtual)
+            item = (self._passes[index], index)
+            if self._exhausted(index):
+                self._spent.append(item)
+            else:
+                self._heap.append(item)
+        heapq.heapify(self._heap)
+        heapq.heapify(self._spent)
+
+    def peek(self, schedule, now, count=1):
+        """Return the list of the next count positions without consuming
+        them.
+        """
+        self._sync(schedule, now)
+        if count == 1:
+            heap = self._heap or self._spent
+            return [heap[0][1]] if heap else []
+        state = (list(self._heap), list(self._spent), list(self._passes),
+                 dict(self._plays), self._virtual)
+        try:
+            return [x for x in (self.pop(schedule, now) for _ in xrange(count))
+                    if x is not None]
+        finally:
+            self._heap, self._spent, self._passes, self._plays, self._virtual = state
+
+    def pop(self, schedule, now):
+        """Consume and return the next position, or None if nothing is
+        active.
+        """
+        self._sync(schedule, now)
+        heap = self._heap or self._spent
+        if not heap:
+            return None
+        pass_value, index = heapq.heappop(heap)
+        self._virtual = pass_value
+        self._passes[index] += self._strides[index]
+        self._plays[index] = self._plays.get(index, 0) + 1
+        item = (self._passes[index], index)
+        if heap is self._heap and self._exhausted(index):
+            heapq.heappush(self._spent, item)
+        else:
+            heapq.heappush(heap, item)
+        return index
@@ -0,0 +1,86 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import collections
+import os
+
+
+def surface_bytes(surface):
+    """Return the number of bytes of pixel data held by a pygame surface."""
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
+
+class SurfaceCache(object):
+    """LRU cache of decoded images already scaled to screen size, so showing
+    an image again is a single blit instead of a decode and a rescale.
+    Entries are keyed on path, mtime, file size and target size, so a
+    replaced file is decoded again.  The least recently used surfaces are
+    evicted once the pixel data exceeds the byte budget.
+    """
+
+    def __init__(self, max_bytes, load):
+        """Max_bytes is the memory budget (0 disables caching) and load a
+        function load(path, size) returning the surface of path scaled to
+        size.
+        """
+        self._max_bytes = max_bytes
+        self._load = load
+        self._surfaces = collections.OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path, size):
+        """Return the cache key of path scaled to size, raises OSError if path
+        does not exist.
+        """
+        st = os.stat(path)
+        return (path, st.st_mtime, st.st_size, tuple(size))
+
+    def enabled(self):
+        """Return true if the budget lets the cache hold surfaces at all."""
+        return self._max_bytes > 0
+
+    def __contains__(self, key):
+        return key in self._surfaces
+
+    def get(self, path, size):
+        """Return the surface of path scaled to size, from the cache if
+        possible.  Raises the errors of load (and OSError if path is gone).
+        """
+        key = self.key(path, size)
+        surface = self._surfaces.pop(key, None)
+        if surface is not None:
+            self._surfaces[key] = surface  # Most recently used goes last.
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self._load(path, size)
+        self.put(key, surface)
+        return surface
+
+    def put(self, key, surface):
+        """Store a surface under a key made by the cache, evicting the least
+        recently used ones to stay within the budget.
+        """
+        if key in self._surfaces:
+            self._bytes -= surface_bytes(self._surfaces.pop(key))
+        nbytes = surface_bytes(surface)
+        if nbytes > self._max_bytes:
+            return  # Would evict everything else, don't cache it.
+        self._surfaces[key] = surface
+        self._bytes += nbytes
+        while self._bytes > self._max_bytes:
+            _, old = self._surfaces.popitem(last=False)
+            self._bytes -= surface_bytes(old)
+
+    def clear(self):
+        self._surfaces.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """Return a one line description of the cache usage."""
+        return 'Image cache: {0} surfaces, {1:.1f} of {2:.1f} MB, {3} hits, {4} misses'.format(
+            len(self._surfaces), self._bytes / 1048576.0,
+            self._max_bytes / 1048576.0, self.hits, self.misses)
@@ -0,0 +1,78 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+import os
+import time
+
+
+def process_start_time():
+    """Return the epoch time at which this process was started (from
+    /proc/self/stat), or None if it can't be determined.
+    """
+    try:
+        with open('/proc/self/stat') as infile:
+            # Fields after the command name, which may contain spaces.
+            fields = infile.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as infile:
+            uptime = float(infile.read().split()[0])
+        started = float(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+    return time.time() - (uptime - started)
+
+
+def device_serial(path='/proc/cpuinfo'):
+    """Return the last 8 characters of the board serial number, with
+    characters other than letters, digits, '.', '_' and '-' replaced by '_'.
+    Returns an empty string if there is no serial number.
+    """
+    try:
+        with open(path) as infile:
+            for line in infile:
+                if line.startswith('Serial'):
+                    serial = line.split(':', 1)[-1].strip()
+                    return ''.join(x if x.isalnum() or x in '._-' else '_'
+                                   for x in serial[-8:])
+    except IOError:
+        pass
+    return ''
+
+
+class StartupTimeline(object):
+    """Records how long each startup step took, from the start of the process
+    to the first frame on screen.
+    """
+
+    def __init__(self):
+        self._start = process_start_time()
+        self._marks = []
+        self._reported = False
+
+    def mark(self, step):
+        """Record that step just finished."""
+        self._marks.append((step, time.time()))
+
+    def summary(self):
+        """Return the timeline as human readable text."""
+        start = self._start
+        if start is None:
+            start = self._marks[0][1] if self._marks else time.time()
+            lines = ['Startup timeline (process start unknown):']
+        else:
+            lines = ['Startup timeline:']
+        previous = start
+        for step, at in self._marks:
+            lines.append('  {0:>7.3f}s  (+{1:.3f}s)  {2}'.format(
+                at - start, at - previous, step))
+            previous = at
+        return '\n'.join(lines)
+
+    def report_once(self, step):
+        """Mark the final step and return the summary the first time it is
+        called, None afterwards.
+        """
+        if self._reported:
+            return None
+        self._reported = True
+        self.mark(step)
+        return self.summary()
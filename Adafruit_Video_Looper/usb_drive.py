@@ -36,6 +36,16 @@ class USBDriveReader(object):
         """
         return self._mounter.poll_changes()
 
+    def fileno(self):
+        """Return a file descriptor that becomes readable when a USB drive
+        changes.
+        """
+        return self._mounter.fileno()
+
+    def time_until_settled(self, now):
+        """Changes are reported right away, returns infinity."""
+        return float('inf')
+
     def idle_message(self):
         """Return a message to display when idle and no files are found."""
         return 'Insert USB drive with compatible movies.'
@@ -53,6 +53,12 @@ class USBDriveMounter(object):
         self._monitor.filter_by('block', 'partition')
         self._monitor.start()
 
+    def fileno(self):
+        """Return the file descriptor of the udev netlink monitor, readable when
+        a drive change is pending.
+        """
+        return self._monitor.fileno()
+
     def poll_changes(self):
         """Check for changes to USB drives.  Returns true if there was a USB 
         drive change, otherwise false.
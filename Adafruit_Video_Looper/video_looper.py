@@ -7,13 +7,82 @@ import os
 import re
 import sys
 import signal
+import threading
 import time
 
 import pygame
 
 import datetime
 from datetime import datetime
-from model import Playlist
+from conditioner import ContentConditioner
+from content_index import ContentIndex
+from framebuffer import Framebuffer
+from image_ingest import ImageIngest
+from media_index import MediaIndex
+from model import Playlist, is_image
+from osd import BIG_FONT, OSDRenderer
+from playback import (COUNTDOWN, IDLE, PLAYING, SHOWING_IMAGE, STARTING_VIDEO,
+                      STOPPING, WAITING_FOR_CONTENT, PlaybackState)
+from planner import PlayoutPlanner
+from prefetch import Prefetcher
+from players import PlayerRouter
+from playlist_loader import PlaylistLoader
+from reactor import ChildWatcher, Reactor
+from surface_cache import SurfaceCache
+from timeline import StartupTimeline, device_serial
+
+
+# Startup steps are timed from the start of the process, so the time spent
+# importing modules (pygame mostly) shows up too.
+_startup = StartupTimeline()
+_startup.mark('module imports')
+
+# Options added to video_looper.ini after the first release, with the values
+# the shipped file sets.  Config files installed by an older release don't
+# have them, these are used instead.
+CONFIG_DEFAULTS = (
+    ('video_looper', 'countdown_seconds', '10'),
+    ('video_looper', 'is_weighted', 'false'),
+    ('video_looper', 'display_backend', 'pygame'),
+    ('video_looper', 'framebuffer_device', '/dev/fb0'),
+    ('video_looper', 'framebuffer_fake', 'false'),
+    ('video_looper', 'poll_interval', '0.02'),
+    ('video_looper', 'idle_interval', '1'),
+    ('video_looper', 'background_dwell', '1'),
+    ('video_looper', 'video_start_dwell', '1'),
+    ('video_looper', 'content_retry_interval', '5'),
+    ('video_looper', 'stop_timeout', '3'),
+    ('video_looper', 'image_cache_mb', '64'),
+    ('video_looper', 'prefetch_count', '3'),
+    ('video_looper', 'video_warmup_mb', '1'),
+    ('video_looper', 'playlist_cache_path', '/var/tmp/video_looper/playlist.cache'),
+    ('video_looper', 'content_index_path', '/var/tmp/video_looper/content.index'),
+    ('video_looper', 'content_hash', 'false'),
+    ('video_looper', 'media_index_path', '/var/tmp/video_looper/media.index'),
+    ('video_looper', 'image_store_path', '/var/tmp/video_looper/images'),
+    ('directory', 'change_check_interval', '1'),
+    ('directory', 'settle_time', '0.5'),
+    ('directory', 'recursive', 'false'),
+    ('omxplayer', 'standby', 'false'),
+    ('omxplayer', 'dbus', 'true'),
+    ('conditioner', 'enabled', 'false'),
+    ('conditioner', 'output_path', '/var/tmp/video_looper/conditioned'),
+    ('conditioner', 'remux_to_h264', 'true'),
+    ('conditioner', 'transcode', 'false'),
+    ('conditioner', 'max_width', '0'),
+    ('conditioner', 'max_height', '0'),
+    ('conditioner', 'bitrate', '4M'),
+    ('conditioner', 'encoder', 'libx264'),
+)
+
+
+def add_config_defaults(config):
+    """Set the options of CONFIG_DEFAULTS that are missing in config."""
+    for section, option, value in CONFIG_DEFAULTS:
+        if not config.has_section(section):
+            config.add_section(section)
+        if not config.has_option(section, option):
+            config.set(section, option, value)
 
 
 # Basic video looper architecure:
@@ -30,11 +99,17 @@ from model import Playlist
 # - A file reader module needs to define at top level create_file_reader function
 #   that takes as a parameter a ConfigParser config object.  The function should
 #   return an instance of a file reader class.  See usb_drive.py and directory.py
-#   for the two provided file readers and their public interface.
+#   for the two provided file readers and their public interface.  A file
+#   reader can provide a fileno() file descriptor that becomes readable when
+#   is_changed would return true, so the main loop doesn't need to poll it,
+#   and time_until_settled tells when a change seen on it but held back (to
+#   wait for a burst of changes to end) is reported.
 #
 # - Similarly a video player modules needs to define a top level create_player
 #   function that takes in configuration.  See omxplayer.py and hello_video.py
-#   for the two provided video players and their public interface.
+#   for the two provided video players and their public interface.  Several
+#   players can be configured at once, players.py then routes each movie to
+#   the first one that supports it.
 #
 # - Future file readers and video players can be provided and referenced in the
 #   config to extend the video player use to read from different file sources
@@ -45,21 +120,62 @@ class VideoLooper(object):
         """Create an instance of the main video looper application class. Must
         pass path to a valid video looper ini configuration file.
         """
+        self._startup = _startup
         # Load the configuration.
         self._config = ConfigParser.SafeConfigParser()
         if len(self._config.read(config_path)) == 0:
             raise RuntimeError('Failed to find configuration file at {0}, is the application properly installed?'.format(config_path))
+        add_config_defaults(self._config)
         self._console_output = self._config.getboolean('video_looper', 'console_output')
         # Load configured video player and file reader modules.
         self._player = self._load_player()
+        self._player.on_transition = self._log_transition
         self._reader = self._load_file_reader()
         # Load other configuration values.
         self._osd = self._config.getboolean('video_looper', 'osd')
         self._is_random = self._config.getboolean('video_looper', 'is_random')
+        self._is_weighted = self._config.getboolean('video_looper', 'is_weighted')
         self._keyboard_control = self._config.getboolean('video_looper', 'keyboard_control')
         self._allow_esc_exit = self._config.getboolean('video_looper', 'allow_esc_exit') 
         self._bk_image_path = self._config.get('video_looper', 'bk_image_path')
+        self._poll_interval = self._config.getfloat('video_looper', 'poll_interval')
+        self._idle_interval = self._config.getfloat('video_looper', 'idle_interval')
+        self._background_dwell = self._config.getfloat('video_looper', 'background_dwell')
+        self._video_start_dwell = self._config.getfloat('video_looper', 'video_start_dwell')
+        self._content_retry_interval = self._config.getfloat('video_looper', 'content_retry_interval')
+        self._stop_timeout = self._config.getfloat('video_looper', 'stop_timeout')
+        self._playback = PlaybackState(IDLE)
+        # Durations and formats of the movies, probed in the background.
+        media_index_path = self._config.get('video_looper', 'media_index_path')
+        self._media_index = MediaIndex(media_index_path or None)
+        if isinstance(self._player, PlayerRouter):
+            self._player.probe = self._media_index.kind
+            self._print('Video players: ' + self._player.describe())
+        self._planner = PlayoutPlanner(duration_of=self._media_index.duration)
+        # Wake the main loop when the player exits or the content changes.
+        self._reactor = Reactor()
+        self._child_watcher = ChildWatcher()
+        self._reactor.register(self._child_watcher, self._child_watcher.drain)
+        self._reader_fd = self._reader.fileno()
+        if self._reader_fd is not None:
+            self._reactor.register(self._reader_fd)
         self._content_path = self._config.get('directory', 'path')
+        # Files of the content directory, rescanned where directories changed.
+        content_index_path = self._config.get('video_looper', 'content_index_path')
+        self._content_index = ContentIndex(self._content_path, content_index_path or None,
+            recursive=self._config.getboolean('directory', 'recursive'),
+            hash_files=self._config.getboolean('video_looper', 'content_hash'))
+        self._playlist_loader = PlaylistLoader(self._content_path,
+            self._config.get('video_looper', 'playlist_cache_path'), self._content_index)
+        self._countdown_seconds = self._config.getint('video_looper', 'countdown_seconds')
+        self._startup.mark('config, player and file reader')
+        # Load the playlist in the background while the display initializes,
+        # run() picks up the result.
+        self._preloaded = None
+        self._preload = threading.Thread(target=self._preload_playlist,
+                                         name='playlist')
+        self._preload.daemon = True
+        self._preload.start()
         # Parse string of 3 comma separated values like "255, 255, 255" into
         # list of ints for colors.
         self._bgcolor = map(int, self._config.get('video_looper', 'bgcolor') \
@@ -74,18 +190,70 @@ class VideoLooper(object):
         self._sound_vol = 0
         # Initialize pygame and display a blank screen.
         pygame.display.init()
-        pygame.font.init()
-        pygame.mouse.set_visible(False)
         self._size = (pygame.display.Info().current_w, pygame.display.Info().current_h)
-        self._screen = pygame.display.set_mode(self._size, pygame.FULLSCREEN)
+        self._framebuffer = None
+        if self._config.get('video_looper', 'display_backend') == 'framebuffer':
+            # Draw into the mapped framebuffer, pygame only converts images.
+            device = self._config.get('video_looper', 'framebuffer_device')
+            try:
+                self._framebuffer = Framebuffer(device, self._size,
+                    fake=self._config.getboolean('video_looper', 'framebuffer_fake'))
+            except (IOError, OSError, ValueError), err:
+                self._print('Could not open framebuffer {0} ({1}), using pygame'
+                            .format(device, err))
+        if self._framebuffer is not None:
+            self._size = self._framebuffer.size
+            self._screen = self._framebuffer.surface
+            if self._keyboard_control:
+                self._print('Keyboard control needs display_backend = pygame, disabled')
+                self._keyboard_control = False
+        else:
+            pygame.mouse.set_visible(False)
+            self._screen = pygame.display.set_mode(self._size, pygame.FULLSCREEN)
+        # What the screen shows: 'blank', 'background', the path of an image
+        # or None for anything else (text).  Used to skip needless repaints.
+        self._on_screen = None
+        # Scaled background image and the (mtime, size) of its file.
+        self._bk = None
+        self._bk_key = None
         self._blank_screen()
+        self._startup.mark('display')
+        # Serializes image decoding between the main loop and the workers.
+        self._decode_lock = threading.Lock()
+        # Images converted ahead of time to raw display surfaces.
+        image_store_path = self._config.get('video_looper', 'image_store_path')
+        self._ingest = None
+        if image_store_path:
+            self._ingest = ImageIngest(image_store_path, self._screen, self._size,
+                                       self._scale_image)
+        # Decoded images scaled to screen size, reused on every showing.
+        self._images = SurfaceCache(
+            int(self._config.getfloat('video_looper', 'image_cache_mb') * 1048576),
+            self._load_scaled_image)
+        # Decode the upcoming images and warm up the upcoming videos ahead.
+        self._prefetch_count = self._config.getint('video_looper', 'prefetch_count')
+        warmup_bytes = int(self._config.getfloat('video_looper', 'video_warmup_mb') * 1048576)
+        self._prefetcher = None
+        # Nothing to prepare ahead without an image cache or video warm up.
+        if self._prefetch_count > 0 and (self._images.enabled() or warmup_bytes > 0):
+            self._prefetcher = Prefetcher(self._images, self._decode_image,
+                                          self._to_display_format, warmup_bytes)
+            # Move decoded images into the cache as they finish, so the wake
+            # pipe is drained even when no image is waiting to be shown.
+            self._reactor.register(self._prefetcher, self._prefetcher.collect)
+        # Image to paint behind the playing movie once it is decoded.
+        self._backdrop = None
         # Set other static internal state.
         self._extensions = self._player.supported_extensions()
-        self._small_font = pygame.font.Font(None, 50)
-        self._big_font   = pygame.font.Font(None, 250)
+        self._osd_renderer = OSDRenderer(self._screen, self._fgcolor, self._bgcolor,
+                                         self._update_display)
+        # Converted copies of the movies that play better, made in the background.
+        self._conditioner = None
+        if self._config.getboolean('conditioner', 'enabled'):
+            self._conditioner = self._load_conditioner()
         self._running    = True
         #generate unique device ID
-        self._pid=os.popen("cat /proc/cpuinfo | grep Serial | cut -d ' ' -f 2 | tail -c 10 | sed -e 's/[^A-Za-z0-9._-]/_/g'").read()[1:-1]
+        self._pid=device_serial()
 
 
     def _print(self, message):
@@ -97,10 +265,52 @@ class VideoLooper(object):
             print(date_time_str+" : "+message)
 
     def _load_player(self):
-        """Load the configured video player and return an instance of it."""
-        module = self._config.get('video_looper', 'video_player')
-        return importlib.import_module('.' + module, 'Adafruit_Video_Looper') \
-            .create_player(self._config)
+        """Load the configured video player and return an instance of it.  With
+        a comma separated list of players, a router that plays each movie with
+        the first player supporting it is returned.
+        """
+        modules = [x.strip() for x in self._config.get('video_looper', 'video_player').split(',')
+                   if x.strip()]
+        players = [(module, importlib.import_module('.' + module, 'Adafruit_Video_Looper') \
+                                .create_player(self._config)) for module in modules]
+        if len(players) == 1:
+            return players[0][1]
+        return PlayerRouter(players)
+
+    def _update_display(self, rects=None):
+        """Show what was drawn on the screen surface: the rectangles that
+        changed, or everything if rects is None.
+        """
+        if self._framebuffer is not None:
+            self._framebuffer.update(rects)
+        elif rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def _load_conditioner(self):
+        """Create the content conditioner from the [conditioner] section, None
+        if ffmpeg is not installed.
+        """
+        width = self._config.getint('conditioner', 'max_width') or self._size[0]
+        height = self._config.getint('conditioner', 'max_height') or self._size[1]
+        conditioner = ContentConditioner(
+            self._config.get('conditioner', 'output_path'),
+            # Probes movies the media index did not get to yet, the header
+            # parser alone does not know the formats that need converting.
+            describe=self._media_index.probe,
+            # Raw H264 streams only play seamlessly with hello_video.
+            remux_to_h264=self._config.getboolean('conditioner', 'remux_to_h264') and
+                          'h264' in self._player.supported_extensions(),
+            transcode=self._config.getboolean('conditioner', 'transcode'),
+            max_size=(width, height),
+            bitrate=self._config.get('conditioner', 'bitrate'),
+            encoder=self._config.get('conditioner', 'encoder'),
+            report=self._print)
+        if not conditioner.available():
+            self._print('ffmpeg is not installed, movies are played as they are')
+            return None
+        return conditioner
 
     def _load_file_reader(self):
         """Load the configured file reader and return an instance of it."""
@@ -115,172 +325,261 @@ class VideoLooper(object):
         except ValueError:
             return False
 
-    def _buildPlaylist(self):
-        playlistTh=[]
-        playlistRestrictions=[]
+    def _preload_playlist(self):
+        """Load playlist.ini on the startup thread.  Errors are left for
+        _buildPlaylist to run into again and report on the main thread.
+        """
+        try:
+            self._preloaded = self._playlist_loader.load()
+        except Exception:
+            self._preloaded = None
+
+    def _load_entries(self):
+        """Load playlist.ini and print its report.  Returns the list of
+        PlaylistEntry records, or None if the load failed (a broken row or an
+        I/O error must not stop the looper).
+        """
         try:
-            playlist_path = self._content_path+'/playlist.ini'
-            #playlist line example
-            #1:=:FILENAME:=:START(%Y%m%d%H%M%S):=:END(%Y%m%d%H%M%S):=:ISTART(%H%M%S):=:IEND(%H%M%S):=:SCREEN_TIME(SECONDS):=:SEND_FEEDBACK(T/F)
-
-            with open(playlist_path) as myfile:
-                for line in myfile:
-                   self._print("------"+line)
-                   split_line = line.split(":=:")
-                   order=split_line[0].strip()
-                   name=split_line[1].strip()
-                   # Display period start time
-                   start = None
-                   # Display period end time
-                   end = None
-                   # hourly range start
-                   istart = None
-                   # hourly range end
-                   iend = None
-		   # number of seconds to diplay current position
-                   screen_time = "-"
-		   # log feedback
-                   send_feedback = "T"
-
-                   try:
-                     start_s=split_line[2].strip()
-                     end_s=split_line[3].strip()
-                     start = datetime.strptime(start_s, '%Y%m%d%H%M%S')
-                     end = datetime.strptime(end_s, '%Y%m%d%H%M%S')
-                   except Exception, err:
-                     if hasattr(err, 'message'):
-                         self._print(err.message)
-                     else:
-                         self._print(err)
-                     pass
-
-                   try:
-                     istart_s=split_line[4].strip()
-                     iend_s=split_line[5].strip()
-                     istart = datetime.strptime(istart_s, '%H%M%S')
-                     iend = datetime.strptime(iend_s, '%H%M%S')
-                   except Exception, err:
-                     if hasattr(err, 'message'):
-                        self._print(err.message)
-                     else:
-                        self._print(err)
-                     pass
-                   try:
-                     int(split_line[6].strip())
-                     screen_time=split_line[6].strip()
-                   except Exception, err:
-                     screen_time=10
-                     if hasattr(err, 'message'):
-                        self._print(err.message)
-                     else:
-                        self._print(err)
-                     pass
-                   try:
-                     if split_line[7].strip() == "T":
-                      send_feedback = "T"
-                     else :
-                      send_feedback = "F"
-                   except Exception, err:
-                     send_feedback = "T"
-                     if hasattr(err, 'message'):
-                        self._print(err.message)
-                     else:
-                        self._print(err)
-                     pass
-
-                   play_restriction={
-                        "start":start,
-                        "end":end,
-                        "istart":istart,
-                        "iend":iend,
-                        "screen_time":screen_time,
-                        "send_feedback":send_feedback
-                   }
-                   self._print(order+" - "+name+" - "+screen_time+" - "+str(play_restriction))
-                   fullPath=self._content_path+'/'+name
-                   if not os.path.exists(fullPath):
-                     continue
-                   playlistTh.append(fullPath)
-                   playlistRestrictions.append(play_restriction)
+            entries, report = self._playlist_loader.load()
         except Exception, err:
-            self._print("error");
-            if hasattr(err, 'message'):
-                self._print(err.message)
-            else:
-                self._print(err)
-            pass
-        return Playlist(playlistTh,playlistRestrictions,self._is_random)
+            self._print('Could not load playlist.ini: {0!r}'.format(err))
+            return None
+        self._print(report.summary())
+        return entries
+
+    def _buildPlaylist(self):
+        """Load playlist.ini from the content directory (or its compiled cache)
+        and return a new Playlist.  The first call uses the playlist loaded in
+        the background during startup.
+        """
+        loaded = None
+        if self._preload is not None:
+            self._preload.join()
+            self._preload = None
+            loaded = self._preloaded
+            self._preloaded = None
+        if loaded is None:
+            entries = self._load_entries() or []
+        else:
+            entries, report = loaded
+            self._print(report.summary())
+        self._sound_vol = self._read_sound_vol()
+        self._index_media(entries)
+        return Playlist(entries,self._is_random,is_weighted=self._is_weighted)
+
+    def _reload_playlist(self, playlist):
+        """Reload playlist.ini and stage the new entries into the live
+        playlist.  The item on screen keeps playing and the new entries are
+        swapped in at the next transition, without stopping the player or
+        showing the countdown again.  If the load fails the playlist is kept
+        as it is.
+        """
+        entries = self._load_entries()
+        if entries is None:
+            return
+        added, removed = playlist.update(entries)
+        self._print('Playlist changed: {0} added, {1} removed'.format(added, removed))
+        self._index_media(entries)
+        self._update_sound_vol()
+
+    def _index_media(self, entries):
+        """Probe the movies of the playlist that are not in the media index
+        and queue them for conditioning, and ingest the new images.
+        """
+        movies = [x.path for x in entries if not is_image(x.path)]
+        if self._ingest is not None:
+            self._ingest.request([x.path for x in entries if is_image(x.path)])
+        self._media_index.request(movies)
+        if self._conditioner is not None:
+            self._conditioner.request(movies)
+
+    def _playable(self, movie):
+        """Return the file to play for movie, its conditioned copy if ready."""
+        if self._conditioner is None:
+            return movie
+        return self._conditioner.resolve(movie)
+
+    def _read_sound_vol(self):
+        """Return the volume (millibels) from the sound volume file in the
+        content directory, 0 if there is none.
+        """
+        try:
+            with open(os.path.join(self._content_path, self._sound_vol_file)) as infile:
+                return int(infile.read().strip())
+        except (IOError, ValueError):
+            return 0
+
+    def _update_sound_vol(self):
+        """Read the sound volume file again and apply a new volume to the
+        playing movie right away where the player supports it.
+        """
+        vol = self._read_sound_vol()
+        if vol == self._sound_vol:
+            return
+        self._sound_vol = vol
+        if self._player.set_volume(vol):
+            self._print('Volume set to {0} mB'.format(vol))
+        else:
+            self._print('Volume set to {0} mB from the next movie'.format(vol))
+
+    def _scale_image(self, path, size):
+        """Decode an image file and scale it to size.  Called from the main
+        loop and the prefetch and ingest threads: it only makes new software
+        surfaces, never touches the display, and the decodes run one at a
+        time so the image libraries are never entered concurrently.
+        """
+        with self._decode_lock:
+            return pygame.transform.scale(pygame.image.load(path), size)
+
+    def _decode_image(self, path, size):
+        """Return an image scaled to size, from the ingested raw surface if
+        there is one.  Safe to call from any thread.
+        """
+        if self._ingest is not None:
+            surface = self._ingest.load(path, size)
+            if surface is not None:
+                return surface
+        return self._scale_image(path, size)
+
+    def _load_scaled_image(self, path, size):
+        """Decode an image and scale it to size in the display pixel format."""
+        return self._to_display_format(self._decode_image(path, size))
+
+    def _to_display_format(self, surface):
+        """Convert a surface to the display pixel format, unless it already
+        is (like ingested images).
+        """
+        if surface.get_bitsize() == self._screen.get_bitsize() and \
+           surface.get_masks() == self._screen.get_masks():
+            return surface
+        return surface.convert(self._screen)
+
+    def _get_image(self, path):
+        """Return the screen sized surface of an image, prefetched if ready."""
+        if self._prefetcher is not None:
+            self._prefetcher.collect()
+        return self._images.get(path, self._size)
+
+    def _paint_backdrop(self):
+        """Paint the next image behind the playing movie as soon as the
+        prefetcher decoded it, so the main loop never waits on the decode.
+        """
+        if self._backdrop is None:
+            return
+        if self._prefetcher is not None:
+            self._prefetcher.collect()
+            try:
+                key = self._images.key(self._backdrop, self._size)
+            except OSError:
+                self._backdrop = None
+                return
+            # Not decoded yet, check again when the prefetcher wakes us up.
+            if key not in self._images and self._prefetcher.is_pending(key):
+                return
+        self._print('Display next image in order to prevent black screen : {0}'.format(self._backdrop))
+        self._screen.blit(self._get_image(self._backdrop), (0,0))
+        self._update_display()
+        self._on_screen = self._backdrop
+        self._backdrop = None
+
+    def _prefetch(self, playlist):
+        """Queue the upcoming playlist items for prefetching."""
+        if self._prefetcher is not None:
+            self._prefetcher.request([x if is_image(x) else self._playable(x)
+                                      for x in playlist.lookahead(self._prefetch_count)],
+                                     self._size)
 
     def _blank_screen(self):
         """Render a blank screen filled with the background color."""
+        if self._on_screen == 'blank':
+            return
         self._screen.fill(self._bgcolor)
-        pygame.display.update()
+        self._update_display()
+        self._on_screen = 'blank'
 
     def _blank_screen_no_update(self):
         """Render a blank screen filled with the background color."""
         self._screen.fill(self._bgcolor)
+        self._on_screen = None
 
     def _set_background_image(self,playlist):
-        """Render background image
-           and load bg from disk if playlist index =0 
-        """
+        """Render background image, unless the screen already shows it."""
+        if self._on_screen == 'background':
+            return
         try:
            self._screen.blit(self._bk, (0, 0))
-           pygame.display.update()
+           self._update_display()
+           self._on_screen = 'background'
         except Exception, e:
            print('Failed to set background image '+ str(e))
 
     def _load_bg(self,playlist):
+        """Check the background image at the start of each playlist iteration
+        and decode it again only if the file changed, the scaled image is kept
+        in memory otherwise.
+        """
         try:
             isNewIteration = playlist.is_new_iteration()
             if isNewIteration:
-               self._has_bgk_image = False
-               bk=pygame.image.load(self._bk_image_path)
-               self._bk=pygame.transform.scale(bk, self._size)
-               self._has_bgk_image = True
                playlist.reset_new_iteration()
+               st = os.stat(self._bk_image_path)
+               key = (st.st_mtime, st.st_size)
+               if key != self._bk_key:
+                  self._has_bgk_image = False
+                  self._bk_key = None
+                  bk=pygame.image.load(self._bk_image_path)
+                  self._bk=pygame.transform.scale(bk, self._size).convert(self._screen)
+                  self._bk_key = key
+                  self._has_bgk_image = True
+                  if self._on_screen == 'background':
+                     self._on_screen = None
         except:
             self._print('Background image not found')
             self._has_bgk_image = False
+            self._bk_key = None
         pass
 
-    def _render_text(self, message, font=None):
-        """Draw the provided message and return as pygame surface of it rendered
-        with the configured foreground and background color.
+    def _draw_osd(self, blits):
+        """Draw an OSD frame, repainting the whole screen only if something
+        else was drawn since the last OSD frame.
         """
-        # Default to small font if not provided.
-        if font is None:
-            font = self._small_font
-        return font.render(message, True, self._fgcolor, self._bgcolor)
+        if self._on_screen != 'osd':
+            self._osd_renderer.invalidate()
+        self._osd_renderer.draw(blits)
+        self._on_screen = 'osd'
 
     def _animate_countdown(self, playlist, seconds=10):
-        """Print text with the number of loaded movies and a quick countdown
-        message if the on screen display is enabled.
+        """Print text with the number of loaded movies and start the countdown
+        if the on screen display is enabled.  The countdown is animated by
+        the COUNTDOWN state, one frame per second.
         """
         # Print message to console with number of movies in playlist.
         message = 'Found {0} movie{1}.'.format(playlist.length(), 
             's' if playlist.length() >= 2 else '')
         self._print(message)
+        self._countdown_message = message + ' Starting playback in:'
+        self._countdown_left = seconds
         # Do nothing else if the OSD is turned off.
-        if not self._osd:
+        if not self._osd or seconds <= 0:
             return
-        # Draw message with number of movies loaded and animate countdown.
-        # First render text that doesn't change and get static dimensions.
-        label1 = self._render_text(message + ' Starting playback in:')
-        l1w, l1h = label1.get_size()
-        sw, sh = self._screen.get_size()
-        for i in range(seconds, 0, -1):
-            # Each iteration of the countdown rendering changing text.
-            label2 = self._render_text(str(i), self._big_font)
-            l2w, l2h = label2.get_size()
-            # Clear screen and draw text with line1 above line2 and all
-            # centered horizontally and vertically.
-            self._screen.fill(self._bgcolor)
-            self._screen.blit(label1, (sw/2-l1w/2, sh/2-l2h/2-l1h))
-            self._screen.blit(label2, (sw/2-l2w/2, sh/2-l2h/2))
-            pygame.display.update()
-            # Pause for a second between each frame.
-            time.sleep(1)
+        self._playback = PlaybackState(COUNTDOWN)
+        self._draw_countdown(seconds)
+        self._playback.set_deadline(1)
+
+    def _draw_countdown(self, seconds):
+        """Draw one frame of the countdown with the message above the number.
+        The message is rendered once and the digits come from cached glyphs,
+        so each frame only updates the region of the changing number.
+        """
+        label1 = self._osd_renderer.label(self._countdown_message)
+        l1h = label1.get_height()
+        sh = self._screen.get_height()
+        label2 = self._osd_renderer.glyphs(str(seconds), BIG_FONT)
+        l2h = label2[0].get_height()
+        # Draw text with line1 above line2 and all centered horizontally
+        # and vertically.
+        self._draw_osd(self._osd_renderer.centered([label1], sh/2-l2h/2-l1h) +
+                       self._osd_renderer.centered(label2, sh/2-l2h/2))
 
     def _idle_message(self):
         """Print idle message from file reader."""
@@ -291,44 +590,36 @@ class VideoLooper(object):
         if not self._osd:
             return
         # Display idle message in center of screen.
-        label = self._render_text(message)
-        lw, lh = label.get_size()
-        sw, sh = self._screen.get_size()
-        self._screen.fill(self._bgcolor)
-        self._screen.blit(label, (sw/2-lw/2, sh/2-lh/2))
+        label = self._osd_renderer.label(message)
+        lh = label.get_height()
+        sh = self._screen.get_height()
+        blits = self._osd_renderer.centered([label], sh/2-lh/2)
         # If keyboard control is enabled, display message about it
         if self._keyboard_control:
-            label2 = self._render_text('press ESC to quit')
-            l2w, l2h = label2.get_size()
-            self._screen.blit(label2, (sw/2-l2w/2, sh/2-l2h/2+lh))
-        pygame.display.update()
+            label2 = self._osd_renderer.label('press ESC to quit')
+            blits += self._osd_renderer.centered([label2], sh/2-label2.get_height()/2+lh)
+        self._draw_osd(blits)
 
-    def _wait_content_message(self, seconds=10):
-        """Print idle message while no content found."""
-        # Print message to console.
-        message = "Waiting for content..."
-        self._print(message)
-        for i in range(seconds, 0, -1):
-           # Display waiting message in center of screen.
-           message = self._pid+" is waiting for content /"
-           if(i % 2):
-               message = self._pid+" is waiting for content \\"
-               label = self._render_text(message)
-               lw, lh = label.get_size()
-               sw, sh = self._screen.get_size()
-               self._screen.fill(self._bgcolor)
-               self._screen.blit(label, (sw/2-lw/2, sh/2-lh/2))
-               pygame.display.update()
-               # A second pause between changing frames.
-               time.sleep(1)
+    def _wait_content_message(self, frame):
+        """Draw frame number frame of the message shown while no content is
+        found, the spinner alternates between frames.
+        """
+        if frame % 2:
+            message = self._pid+" is waiting for content \\"
+        else:
+            message = self._pid+" is waiting for content /"
+        label = self._osd_renderer.label(message)
+        sh = self._screen.get_height()
+        self._draw_osd(self._osd_renderer.centered([label], sh/2-label.get_height()/2))
 
     def _prepare_to_run_playlist(self, playlist):
         """Display messages when a new playlist is loaded."""
         # If there are movies to play show a countdown first (if OSD enabled),
         # or if no movies are available show the idle message.
         if playlist.length() > 0:
-            self._animate_countdown(playlist)
-            self._blank_screen()
+            self._animate_countdown(playlist, self._countdown_seconds)
+            if self._playback.state != COUNTDOWN:
+                self._blank_screen()
         else:
             self._idle_message()
 
@@ -338,167 +629,352 @@ class VideoLooper(object):
             # Place here your code to record play feedback
             # you can use self._pid to identify the player
 
+    def _on_countdown(self, playlist):
+        """Next countdown frame every second, then start playing."""
+        if not self._playback.is_due():
+            return
+        self._countdown_left -= 1
+        if self._countdown_left > 0:
+            self._draw_countdown(self._countdown_left)
+            self._playback.set_deadline(1)
+        else:
+            self._blank_screen()
+            self._playback.enter(IDLE)
+
+    def _on_idle(self, playlist):
+        """Nothing on screen, start the next playlist position."""
+        self._backdrop = None
+        movie = playlist.get_next()
+        self._load_bg(playlist)
+        if movie is None:
+            self._print('No content.....: {0}')
+            self._print("Waiting for content...")
+            self._planner.clear()
+            self._blank_screen()
+            self._wait_frame = 0
+            self._wait_content_message(self._wait_frame)
+            # Look again after the retry interval, or as soon as the schedule
+            # activates something.
+            retry = min(self._content_retry_interval,
+                        playlist.next_schedule_change() - time.time())
+            self._playback.enter(WAITING_FOR_CONTENT, min(1, retry))
+            self._retry_at = time.time() + retry
+            return
+        self._movie = movie
+        self._cIndex = playlist.get_current_index()
+        self._print("---------------------------"+repr(self._cIndex)+"-"+movie+"-------------------------")
+        self._send_feedback = playlist.get_movie_send_feedback(self._cIndex)
+        #test if current position is jpg or png
+        if is_image(movie):
+            realName = os.path.basename(movie)
+            img = self._get_image(movie)
+            self._screen.blit(img, (0,0))
+            self._update_display()
+            self._on_screen = movie
+            self._report_startup()
+            self._prefetch(playlist)
+            self._current_start = time.time()
+            self._current_screen_time = playlist.get_position_screen_time(self._cIndex)
+            self._planner.plan(playlist, self._current_start, movie,
+                               self._current_start, self._current_screen_time)
+            self._prevImage = True
+            # Record play feedback
+            self._send_play_feedback(realName,self._send_feedback)
+            self._playback.enter(SHOWING_IMAGE, self._current_screen_time)
+        #current position is a video file
+        else:
+            # A prepared standby player cuts over without a gap.
+            isStandby = self._player.is_prepared(self._playable(movie), vol=self._sound_vol)
+            dwell = 0
+            if self._has_bgk_image and not self._prevImage and not self._isPrevKey and not isStandby:
+                 #one more second in order to have background visible
+                 dwell = self._background_dwell
+            self._prevImage = False
+            self._video_started = False
+            self._playback.enter(STARTING_VIDEO, dwell)
+
+    def _on_showing_image(self, playlist):
+        """Test if picture screen time is up. If yes, play next position."""
+        if self._playback.is_due():
+            self._print("Picture time's up")
+            self._playback.enter(IDLE)
+
+    def _on_starting_video(self, playlist):
+        """Start the player once the background dwell is over, then paint what
+        goes behind the movie once the player had time to cover the screen.
+        """
+        if not self._playback.is_due():
+            return
+        movie = self._movie
+        if not self._video_started:
+            self._video_started = True
+            self._current_start = time.time()
+            self._current_screen_time = playlist.get_position_screen_time(self._cIndex)
+            onlyOneActive = playlist.onlyOneActive()
+            if onlyOneActive and self._current_screen_time is not None:
+               self._isMovieLoop = True
+               self._feedback_file_name = os.path.basename(movie)
+            else:
+               self._isMovieLoop = False
+            playable = self._playable(movie)
+            isStandby = self._player.play(playable,loop=onlyOneActive, vol=self._sound_vol)
+            if self._prefetcher is not None:
+                self._prefetcher.played(playable)
+            self._report_startup()
+            dwell = self._video_start_dwell
+            if self._isPrevKey or isStandby:
+               dwell = 0
+            self._isPrevKey = False
+            self._planner.plan(playlist, time.time(), movie, self._current_start,
+                               self._current_screen_time, loop=self._isMovieLoop)
+            # Call WS to register video play sesion
+            self._send_play_feedback(str(os.path.basename(movie)),self._send_feedback)
+            self._prefetch(playlist)
+            self._playback.set_deadline(dwell)
+            if dwell > 0:
+               return
+        nextPosition = playlist.whats_next();
+        # if nextPosition is an image then will be drawn in background to prevent black screen between playlist positions
+        if nextPosition is not None:
+            if is_image(nextPosition):
+               self._backdrop = nextPosition
+               self._paint_backdrop()
+            else:
+               # Start the next movie paused below this one.
+               if not self._isMovieLoop:
+                  self._player.prepare(self._playable(nextPosition), vol=self._sound_vol)
+               if self._has_bgk_image and not self._prevImage:
+                  self._set_background_image(playlist)
+               else:
+                  self._blank_screen()
+        else:
+            if self._has_bgk_image and not self._prevImage:
+               self._set_background_image(playlist)
+            else:
+               self._blank_screen()
+        self._playback.enter(PLAYING)
+
+    def _on_playing(self, playlist):
+        """Wait for the player to exit, sending the feedback of each loop of a
+        movie playing in loop mode.
+        """
+        if not self._player.is_playing():
+            self._playback.enter(IDLE)
+            return
+        # omxplayer loop call feedback after each play
+        if self._isMovieLoop and self._current_screen_time is not None :
+            elapsed_sec = time.time() - self._current_start
+            if elapsed_sec >= self._current_screen_time:
+               self._current_start = time.time()
+               self._send_play_feedback(self._feedback_file_name,self._send_feedback)
+               # A staged playlist update is only swapped in by get_next, so
+               # end the loop to pick it up.
+               if playlist.has_pending() or not playlist.is_on_schedule(self._cIndex):
+                  self._isMovieLoop = False
+                  self._prevImage = False
+                  self._stop_playback()
+               else:
+                  self._planner.plan(playlist, self._current_start, self._movie,
+                                     self._current_start,
+                                     self._current_screen_time, loop=True)
+
+    def _on_stopping(self, playlist):
+        """Move on once the player exited, or gave up waiting for it (the
+        next play kills it).
+        """
+        if not self._player.is_playing():
+            teardown = self._player.last_teardown()
+            if teardown is not None:
+                self._print('Player stopped in {0:.3f}s'.format(teardown))
+            self._playback.enter(IDLE)
+        elif self._playback.is_due():
+            self._print('Player did not stop within {0}s'.format(self._stop_timeout))
+            self._playback.enter(IDLE)
+
+    def _on_waiting_for_content(self, playlist):
+        """Animate the waiting message and look for content again."""
+        if not self._playback.is_due():
+            return
+        now = time.time()
+        if now >= self._retry_at:
+            self._playback.enter(IDLE)
+            return
+        self._wait_frame += 1
+        self._wait_content_message(self._wait_frame)
+        self._playback.set_deadline(min(1, self._retry_at - now), now)
+
+    def _stop_playback(self):
+        """Stop the movie on screen without waiting for the player to exit."""
+        self._player.stop(0)
+        self._playback.enter(STOPPING, self._stop_timeout)
+
+    def _skip(self, playlist):
+        """Move on to the next position right away."""
+        state = self._playback.state
+        if state == SHOWING_IMAGE:
+            self._playback.enter(IDLE)
+        elif state == STARTING_VIDEO and not self._video_started:
+            self._playback.enter(IDLE)
+        elif state == PLAYING and self._isMovieLoop and self._player.restart():
+            # The only active movie plays again, seek back to its start
+            # instead of restarting the player.
+            self._print("Restarted "+self._feedback_file_name)
+            self._isPrevKey = False
+            self._current_start = time.time()
+            self._send_play_feedback(self._feedback_file_name,self._send_feedback)
+            self._planner.plan(playlist, self._current_start, self._movie,
+                               self._current_start,
+                               self._current_screen_time, loop=True)
+        elif state in (STARTING_VIDEO, PLAYING):
+            self._stop_playback()
+
+    def _handle_keys(self, playlist):
+        """Event handling for key press, if keyboard control is enabled."""
+        for event in pygame.event.get():
+           if event.type == pygame.KEYDOWN:
+              self._print("Key="+repr(event.key))
+              # If pressed key is ESC quit program
+              if event.key == pygame.K_ESCAPE and self._allow_esc_exit:
+                 self._print("Exit")
+                 self.quit()
+                 return
+              if event.key == pygame.K_RIGHT: 
+                 self._print("Go forward")
+                 self._skip(playlist)
+              if event.key == pygame.K_LEFT: 
+                 self._blank_screen()
+                 prev = playlist.set_prev_index()
+                 self._print("Go back:"+repr(prev))
+                 self._isPrevKey = True
+                 self._skip(playlist)
+              break
+
     def run(self):
         """Main program loop.  Will never return!"""
         # Get playlist of movies to play from file reader.
         playlist = self._buildPlaylist()
+        self._startup.mark('playlist')
         self._prepare_to_run_playlist(playlist)
         self._prevImage = False
         # It stores the beginning of the display period.
-        current_position_start_time = time.time()
+        self._current_start = time.time()
         # It stores the number of seconds to display the current position
-        current_position_screen_time = None
+        self._current_screen_time = None
         # It stores the name of current file
-        feedback_file_name = ""
+        self._feedback_file_name = ""
         # It can be "T" or "F". It is an attribute of the current position. If "T" - log feedback, if "F" - feedback will be NOT logged.
-        send_feedback = "T"
+        self._send_feedback = "T"
         # if movie is started in loop mode or not
-        isMovieLoop = False
-        # if current position is an image and is on screen
-        isPictureDisplayed = False
-        # current playlist index
-        cIndex = 0
-	# if back KEY is pressed
-        isPrevKey = False
+        self._isMovieLoop = False
+        # current playlist position and index
+        self._movie = None
+        self._cIndex = 0
+        # if back KEY is pressed
+        self._isPrevKey = False
+        # if the player of the video in STARTING_VIDEO was started
+        self._video_started = False
+        handlers = {
+            COUNTDOWN: self._on_countdown,
+            IDLE: self._on_idle,
+            SHOWING_IMAGE: self._on_showing_image,
+            STARTING_VIDEO: self._on_starting_video,
+            PLAYING: self._on_playing,
+            STOPPING: self._on_stopping,
+            WAITING_FOR_CONTENT: self._on_waiting_for_content,
+        }
         # Main loop to play videos in the playlist and listen for file changes.
         while self._running:
-            # Load and play a new movie if nothing is playing.
-            if not self._player.is_playing() and not isPictureDisplayed:
-                movie = playlist.get_next()
-                self._load_bg(playlist)
-                if movie is not None:
-                    cIndex = playlist.get_current_index()
-                    self._print("---------------------------"+repr(cIndex)+"-"+movie+"-------------------------")
-                    filename, file_extension = os.path.splitext(movie)
-                    file_extension = file_extension.lower()
-                    send_feedback = playlist.get_movie_send_feedback(cIndex)
-                    #test if current position is jpg or png
-                    if (file_extension == ".jpg") or (file_extension == ".png"):
-                        realName = os.path.basename(movie)
-                        img = pygame.image.load(movie)
-                        img = pygame.transform.scale(img, self._size)
-                        self._screen.blit(img, (0,0))
-                        pygame.display.flip()
-                        isPictureDisplayed = True
-                        current_position_start_time = time.time()
-                        current_position_screen_time = playlist.get_position_screen_time(cIndex)
-                        self._prevImage = True
-                        # Record play feedback
-                        self._send_play_feedback(realName,send_feedback)
-                    #current position is a video file
-                    else:
-                        if self._has_bgk_image and not self._prevImage and not isPrevKey:
-                             #sleep one more second in order to have background visible
-                             time.sleep(1)
-                        self._prevImage = False
-                        current_position_start_time = time.time()
-                        current_position_screen_time = playlist.get_position_screen_time(cIndex)
-                        onlyOneActive = playlist.onlyOneActive()
-                        if onlyOneActive and current_position_screen_time is not None:
-                           isMovieLoop = True
-                           feedback_file_name = os.path.basename(movie)
-			else:
-                           isMovieLoop = False
-                        self._player.play(movie,loop=onlyOneActive, vol=self._sound_vol)
-                        if not isPrevKey:
-                           time.sleep(1)
-                        isPrevKey = False
-                        # Call WS to register video play sesion
-                        self._send_play_feedback(str(os.path.basename(movie)),send_feedback)
-                        nextPosition = playlist.whats_next();
-                        # if nextPosition is an image then will be drawn in background to prevent black screen between playlist positions
-                        if nextPosition is not None:
-                            filenameN, file_extensionN = os.path.splitext(nextPosition)
-                            file_extensionN = file_extensionN.lower()
-                            if (file_extensionN == ".jpg") or (file_extensionN == ".png"):
-                               self._print('Display next image in order to prevent black screen : {0}'.format(nextPosition))
-                               img = pygame.image.load(nextPosition)
-                               img = pygame.transform.scale(img, self._size)
-                               self._screen.blit(img, (0,0))
-                               pygame.display.flip()
-                            else:
-                               if self._has_bgk_image and not self._prevImage:
-                                  self._set_background_image(playlist)
-                               else:
-                                  self._blank_screen()
-                        else:
-                            if self._has_bgk_image and not self._prevImage:
-                               self._set_background_image(playlist)
-                            else:
-                               self._blank_screen()
-                else:
-                   self._print('No content.....: {0}')
-                   self._blank_screen()
-                   self._wait_content_message()
-
-            # Check for changes in the file search path (like USB drives added)
-            # and rebuild the playlist. It will never happen because self._reader.is_changed() will return false(hardcoded).
+            # Run the state handlers until the state settles, every state
+            # passes through IDLE at most once per loop.
+            for _ in xrange(len(handlers)):
+                state, deadline = self._playback.state, self._playback.deadline
+                handlers[state](playlist)
+                if (state, deadline) == (self._playback.state, self._playback.deadline):
+                    break
+
+            # Paint the next image behind the movie once it is decoded.
+            self._paint_backdrop()
+
+            # Check for changes in the file search path (like USB drives added
+            # or playlist.ini updated) and hot-reload the playlist.
             if self._reader.is_changed():
-                self._player.stop(3)  # Up to 3 second delay waiting for old
-                                      # player to stop.
-                # Rebuild playlist and show countdown again (if OSD enabled).
-                playlist = self._buildPlaylist()
-                self._prepare_to_run_playlist(playlist)
-                self._prevImage = False
-
-            # Event handling for key press, if keyboard control is enabled
+                self._reload_playlist(playlist)
+                if self._playback.state == WAITING_FOR_CONTENT:
+                    self._playback.enter(IDLE)
+                    continue
+
             if self._keyboard_control:
-            	for event in pygame.event.get():
-                   if event.type == pygame.KEYDOWN:
-                      self._print("Key="+repr(event.key))
-                      # If pressed key is ESC quit program
-                      if event.key == pygame.K_ESCAPE and self._allow_esc_exit:
-                         self._print("Exit")
-                         self.quit()
-                      if event.key == pygame.K_RIGHT: 
-                         self._print("Go forward")
-                         if isPictureDisplayed :
-                            isPictureDisplayed = False
-                         elif self._player.is_playing():
-                            self._player.stop(3)
-                      if event.key == pygame.K_LEFT: 
-                         self._blank_screen()
-                         prev = playlist.set_prev_index()
-                         self._print("Go back:"+repr(prev))
-                         isPrevKey = True
-                         if isPictureDisplayed :
-                            isPictureDisplayed = False
-                         elif self._player.is_playing():
-                            self._player.stop(3)
-                      break
-
-            # omxplayer loop call feedback after each play
-            if isMovieLoop and current_position_screen_time is not None :
-                elapsed_sec = time.time() - current_position_start_time
-                if elapsed_sec >= current_position_screen_time:
-                   current_position_start_time = time.time()
-                   self._send_play_feedback(feedback_file_name,send_feedback)
-                   if not playlist.is_on_schedule(cIndex):
-                      isMovieLoop = False
-                      self._prevImage = False
-                      self._player.stop(3)
-                      self._prevImage = False
-            # test if picture screen time is up. If yes, play next position
-            if isPictureDisplayed and current_position_screen_time is not None :
-                elapsed_sec = time.time() - current_position_start_time
-                if elapsed_sec >= current_position_screen_time:
-                   self._print("Picture time's up")
-                   isPictureDisplayed = False
-
-	    # Give the CPU some time to do other tasks.
-            time.sleep(0.02)
+                self._handle_keys(playlist)
+                if not self._running:
+                    break
+
+            # Block until the player exits, the content changes, a key is
+            # pressed, the current state times out or the next planned event
+            # is due.
+            self._reactor.wait(self._wait_time())
+
+    def _report_startup(self):
+        """Print the startup timeline when the first item goes on screen."""
+        summary = self._startup.report_once('first frame')
+        if summary is not None:
+            self._print(summary)
+
+    def _log_transition(self, movie, gap, promoted):
+        """Player hook called each time a movie starts, logs the gap since the
+        previous player stopped.
+        """
+        self._print('Transition to {0}: {1} after {2}'.format(
+            os.path.basename(movie),
+            'standby player promoted' if promoted else 'player started',
+            'n/a' if gap is None else '{0:.3f}s'.format(gap)))
+
+    def _wait_time(self):
+        """Return how many seconds the main loop can block in the reactor.
+        That is until the deadline of the playback state or the next event of
+        the playout plan or the end of a burst of content changes, whichever
+        comes first, but no longer than idle_interval if the file reader has
+        no file descriptor to wait on,
+        and no longer than poll_interval if the keyboard has to be polled
+        (pygame events have no file descriptor).  Player exits wake the
+        reactor through SIGCHLD.
+        """
+        now = time.time()
+        timeout = min(self._planner.time_until_next(now),
+                      self._playback.time_until_deadline(now),
+                      self._reader.time_until_settled(now))
+        if self._reader_fd is None:
+            timeout = min(timeout, self._idle_interval)
+        if self._keyboard_control:
+            timeout = min(timeout, self._poll_interval)
+        return timeout
 
     def quit(self):
         """Shut down the program"""
         self._running = False
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+        self._media_index.stop()
+        if self._ingest is not None:
+            self._ingest.stop()
+        if self._conditioner is not None:
+            self._conditioner.stop()
         if self._player is not None:
+            self._player.discard()
             self._player.stop()
+        if self._framebuffer is not None:
+            self._framebuffer.close()
         pygame.quit()
 
     def signal_quit(self, signal, frame):
         """Shut down the program, meant to by called by signal handler."""
         self.quit()
 
+    def signal_dump_plan(self, signal, frame):
+        """Print the current playout plan, meant to by called by signal handler."""
+        print(self._playback.dump())
+        print(self._planner.dump())
+        print(self._images.stats())
+
 
 # Main entry point.
 if __name__ == '__main__':
@@ -513,5 +989,7 @@ if __name__ == '__main__':
     # Configure signal handlers to quit on TERM or INT signal.
     signal.signal(signal.SIGTERM, videolooper.signal_quit)
     signal.signal(signal.SIGINT, videolooper.signal_quit)
+    # Dump the playout plan on USR1 signal.
+    signal.signal(signal.SIGUSR1, videolooper.signal_dump_plan)
     # Run the main loop.
     videolooper.run()
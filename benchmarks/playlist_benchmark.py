@@ -0,0 +1,187 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Micro-benchmarks for the playlist loader and scheduler.
+
+Generates synthetic playlist.ini files with a mix of expired, future, daily
+windowed and unrestricted entries and reports per-call latency of the
+Playlist methods used by the main loop, plus load time and memory.  The
+schedule is evaluated against a frozen clock so runs are reproducible.
+
+Usage: python benchmarks/playlist_benchmark.py [--sizes 100,1000,10000]
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper.model import Playlist
+from Adafruit_Video_Looper.playlist_loader import PlaylistLoader
+
+
+# Frozen "now" used for every schedule evaluation: 2020-06-15 12:00:00 local.
+FROZEN_NOW = time.mktime((2020, 6, 15, 12, 0, 0, 0, 0, -1))
+
+# Number of distinct content files referenced by the generated playlists.
+FILE_POOL = 200
+
+
+class FrozenClock(object):
+    """Clock function that always returns the same time until moved."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _stamp(epoch):
+    return time.strftime('%Y%m%d%H%M%S', time.localtime(epoch))
+
+
+def generate_playlist(path, size, expired, future, windowed, seed):
+    """Write a playlist.ini with size entries and the content files it
+    references into directory path.  Expired, future and windowed are the
+    fractions of entries with a past period, a future period and a daily
+    window (half of which covers the frozen time).
+    """
+    rng = random.Random(seed)
+    names = ['item{0:03d}{1}'.format(i, '.jpg' if i % 2 else '.mp4')
+             for i in range(min(size, FILE_POOL))]
+    for name in names:
+        open(os.path.join(path, name), 'w').close()
+    day = 24 * 3600
+    with open(os.path.join(path, 'playlist.ini'), 'w') as playlist:
+        for i in range(size):
+            start = end = istart = iend = ''
+            roll = rng.random()
+            if roll < expired:
+                end_time = FROZEN_NOW - rng.randint(1, 30) * day
+                start, end = _stamp(end_time - 30 * day), _stamp(end_time)
+            elif roll < expired + future:
+                start_time = FROZEN_NOW + rng.randint(1, 30) * day
+                start, end = _stamp(start_time), _stamp(start_time + 30 * day)
+            elif roll < expired + future + windowed:
+                if rng.random() < 0.5:
+                    istart, iend = '080000', '{0:02d}0000'.format(rng.randint(13, 23))
+                else:
+                    istart, iend = '{0:02d}0000'.format(rng.randint(13, 20)), '230000'
+            playlist.write(':=:'.join([str(i), names[i % len(names)], start, end,
+                                       istart, iend, str(rng.randint(5, 30)),
+                                       rng.choice('TF')]) + '\n')
+
+
+def per_call(func, calls):
+    """Return the average latency of func in microseconds."""
+    start = timeit.default_timer()
+    for _ in xrange(calls):
+        func()
+    return (timeit.default_timer() - start) / calls * 1e6
+
+
+def max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def entries_kb(entries):
+    """Approximate memory held by the entry records and their paths."""
+    total = sys.getsizeof(entries)
+    for entry in entries:
+        total += sys.getsizeof(entry) + sys.getsizeof(entry.path)
+    return total / 1024.0
+
+
+def run(size, args):
+    content = tempfile.mkdtemp(prefix='playlist_bench_')
+    # Keep the cache outside the content directory, writing it there would
+    # change the directory mtime and invalidate the cache key.
+    cache_dir = tempfile.mkdtemp(prefix='playlist_bench_cache_')
+    try:
+        generate_playlist(content, size, args.expired, args.future,
+                          args.windowed, args.seed)
+        cache_path = os.path.join(cache_dir, 'playlist.cache')
+        loader = PlaylistLoader(content, cache_path)
+        rss_before = max_rss_kb()
+        cold_start = timeit.default_timer()
+        entries, report = loader.load()
+        cold = timeit.default_timer() - cold_start
+        warm_start = timeit.default_timer()
+        entries, report = loader.load()
+        warm = timeit.default_timer() - warm_start
+        clock = FrozenClock(FROZEN_NOW)
+        build_start = timeit.default_timer()
+        playlist = Playlist(entries, False, clock)
+        playlist.onlyOneActive()
+        build = timeit.default_timer() - build_start
+        playlist.get_next()
+        results = {
+            'get_next': per_call(playlist.get_next, args.calls),
+            'whats_next': per_call(playlist.whats_next, args.calls),
+            'onlyOneActive': per_call(playlist.onlyOneActive, args.calls),
+            'is_on_schedule': per_call(lambda: playlist.is_on_schedule(0), args.calls),
+        }
+
+        def prev():
+            playlist.set_prev_index()
+            playlist.get_next()
+        results['set_prev_index'] = per_call(prev, args.calls) - results['get_next']
+
+        # Cost of a rebuild when the clock crosses a schedule boundary.
+        schedule = playlist._schedule
+        boundaries = 0
+        rebuild_start = timeit.default_timer()
+        while boundaries < 10 and schedule.next_boundary() != float('inf'):
+            clock.now = schedule.next_boundary()
+            schedule.refresh()
+            boundaries += 1
+        results['boundary_rebuild'] = \
+            (timeit.default_timer() - rebuild_start) / max(boundaries, 1) * 1e6
+        active = schedule.count()
+        return [size, report.entries, active, cold * 1e3, warm * 1e3, build * 1e3] + \
+               [results[x] for x in COLUMNS] + \
+               [entries_kb(entries), max_rss_kb() - rss_before]
+    finally:
+        shutil.rmtree(content)
+        shutil.rmtree(cache_dir)
+
+
+COLUMNS = ['get_next', 'whats_next', 'onlyOneActive', 'set_prev_index',
+           'is_on_schedule', 'boundary_rebuild']
+
+HEADER = ['entries', 'loaded', 'active', 'cold_ms', 'warm_ms', 'index_ms'] + \
+         [x + '_us' for x in COLUMNS] + ['entries_kb', 'rss_delta_kb']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark playlist loading and scheduling.')
+    parser.add_argument('--sizes', default='100,1000,10000,100000',
+                        help='comma separated playlist sizes')
+    parser.add_argument('--calls', type=int, default=2000,
+                        help='calls per measured method')
+    parser.add_argument('--expired', type=float, default=0.2,
+                        help='fraction of entries with a past period')
+    parser.add_argument('--future', type=float, default=0.2,
+                        help='fraction of entries with a future period')
+    parser.add_argument('--windowed', type=float, default=0.3,
+                        help='fraction of entries with a daily window')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rows = [HEADER]
+    for size in [int(x) for x in args.sizes.split(',')]:
+        rows.append(['{0:.1f}'.format(x) if isinstance(x, float) else str(x)
+                     for x in run(size, args)])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(HEADER))]
+    for row in rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Fake omxplayer D-Bus service for the controller tests.
+
+Implements the part of the MPRIS interface omxplayer exposes that
+OMXPlayerController uses (Pause, Play, Seek, SetPosition and the Position,
+Duration, Volume and PlaybackStatus properties) on the bus at the given
+address, and runs until killed.
+
+Usage: python tests/fake_mpris.py ADDRESS BUS_NAME [DURATION_SECONDS]
+"""
+import sys
+
+import dbus
+import dbus.service
+from dbus.mainloop.glib import DBusGMainLoop
+try:
+    from gi.repository import GLib as mainloop
+except ImportError:
+    import gobject as mainloop
+
+
+OBJECT_PATH = '/org/mpris/MediaPlayer2'
+PLAYER_INTERFACE = 'org.mpris.MediaPlayer2.Player'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+
+
+class FakePlayer(dbus.service.Object):
+    """Player state changed by the MPRIS calls: position and duration in
+    microseconds, linear volume and playing or paused.
+    """
+
+    def __init__(self, bus, duration):
+        dbus.service.Object.__init__(self, bus, OBJECT_PATH)
+        self.position = 0
+        self.duration = duration
+        self.volume = 1.0
+        self.status = 'Playing'
+
+    def _clamp(self, position):
+        return max(0, min(self.duration, position))
+
+    @dbus.service.method(PLAYER_INTERFACE)
+    def Pause(self):
+        self.status = 'Paused'
+
+    @dbus.service.method(PLAYER_INTERFACE)
+    def Play(self):
+        self.status = 'Playing'
+
+    @dbus.service.method(PLAYER_INTERFACE, in_signature='x', out_signature='x')
+    def Seek(self, offset):
+        self.position = self._clamp(self.position + offset)
+        return self.position
+
+    @dbus.service.method(PLAYER_INTERFACE, in_signature='ox', out_signature='x')
+    def SetPosition(self, track, position):
+        self.position = self._clamp(position)
+        return self.position
+
+    @dbus.service.method(PROPERTIES_INTERFACE, in_signature='ss', out_signature='v')
+    def Get(self, interface, name):
+        if name == 'Position':
+            return dbus.Int64(self.position)
+        if name == 'Duration':
+            return dbus.Int64(self.duration)
+        if name == 'Volume':
+            return dbus.Double(self.volume)
+        if name == 'PlaybackStatus':
+            return dbus.String(self.status)
+        raise dbus.exceptions.DBusException('Unknown property ' + name)
+
+    @dbus.service.method(PROPERTIES_INTERFACE, in_signature='ssv', out_signature='v')
+    def Set(self, interface, name, value):
+        if name != 'Volume':
+            raise dbus.exceptions.DBusException('Read only property ' + name)
+        self.volume = float(value)
+        return dbus.Double(self.volume)
+
+
+def main(argv):
+    address, bus_name = argv[1], argv[2]
+    duration = int(float(argv[3]) * 1000000) if len(argv) > 3 else 60000000
+    DBusGMainLoop(set_as_default=True)
+    bus = dbus.bus.BusConnection(address)
+    name = dbus.service.BusName(bus_name, bus)
+    player = FakePlayer(bus, duration)
+    mainloop.MainLoop().run()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,72 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the conversion plans of the content conditioner and of the media
+index probing it relies on.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper.conditioner import ContentConditioner
+from Adafruit_Video_Looper.media_index import MediaIndex, MediaInfo
+
+
+class FakeProbe(object):
+    """Probe returning the same info for every file, counting the calls."""
+
+    def __init__(self, info):
+        self.info = info
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(path)
+        return self.info
+
+
+class ConditionerPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.movie = os.path.join(self.root, 'movie.mkv')
+        with open(self.movie, 'wb') as outfile:
+            # Not an MP4 or raw H264 stream, the header parser knows nothing.
+            outfile.write('\x1a\x45\xdf\xa3' + '\0' * 60)
+        self.probe = FakeProbe(MediaInfo(kind='mkv', codec='mpeg2', width=1920,
+                                         height=1080, has_audio=True))
+        self.index = MediaIndex(probe=self.probe)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _conditioner(self, describe):
+        return ContentConditioner(os.path.join(self.root, 'out'), describe=describe,
+                                  transcode=True, max_size=(1280, 720))
+
+    def test_unprobed_movie_is_probed_on_the_worker(self):
+        self.assertIsNone(self.index.get(self.movie))
+        plan = self._conditioner(self.index.probe)._plan(self.movie)
+        self.assertIsNotNone(plan)
+        self.assertEqual(plan[0], 'fit1280x720')
+        self.assertEqual(self.probe.calls, [self.movie])
+        # Recorded, the background probing skips it.
+        self.assertEqual(self.index.get(self.movie).codec, 'mpeg2')
+        self.index.probe(self.movie)
+        self.assertEqual(self.probe.calls, [self.movie])
+
+    def test_header_parser_alone_finds_no_plan(self):
+        self.assertIsNone(self._conditioner(self.index.get)._plan(self.movie))
+
+    def test_probe_of_missing_file(self):
+        self.assertIsNone(self.index.probe(os.path.join(self.root, 'missing.mp4')))
+        self.assertEqual(self.probe.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
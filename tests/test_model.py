@@ -0,0 +1,107 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the playlist model: timestamp parsing and the Playlist getters.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper import model
+from Adafruit_Video_Looper.model import (Playlist, PlaylistEntry, parse_time_of_day,
+                                         parse_timestamp)
+from Adafruit_Video_Looper.playlist_loader import PlaylistLoader
+
+
+def _mktime_32bit(fields, mktime=time.mktime):
+    """time.mktime of a system with a 32 bit time_t."""
+    if fields[0] > 2037 or fields[0] < 1902:
+        raise OverflowError('mktime argument out of range')
+    return mktime(fields)
+
+
+class TimestampTest(unittest.TestCase):
+
+    def tearDown(self):
+        model.time.mktime = time.mktime
+
+    def test_parse(self):
+        self.assertEqual(parse_timestamp('20200615120000'),
+                         time.mktime((2020, 6, 15, 12, 0, 0, 0, 0, -1)))
+        self.assertEqual(parse_time_of_day('013005'), 5405)
+
+    def test_invalid(self):
+        for value in ('2020061512000', '2020061512000x', '20201315120000',
+                      '20200230120000'):
+            self.assertRaises(ValueError, parse_timestamp, value)
+        self.assertRaises(ValueError, parse_time_of_day, '240000')
+
+    def test_far_future_end(self):
+        self.assertGreater(parse_timestamp('99991231235959'), time.time())
+
+    def test_out_of_range_is_clamped(self):
+        model.time.mktime = _mktime_32bit
+        self.assertEqual(parse_timestamp('20991231235959'), float('inf'))
+        self.assertEqual(parse_timestamp('18000101000000'), float('-inf'))
+        self.assertEqual(parse_timestamp('20200615120000'),
+                         time.mktime((2020, 6, 15, 12, 0, 0, 0, 0, -1)))
+
+
+class FarFutureLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = tempfile.mkdtemp()
+        for name in ('forever.mp4', 'expired.mp4'):
+            open(os.path.join(self.content, name), 'w').close()
+        with open(os.path.join(self.content, 'playlist.ini'), 'w') as outfile:
+            outfile.write('1:=:forever.mp4:=:20000101000000:=:99991231235959\n'
+                          '2:=:expired.mp4:=:20000101000000:=:20010101000000\n')
+
+    def tearDown(self):
+        model.time.mktime = time.mktime
+        shutil.rmtree(self.content)
+
+    def _check(self):
+        entries, report = PlaylistLoader(self.content).load()
+        self.assertEqual(report.count(), 0, report.summary())
+        self.assertEqual(len(entries), 2)
+        playlist = Playlist(entries, False)
+        self.assertEqual(playlist.get_next(), self.content + '/forever.mp4')
+        self.assertTrue(playlist.onlyOneActive())
+
+    def test_far_future_end_plays(self):
+        self._check()
+
+    def test_far_future_end_plays_with_32_bit_time(self):
+        model.time.mktime = _mktime_32bit
+        self._check()
+
+
+class FileMetaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.entry = PlaylistEntry('/content/a.mp4', 1.0, 2.0, 60, 120, 15, False,
+                                   2.0, 4)
+        self.playlist = Playlist([self.entry], False)
+
+    def test_get_file_meta_is_a_dict(self):
+        meta = self.playlist.get_file_meta(0)
+        self.assertEqual(meta, {'path': '/content/a.mp4', 'start': 1.0, 'end': 2.0,
+                                'istart': 60, 'iend': 120, 'screen_time': 15,
+                                'send_feedback': False, 'weight': 2.0,
+                                'hourly_budget': 4})
+
+    def test_getters(self):
+        self.assertEqual(self.playlist.get_position_screen_time(0), 15)
+        self.assertEqual(self.playlist.get_movie_send_feedback(0), 'F')
+
+
+if __name__ == '__main__':
+    unittest.main()
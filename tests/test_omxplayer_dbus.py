@@ -0,0 +1,116 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of OMXPlayerController against the fake MPRIS service in
+fake_mpris.py, on a private D-Bus daemon.  Skipped if dbus-python or
+dbus-daemon is not installed.
+
+Usage: python -m unittest discover tests
+"""
+import distutils.spawn
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper import omxplayer_dbus
+from Adafruit_Video_Looper.omxplayer_dbus import ControlError, OMXPlayerController
+
+
+BUS_NAME = omxplayer_dbus.BUS_NAME_PREFIX + '.test'
+FAKE_MPRIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_mpris.py')
+
+# Length of the fake movie in seconds.
+DURATION = 60.0
+
+# Seconds to wait for the fake player to register its name.
+START_TIMEOUT = 5.0
+
+
+@unittest.skipUnless(omxplayer_dbus.available(), 'dbus-python is not installed')
+@unittest.skipUnless(distutils.spawn.find_executable('dbus-daemon'),
+                     'dbus-daemon is not installed')
+class OMXPlayerControllerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._daemon = subprocess.Popen(
+            ['dbus-daemon', '--session', '--nofork', '--print-address'],
+            stdout=subprocess.PIPE)
+        self.address = self._daemon.stdout.readline().strip()
+        self._player = subprocess.Popen(
+            [sys.executable, FAKE_MPRIS, self.address, BUS_NAME, str(DURATION)])
+        self.controller = OMXPlayerController(BUS_NAME, address=self.address)
+        deadline = time.time() + START_TIMEOUT
+        while not self.controller.is_ready():
+            if time.time() > deadline:
+                self.fail('The fake player did not register ' + BUS_NAME)
+            time.sleep(0.05)
+
+    def tearDown(self):
+        self.controller.close()
+        for process in (self._player, self._daemon):
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+    def _status(self):
+        return self.controller._call(omxplayer_dbus.PROPERTIES_INTERFACE, 'Get',
+                                     omxplayer_dbus.PLAYER_INTERFACE, 'PlaybackStatus')
+
+    def _volume(self):
+        return self.controller._call(omxplayer_dbus.PROPERTIES_INTERFACE, 'Get',
+                                     omxplayer_dbus.PLAYER_INTERFACE, 'Volume')
+
+    def test_pause_and_resume(self):
+        self.controller.pause()
+        self.assertEqual(self._status(), 'Paused')
+        self.controller.resume()
+        self.assertEqual(self._status(), 'Playing')
+
+    def test_seek_is_relative(self):
+        self.controller.seek(10)
+        self.controller.seek(2.5)
+        self.assertAlmostEqual(self.controller.position(), 12.5)
+        self.controller.seek(-5)
+        self.assertAlmostEqual(self.controller.position(), 7.5)
+
+    def test_set_position(self):
+        self.controller.set_position(42)
+        self.assertAlmostEqual(self.controller.position(), 42)
+        self.controller.set_position(0)
+        self.assertAlmostEqual(self.controller.position(), 0)
+
+    def test_duration(self):
+        self.assertAlmostEqual(self.controller.duration(), DURATION)
+
+    def test_volume_in_millibels(self):
+        self.controller.set_volume(0)
+        self.assertAlmostEqual(self._volume(), 1.0)
+        self.controller.set_volume(-2000)
+        self.assertAlmostEqual(self._volume(), 0.1)
+        self.controller.set_volume(-6000)
+        self.assertAlmostEqual(self._volume(), 0.001)
+
+    def test_missing_player(self):
+        controller = OMXPlayerController(BUS_NAME + '.missing', address=self.address)
+        self.assertFalse(controller.is_ready())
+        self.assertRaises(ControlError, controller.pause)
+
+    def test_player_exit_raises_and_reconnects(self):
+        self._player.kill()
+        self._player.wait()
+        self.assertRaises(ControlError, self.controller.position)
+        self._player = subprocess.Popen(
+            [sys.executable, FAKE_MPRIS, self.address, BUS_NAME, str(DURATION)])
+        deadline = time.time() + START_TIMEOUT
+        while not self.controller.is_ready():
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.05)
+        self.assertAlmostEqual(self.controller.position(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,293 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the playback state machine with an injected clock: transitions,
+deadlines, and the skip and stop handlers of the looper.  The handler tests
+are skipped if pygame is not installed.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper import playback
+from Adafruit_Video_Looper.model import Playlist, PlaylistEntry
+from Adafruit_Video_Looper.playback import (COUNTDOWN, IDLE, PLAYING, SHOWING_IMAGE,
+                                            STARTING_VIDEO, STOPPING,
+                                            WAITING_FOR_CONTENT, PlaybackState)
+
+try:
+    from Adafruit_Video_Looper.video_looper import VideoLooper
+except ImportError:
+    VideoLooper = None
+
+
+ALL_STATES = (COUNTDOWN, IDLE, SHOWING_IMAGE, STARTING_VIDEO, PLAYING, STOPPING,
+              WAITING_FOR_CONTENT)
+
+
+class FakeClock(object):
+    """Clock that only moves when told to."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class PlaybackStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.state = PlaybackState(IDLE, self.clock)
+
+    def test_initial_state(self):
+        self.assertEqual(self.state.state, IDLE)
+        self.assertEqual(self.state.entered_at, 1000.0)
+        self.assertIsNone(self.state.deadline)
+        self.assertEqual(len(self.state.history), 0)
+
+    def test_valid_transition_is_recorded(self):
+        self.clock.advance(5)
+        self.state.enter(SHOWING_IMAGE)
+        self.assertEqual(self.state.state, SHOWING_IMAGE)
+        self.assertEqual(self.state.entered_at, 1005.0)
+        self.assertEqual(list(self.state.history), [(1005.0, IDLE, SHOWING_IMAGE)])
+
+    def test_invalid_transitions_raise(self):
+        for initial in ALL_STATES:
+            for target in ALL_STATES:
+                if target in playback.TRANSITIONS[initial]:
+                    continue
+                state = PlaybackState(initial, self.clock)
+                state.set_deadline(3)
+                self.assertRaises(ValueError, state.enter, target)
+                # A refused transition leaves everything as it was.
+                self.assertEqual(state.state, initial)
+                self.assertEqual(state.deadline, 1003.0)
+                self.assertEqual(len(state.history), 0)
+
+    def test_every_state_can_be_left(self):
+        for state in ALL_STATES:
+            self.assertTrue(playback.TRANSITIONS[state])
+            for target in playback.TRANSITIONS[state]:
+                self.assertIn(target, ALL_STATES)
+
+    def test_deadline_expiry(self):
+        self.state.enter(SHOWING_IMAGE, 10)
+        self.assertEqual(self.state.deadline, 1010.0)
+        self.assertFalse(self.state.is_due())
+        self.assertEqual(self.state.time_until_deadline(), 10.0)
+        self.clock.advance(9.5)
+        self.assertFalse(self.state.is_due())
+        self.assertEqual(self.state.time_until_deadline(), 0.5)
+        self.clock.advance(0.5)
+        self.assertTrue(self.state.is_due())
+        self.assertEqual(self.state.time_until_deadline(), 0.0)
+        self.clock.advance(60)
+        self.assertTrue(self.state.is_due())
+        self.assertEqual(self.state.time_until_deadline(), 0.0)
+
+    def test_explicit_now_overrides_the_clock(self):
+        self.state.enter(SHOWING_IMAGE, 10)
+        self.assertTrue(self.state.is_due(1010.0))
+        self.assertEqual(self.state.time_until_deadline(1004.0), 6.0)
+
+    def test_no_deadline(self):
+        self.state.enter(SHOWING_IMAGE)
+        self.clock.advance(1e6)
+        self.assertFalse(self.state.is_due())
+        self.assertEqual(self.state.time_until_deadline(), float('inf'))
+
+    def test_set_deadline_moves_and_clears(self):
+        self.state.enter(WAITING_FOR_CONTENT, 1)
+        self.clock.advance(1)
+        self.assertTrue(self.state.is_due())
+        self.state.set_deadline(2)
+        self.assertFalse(self.state.is_due())
+        self.assertEqual(self.state.deadline, 1003.0)
+        self.state.set_deadline(None)
+        self.assertIsNone(self.state.deadline)
+
+    def test_entering_clears_the_deadline(self):
+        self.state.enter(SHOWING_IMAGE, 10)
+        self.state.enter(IDLE)
+        self.assertIsNone(self.state.deadline)
+
+    def test_history_is_bounded(self):
+        for _ in xrange(playback.HISTORY_LENGTH):
+            self.state.enter(SHOWING_IMAGE)
+            self.state.enter(IDLE)
+        self.assertEqual(len(self.state.history), playback.HISTORY_LENGTH)
+        self.assertEqual(self.state.history[-1][1:], (SHOWING_IMAGE, IDLE))
+
+    def test_dump(self):
+        self.state.enter(STARTING_VIDEO)
+        self.state.enter(PLAYING)
+        lines = self.state.dump().splitlines()
+        self.assertIn('Playback state: playing', lines[0])
+        self.assertIn('idle -> starting video', lines[1])
+        self.assertIn('starting video -> playing', lines[2])
+
+
+class FakePlayer(object):
+    """Player that records stop calls and exits when told to."""
+
+    def __init__(self, restart=False):
+        self.playing = True
+        self.stops = []
+        self._restart = restart
+
+    def is_playing(self):
+        return self.playing
+
+    def stop(self, timeout=3):
+        self.stops.append(timeout)
+
+    def restart(self):
+        return self._restart
+
+    def last_teardown(self):
+        return None
+
+
+class FakePlanner(object):
+
+    def __init__(self):
+        self.plans = []
+
+    def plan(self, *args, **kwargs):
+        self.plans.append((args, kwargs))
+
+
+@unittest.skipIf(VideoLooper is None, 'pygame is not installed')
+class SkipAndStopTest(unittest.TestCase):
+    """Runs the handlers of VideoLooper on an instance that was not
+    initialized, with just the attributes they use.
+    """
+
+    STOP_TIMEOUT = 2
+
+    def _looper(self, state, player=None):
+        looper = VideoLooper.__new__(VideoLooper)
+        looper._playback = PlaybackState(state, self.clock)
+        looper._player = player or FakePlayer()
+        looper._planner = FakePlanner()
+        looper._stop_timeout = self.STOP_TIMEOUT
+        looper._video_started = True
+        looper._isMovieLoop = False
+        looper._isPrevKey = False
+        looper._movie = None
+        looper._current_screen_time = 30
+        looper._feedback_file_name = 'movie.mp4'
+        looper._send_feedback = 'T'
+        looper.feedback = []
+        looper._send_play_feedback = lambda name, send: looper.feedback.append(name)
+        looper._print = lambda message: None
+        return looper
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_skip_image(self):
+        looper = self._looper(SHOWING_IMAGE)
+        looper._skip(None)
+        self.assertEqual(looper._playback.state, IDLE)
+        self.assertEqual(looper._player.stops, [])
+
+    def test_skip_video_not_started_yet(self):
+        looper = self._looper(STARTING_VIDEO)
+        looper._video_started = False
+        looper._skip(None)
+        self.assertEqual(looper._playback.state, IDLE)
+        self.assertEqual(looper._player.stops, [])
+
+    def test_skip_started_video_stops_without_waiting(self):
+        looper = self._looper(STARTING_VIDEO)
+        looper._skip(None)
+        self.assertEqual(looper._playback.state, STOPPING)
+        self.assertEqual(looper._player.stops, [0])
+        self.assertEqual(looper._playback.deadline, 1000.0 + self.STOP_TIMEOUT)
+
+    def test_skip_playing_video(self):
+        looper = self._looper(PLAYING)
+        looper._skip(None)
+        self.assertEqual(looper._playback.state, STOPPING)
+        self.assertEqual(looper._player.stops, [0])
+
+    def test_skip_looping_video_restarts_it(self):
+        looper = self._looper(PLAYING, FakePlayer(restart=True))
+        looper._isMovieLoop = True
+        looper._skip(None)
+        self.assertEqual(looper._playback.state, PLAYING)
+        self.assertEqual(looper._player.stops, [])
+        self.assertEqual(looper.feedback, ['movie.mp4'])
+        self.assertEqual(len(looper._planner.plans), 1)
+
+    def test_skip_looping_video_stops_if_restart_fails(self):
+        looper = self._looper(PLAYING, FakePlayer(restart=False))
+        looper._isMovieLoop = True
+        looper._skip(None)
+        self.assertEqual(looper._playback.state, STOPPING)
+        self.assertEqual(looper._player.stops, [0])
+
+    def test_skip_while_stopping_does_nothing(self):
+        looper = self._looper(STOPPING)
+        looper._skip(None)
+        self.assertEqual(looper._playback.state, STOPPING)
+        self.assertEqual(looper._player.stops, [])
+
+    def test_stopping_ends_when_the_player_exits(self):
+        looper = self._looper(PLAYING)
+        looper._stop_playback()
+        looper._on_stopping(None)
+        self.assertEqual(looper._playback.state, STOPPING)
+        looper._player.playing = False
+        looper._on_stopping(None)
+        self.assertEqual(looper._playback.state, IDLE)
+
+    def test_stopping_gives_up_after_the_timeout(self):
+        looper = self._looper(PLAYING)
+        looper._stop_playback()
+        self.clock.advance(self.STOP_TIMEOUT - 0.1)
+        looper._on_stopping(None)
+        self.assertEqual(looper._playback.state, STOPPING)
+        self.clock.advance(0.1)
+        looper._on_stopping(None)
+        self.assertEqual(looper._playback.state, IDLE)
+        self.assertTrue(looper._player.playing)
+
+    def test_reload_then_back_while_looping(self):
+        # Reload to a shorter playlist, LEFT while the last movie loops, then
+        # the loop feedback tick: the update waits for get_next instead of
+        # leaving the loop with a position in the old entries.
+        playlist = Playlist([PlaylistEntry(name) for name in 'abcde'], False)
+        for _ in xrange(5):
+            playlist.get_next()
+        looper = self._looper(PLAYING, FakePlayer(restart=True))
+        looper._isMovieLoop = True
+        looper._cIndex = playlist.get_current_index()
+        looper._prevImage = False
+        playlist.update([PlaylistEntry(name) for name in 'ab'])
+        playlist.set_prev_index()
+        looper._skip(playlist)
+        self.assertEqual(looper._playback.state, PLAYING)
+        self.assertEqual(playlist.length(), 5)
+        looper._current_start = time.time() - looper._current_screen_time
+        looper._on_playing(playlist)
+        self.assertEqual(looper._playback.state, STOPPING)
+        self.assertFalse(looper._isMovieLoop)
+        self.assertIn(playlist.get_next(), ('a', 'b'))
+        self.assertEqual(playlist.length(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
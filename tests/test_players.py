@@ -0,0 +1,93 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the routing of movies to the player backends, with fake players.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper.players import PlayerRouter
+
+
+class FakePlayer(object):
+    """Backend recording what it was asked to play and prepare."""
+
+    def __init__(self, extensions):
+        self._extensions = extensions
+        self.played = []
+        self.prepared = None
+        self.stopped = 0
+        self.playing = False
+        self.on_transition = None
+
+    def supported_extensions(self):
+        return self._extensions
+
+    def play(self, movie, loop=False, vol=0):
+        promoted = self.prepared == movie
+        self.prepared = None
+        self.played.append(movie)
+        self.playing = True
+        return promoted
+
+    def prepare(self, movie, loop=False, vol=0):
+        self.prepared = movie
+
+    def is_prepared(self, movie, loop=False, vol=0):
+        return self.prepared == movie
+
+    def discard(self):
+        self.prepared = None
+
+    def is_playing(self):
+        return self.playing
+
+    def stop(self, block_timeout_sec=None):
+        self.stopped += 1
+        self.playing = False
+
+
+class PlayerRouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hello = FakePlayer(['h264'])
+        self.omx = FakePlayer(['mp4', 'mkv'])
+        self.router = PlayerRouter([('hello_video', self.hello), ('omxplayer', self.omx)])
+
+    def test_routes_by_extension_then_probe(self):
+        self.assertIs(self.router.player_for('/a.h264')[1], self.hello)
+        self.assertIs(self.router.player_for('/a.mp4')[1], self.omx)
+        self.assertIs(self.router.player_for('/a.avi')[1], self.hello)
+        self.router.probe = lambda path: 'h264' if 'loop' in path else None
+        self.assertIs(self.router.player_for('/loop.mp4')[1], self.hello)
+        self.assertIs(self.router.player_for('/other.mp4')[1], self.omx)
+
+    def test_switching_backends_stops_the_other(self):
+        self.router.play('/a.h264')
+        self.router.play('/b.mp4')
+        self.assertEqual(self.hello.stopped, 1)
+        self.assertEqual(self.omx.played, ['/b.mp4'])
+        self.assertTrue(self.router.is_playing())
+
+    def test_prepares_the_standby_of_the_inactive_backend(self):
+        self.router.play('/a.h264')
+        self.router.prepare('/b.mp4')
+        self.assertTrue(self.router.is_prepared('/b.mp4'))
+        self.assertTrue(self.router.play('/b.mp4'))
+        # Preparing for another backend drops the standby of this one.
+        self.router.prepare('/c.mp4')
+        self.router.prepare('/d.h264')
+        self.assertIsNone(self.omx.prepared)
+
+    def test_describe(self):
+        self.assertEqual(self.router.describe(), 'hello_video, omxplayer')
+        self.assertEqual(self.router.supported_extensions(), ['h264', 'mp4', 'mkv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
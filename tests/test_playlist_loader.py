@@ -0,0 +1,149 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the playlist.ini loader: parsing, the validation report and the
+invalidation of the compiled cache.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper.content_index import ContentIndex
+from Adafruit_Video_Looper.playlist_loader import PlaylistLoader
+
+
+PLAYLIST = ('1:=:a.mp4:=:20200101000000:=:20300101000000:=:080000:=:200000:=:15:=:F\n'
+            '2:=:b.jpg\n'
+            '3:=:missing.mp4\n'
+            '4:=:a.mp4:=:2020:=:20300101000000:=:0800:=:200000:=:x:=:T:=:-1:=:0\n'
+            '5:=:\n')
+
+
+class PlaylistLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.content = os.path.join(self.root, 'content')
+        os.mkdir(self.content)
+        self.cache = os.path.join(self.root, 'cache', 'playlist.cache')
+        for name in ('a.mp4', 'b.jpg'):
+            open(os.path.join(self.content, name), 'w').close()
+        self.playlist = os.path.join(self.content, 'playlist.ini')
+        self._write(PLAYLIST)
+        # Cache keys use mtimes, set them apart explicitly.
+        self.mtime = time.time() - 1000
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write(self, text):
+        with open(self.playlist, 'w') as outfile:
+            outfile.write(text)
+
+    def _age(self, path):
+        self.mtime += 10
+        os.utime(path, (self.mtime, self.mtime))
+
+    def test_parse_and_report(self):
+        entries, report = PlaylistLoader(self.content).load()
+        self.assertEqual([os.path.basename(x.path) for x in entries],
+                         ['a.mp4', 'b.jpg', 'a.mp4'])
+        first = entries[0]
+        self.assertEqual(first.end, time.mktime((2030, 1, 1, 0, 0, 0, 0, 0, -1)))
+        self.assertEqual((first.istart, first.iend), (8 * 3600, 20 * 3600))
+        self.assertEqual((first.screen_time, first.send_feedback), (15, False))
+        self.assertEqual((entries[1].start, entries[1].screen_time,
+                          entries[1].send_feedback), (None, 10, True))
+        last = entries[2]
+        self.assertEqual((last.start, last.istart, last.screen_time, last.weight,
+                          last.hourly_budget), (None, None, 10, 1.0, None))
+        self.assertEqual(report.lines, 5)
+        self.assertEqual(report.entries, 3)
+        self.assertEqual(report.issues, {
+            'missing file': [3], 'invalid period': [4], 'invalid daily window': [4],
+            'invalid screen time': [4], 'invalid weight': [4],
+            'invalid plays per hour': [4], 'malformed line': [5]})
+
+    def test_missing_playlist(self):
+        os.remove(self.playlist)
+        entries, report = PlaylistLoader(self.content, self.cache).load()
+        self.assertEqual(entries, [])
+        self.assertIsNotNone(report.error)
+
+    def test_warm_start_uses_the_cache(self):
+        self._age(self.playlist)
+        self._age(self.content)
+        entries, report = PlaylistLoader(self.content, self.cache).load()
+        self.assertFalse(report.from_cache)
+        cached, report = PlaylistLoader(self.content, self.cache).load()
+        self.assertTrue(report.from_cache)
+        self.assertEqual(report.count(), 7)
+        self.assertEqual([x.path for x in cached], [x.path for x in entries])
+
+    def test_playlist_change_invalidates(self):
+        loader = PlaylistLoader(self.content, self.cache)
+        self._age(self.content)
+        self._age(self.playlist)
+        loader.load()
+        self._write('1:=:b.jpg\n')
+        self._age(self.playlist)
+        entries, report = loader.load()
+        self.assertFalse(report.from_cache)
+        self.assertEqual([os.path.basename(x.path) for x in entries], ['b.jpg'])
+
+    def test_playlist_same_mtime_other_size_invalidates(self):
+        loader = PlaylistLoader(self.content, self.cache)
+        self._age(self.content)
+        self._age(self.playlist)
+        loader.load()
+        self._write('1:=:b.jpg\n')
+        os.utime(self.playlist, (self.mtime, self.mtime))
+        entries, report = loader.load()
+        self.assertFalse(report.from_cache)
+        self.assertEqual(len(entries), 1)
+
+    def test_directory_change_invalidates(self):
+        loader = PlaylistLoader(self.content, self.cache)
+        self._age(self.playlist)
+        self._age(self.content)
+        entries, report = loader.load()
+        self.assertEqual(report.count('missing file'), 1)
+        open(os.path.join(self.content, 'missing.mp4'), 'w').close()
+        self._age(self.content)
+        entries, report = loader.load()
+        self.assertFalse(report.from_cache)
+        self.assertEqual(report.count('missing file'), 0)
+        self.assertEqual(len(entries), 4)
+
+    def test_content_index_generation_invalidates(self):
+        sub = os.path.join(self.content, 'sub')
+        os.mkdir(sub)
+        self._write(PLAYLIST + '6:=:sub/c.mp4\n')
+        self._age(self.playlist)
+        self._age(sub)
+        self._age(self.content)
+        plain = PlaylistLoader(self.content, self.cache + '.plain')
+        indexed = PlaylistLoader(self.content, self.cache, ContentIndex(self.content))
+        for loader in (plain, indexed):
+            entries, report = loader.load()
+            self.assertEqual(report.count('missing file'), 2)
+        # Only the subdirectory changes, the content directory mtime does not.
+        open(os.path.join(sub, 'c.mp4'), 'w').close()
+        self._age(sub)
+        entries, report = plain.load()
+        self.assertTrue(report.from_cache)
+        entries, report = indexed.load()
+        self.assertFalse(report.from_cache)
+        self.assertEqual(report.count('missing file'), 1)
+        self.assertEqual(os.path.basename(entries[-1].path), 'c.mp4')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the prefetcher with a fake decoder, no pygame needed.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import select
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper.prefetch import Prefetcher
+from Adafruit_Video_Looper.surface_cache import SurfaceCache
+
+
+SIZE = (4, 2)
+
+
+class FakeSurface(object):
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_size(self):
+        return SIZE
+
+    def get_bytesize(self):
+        return 4
+
+
+class PrefetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.paths = []
+        for name in ('a.jpg', 'b.mp4', 'c.png'):
+            path = os.path.join(self.root, name)
+            with open(path, 'wb') as outfile:
+                outfile.write(name)
+            self.paths.append(path)
+        self.decoded = []
+        self.prefetcher = None
+
+    def tearDown(self):
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        shutil.rmtree(self.root)
+
+    def _decode(self, path, size):
+        self.decoded.append(path)
+        return FakeSurface(path)
+
+    def _prefetcher(self, cache_bytes):
+        self.cache = SurfaceCache(cache_bytes, self._decode)
+        self.prefetcher = Prefetcher(self.cache, self._decode)
+        return self.prefetcher
+
+    def _collect(self, count, timeout=5.0):
+        """Collect until count images arrived, returns how many did."""
+        collected = 0
+        deadline = time.time() + timeout
+        while collected < count and time.time() < deadline:
+            select.select([self.prefetcher], [], [], 0.05)
+            collected += self.prefetcher.collect()
+        return collected
+
+    def test_images_are_decoded_into_the_cache(self):
+        prefetcher = self._prefetcher(1024)
+        prefetcher.request(self.paths, SIZE)
+        self.assertEqual(self._collect(2), 2)
+        self.assertEqual(sorted(self.decoded), [self.paths[0], self.paths[2]])
+        for path in (self.paths[0], self.paths[2]):
+            self.assertIn(self.cache.key(path, SIZE), self.cache)
+            self.assertEqual(self.cache.get(path, SIZE).path, path)
+        self.assertEqual(self.cache.misses, 0)
+
+    def test_disabled_cache_decodes_nothing(self):
+        prefetcher = self._prefetcher(0)
+        prefetcher.request(self.paths, SIZE)
+        self.assertEqual(self._collect(1, 0.3), 0)
+        self.assertEqual(self.decoded, [])
+        key = self.cache.key(self.paths[0], SIZE)
+        self.assertFalse(prefetcher.is_pending(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
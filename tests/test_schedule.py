@@ -0,0 +1,305 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the schedule index and the play orders built on it, against a
+frozen clock.
+
+Usage: python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper.model import Playlist, PlaylistEntry
+from Adafruit_Video_Looper.schedule import ScheduleIndex, ShuffleBag, WeightedScheduler
+
+
+# Local midnight of the day the tests run on.
+MIDNIGHT = time.mktime((2020, 6, 15, 0, 0, 0, 0, 0, -1))
+
+HOUR = 3600
+
+
+class FakeClock(object):
+    """Clock that only moves when told to."""
+
+    def __init__(self, now=MIDNIGHT):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _entry(name, start=None, end=None, istart=None, iend=None, **kwargs):
+    return PlaylistEntry(name, start, end, istart, iend, **kwargs)
+
+
+class ScheduleIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _index(self, entries):
+        schedule = ScheduleIndex(entries, self.clock)
+        schedule.refresh()
+        return schedule
+
+    def test_unrestricted_entries_are_active(self):
+        schedule = self._index([_entry('a'), _entry('b')])
+        self.assertEqual(schedule.active(), [0, 1])
+        self.assertEqual(schedule.count(), 2)
+        self.assertEqual(schedule.next_boundary(), float('inf'))
+
+    def test_period_boundaries_rebuild(self):
+        schedule = self._index([_entry('a', MIDNIGHT + 100, MIDNIGHT + 200),
+                                _entry('b')])
+        self.assertEqual(schedule.active(), [1])
+        self.assertEqual(schedule.next_boundary(), MIDNIGHT + 100)
+        generation = schedule.generation
+        # No boundary crossed: no rebuild.
+        self.clock.now = MIDNIGHT + 99
+        schedule.refresh()
+        self.assertEqual(schedule.generation, generation)
+        # Start is inclusive, end exclusive.
+        self.clock.now = MIDNIGHT + 100
+        schedule.refresh()
+        self.assertEqual(schedule.generation, generation + 1)
+        self.assertEqual(schedule.active(), [0, 1])
+        self.assertTrue(schedule.is_active(0))
+        self.assertEqual(schedule.next_boundary(), MIDNIGHT + 200)
+        self.clock.now = MIDNIGHT + 200
+        schedule.refresh()
+        self.assertEqual(schedule.active(), [1])
+        self.assertFalse(schedule.is_active(0))
+        self.assertEqual(schedule.next_boundary(), float('inf'))
+
+    def test_clock_going_back_rebuilds(self):
+        schedule = self._index([_entry('a', MIDNIGHT + 100, MIDNIGHT + 200)])
+        self.clock.now = MIDNIGHT + 150
+        schedule.refresh()
+        self.assertEqual(schedule.active(), [0])
+        self.clock.now = MIDNIGHT + 50
+        schedule.refresh()
+        self.assertEqual(schedule.active(), [])
+
+    def test_daily_window(self):
+        schedule = self._index([_entry('a', istart=1 * HOUR, iend=2 * HOUR)])
+        self.assertEqual(schedule.active(), [])
+        self.assertEqual(schedule.next_boundary(), MIDNIGHT + 1 * HOUR)
+        self.clock.now = MIDNIGHT + 1 * HOUR
+        schedule.refresh()
+        self.assertEqual(schedule.active(), [0])
+        self.assertEqual(schedule.next_boundary(), MIDNIGHT + 2 * HOUR)
+        self.clock.now = MIDNIGHT + 2 * HOUR
+        schedule.refresh()
+        self.assertEqual(schedule.active(), [])
+        # Wraps to tomorrow's window.
+        self.assertEqual(schedule.next_boundary(),
+                         time.mktime((2020, 6, 16, 1, 0, 0, 0, 0, -1)))
+
+    def test_period_and_window_combine(self):
+        schedule = self._index([_entry('a', MIDNIGHT, MIDNIGHT + 24 * HOUR,
+                                       1 * HOUR, 2 * HOUR)])
+        self.clock.now = MIDNIGHT + 1.5 * HOUR
+        schedule.refresh()
+        self.assertEqual(schedule.active(), [0])
+        self.clock.now = MIDNIGHT + 25.5 * HOUR
+        schedule.refresh()
+        self.assertEqual(schedule.active(), [])
+
+    def test_overnight_window_is_never_active(self):
+        # Like the original is_on_schedule, istart <= now < iend never holds
+        # when the window wraps past midnight.
+        schedule = self._index([_entry('a', istart=22 * HOUR, iend=2 * HOUR)])
+        for hour in (0, 1, 3, 12, 22, 23):
+            self.clock.now = MIDNIGHT + hour * HOUR
+            schedule.refresh()
+            self.assertEqual(schedule.active(), [], hour)
+
+    def test_next_and_prev_active_wrap(self):
+        schedule = self._index([_entry('a'), _entry('b', MIDNIGHT + 100, MIDNIGHT + 200),
+                                _entry('c'), _entry('d', MIDNIGHT + 100, MIDNIGHT + 200)])
+        self.assertEqual(schedule.next_active(0), (0, False))
+        self.assertEqual(schedule.next_active(1), (2, False))
+        self.assertEqual(schedule.next_active(3), (0, True))
+        self.assertEqual(schedule.next_active(4), (0, True))
+        self.assertEqual(schedule.prev_active(2), 0)
+        self.assertEqual(schedule.prev_active(0), 2)
+
+    def test_nothing_active(self):
+        schedule = self._index([_entry('a', MIDNIGHT + 100, MIDNIGHT + 200)])
+        self.assertIsNone(schedule.next_active(0))
+        self.assertIsNone(schedule.prev_active(0))
+
+
+class SequentialPlaylistTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.entries = [_entry('a'), _entry('b', MIDNIGHT + 100, MIDNIGHT + 200),
+                        _entry('c', istart=0, iend=1 * HOUR), _entry('d')]
+        self.playlist = Playlist(self.entries, False, self.clock)
+
+    def _check_lookahead(self, count=6):
+        upcoming = None
+        for _ in xrange(count):
+            current = self.playlist.get_next()
+            if upcoming is not None:
+                self.assertEqual(current, upcoming[0])
+            upcoming = self.playlist.lookahead(3)
+            self.assertEqual(self.playlist.whats_next(), upcoming[0])
+
+    def test_skips_inactive_positions(self):
+        order = [self.playlist.get_next() for _ in xrange(4)]
+        self.assertEqual(order, ['a', 'c', 'd', 'a'])
+        self.clock.now = MIDNIGHT + 1.5 * HOUR
+        order = [self.playlist.get_next() for _ in xrange(3)]
+        self.assertEqual(order, ['d', 'a', 'd'])
+
+    def test_lookahead_agrees_with_get_next(self):
+        self._check_lookahead()
+        self.clock.now = MIDNIGHT + 150
+        self._check_lookahead()
+        self.clock.now = MIDNIGHT + 2 * HOUR
+        self._check_lookahead()
+
+    def test_only_one_active(self):
+        self.assertFalse(self.playlist.onlyOneActive())
+        playlist = Playlist([_entry('a'), _entry('b', MIDNIGHT + 100, MIDNIGHT + 200)],
+                            False, self.clock)
+        self.assertTrue(playlist.onlyOneActive())
+
+    def test_set_prev_index(self):
+        for _ in xrange(3):
+            self.playlist.get_next()
+        self.assertEqual(self.playlist.set_prev_index(), 'c')
+        self.assertEqual(self.playlist.get_next(), 'c')
+        self.assertEqual(self.playlist.get_next(), 'd')
+
+
+class ShuffleBagTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _schedule(self, entries):
+        schedule = ScheduleIndex(entries, self.clock)
+        schedule.refresh()
+        return schedule
+
+    def test_bags_are_permutations_without_repeats(self):
+        for seed in xrange(50):
+            schedule = self._schedule([_entry(str(x)) for x in xrange(5)])
+            bag = ShuffleBag(random.Random(seed))
+            drawn = []
+            for _ in xrange(5 * 20):
+                index, first = bag.pop(schedule)
+                self.assertEqual(first, len(drawn) % 5 == 0)
+                drawn.append(index)
+            for start in xrange(0, len(drawn), 5):
+                self.assertEqual(sorted(drawn[start:start + 5]), range(5))
+            for previous, current in zip(drawn, drawn[1:]):
+                self.assertNotEqual(previous, current, seed)
+
+    def test_peek_agrees_with_pop(self):
+        schedule = self._schedule([_entry(str(x)) for x in xrange(4)])
+        bag = ShuffleBag(random.Random(1))
+        for _ in xrange(20):
+            upcoming = bag.peek(schedule, 6)
+            self.assertEqual(len(upcoming), 6)
+            self.assertEqual(bag.pop(schedule)[0], upcoming[0])
+
+    def test_drops_positions_that_went_off_schedule(self):
+        schedule = self._schedule([_entry('a'), _entry('b', MIDNIGHT, MIDNIGHT + 100),
+                                   _entry('c')])
+        bag = ShuffleBag(random.Random(2))
+        self.assertEqual(sorted(bag.peek(schedule, 3)), [0, 1, 2])
+        self.clock.now = MIDNIGHT + 100
+        schedule.refresh()
+        drawn = [bag.pop(schedule)[0] for _ in xrange(6)]
+        self.assertNotIn(1, drawn)
+
+    def test_single_and_no_active(self):
+        schedule = self._schedule([_entry('a'), _entry('b', MIDNIGHT + 100, MIDNIGHT + 200)])
+        bag = ShuffleBag(random.Random(3))
+        self.assertEqual([bag.pop(schedule)[0] for _ in xrange(3)], [0, 0, 0])
+        schedule = self._schedule([_entry('b', MIDNIGHT + 100, MIDNIGHT + 200)])
+        self.assertIsNone(ShuffleBag().pop(schedule))
+        self.assertEqual(ShuffleBag().peek(schedule, 2), [])
+
+
+class RandomPlaylistTest(unittest.TestCase):
+
+    def test_lookahead_agrees_with_get_next(self):
+        random.seed(4)
+        clock = FakeClock()
+        playlist = Playlist([_entry(str(x)) for x in xrange(6)], True, clock)
+        self.assertEqual(len(playlist.lookahead(10)), 10)
+        upcoming = playlist.lookahead(10)
+        played = [playlist.get_next() for _ in xrange(10)]
+        self.assertEqual(played, upcoming)
+        self.assertEqual(sorted(played[:6]), sorted(str(x) for x in xrange(6)))
+
+
+class WeightedSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(MIDNIGHT + 10 * HOUR)
+
+    def _pops(self, entries, count):
+        schedule = ScheduleIndex(entries, self.clock)
+        scheduler = WeightedScheduler(entries)
+        return [scheduler.pop(schedule, schedule.refresh()) for _ in xrange(count)]
+
+    def test_plays_in_proportion_to_weights(self):
+        entries = [_entry('a', weight=3.0), _entry('b', weight=1.0),
+                   _entry('c', weight=0.5)]
+        drawn = self._pops(entries, 900)
+        self.assertAlmostEqual(drawn.count(0), 600, delta=2)
+        self.assertAlmostEqual(drawn.count(1), 200, delta=2)
+        self.assertAlmostEqual(drawn.count(2), 100, delta=2)
+        # Interleaved smoothly: every window of 9 picks has the right share.
+        for start in xrange(0, len(drawn) - 9, 9):
+            self.assertAlmostEqual(drawn[start:start + 9].count(0), 6, delta=1)
+
+    def test_hourly_budget_exhaustion(self):
+        entries = [_entry('a'), _entry('b', hourly_budget=2)]
+        schedule = ScheduleIndex(entries, self.clock)
+        scheduler = WeightedScheduler(entries)
+        drawn = [scheduler.pop(schedule, schedule.refresh()) for _ in xrange(10)]
+        self.assertEqual(drawn.count(1), 2)
+        # The budget is per clock hour.
+        self.clock.now += HOUR
+        drawn = [scheduler.pop(schedule, schedule.refresh()) for _ in xrange(10)]
+        self.assertEqual(drawn.count(1), 2)
+
+    def test_exhausted_positions_fill_in(self):
+        drawn = self._pops([_entry('a', hourly_budget=1)], 3)
+        self.assertEqual(drawn, [0, 0, 0])
+
+    def test_honours_the_schedule(self):
+        entries = [_entry('a', weight=5.0, istart=0, iend=1 * HOUR), _entry('b')]
+        self.assertEqual(self._pops(entries, 4), [1, 1, 1, 1])
+        self.assertEqual(self._pops([entries[0]], 1), [None])
+
+
+class WeightedPlaylistTest(unittest.TestCase):
+
+    def test_lookahead_agrees_with_get_next(self):
+        clock = FakeClock(MIDNIGHT + 10 * HOUR)
+        playlist = Playlist([_entry('a', weight=2.0), _entry('b'),
+                             _entry('c', hourly_budget=1)], False, clock,
+                            is_weighted=True)
+        for _ in xrange(3):
+            upcoming = playlist.lookahead(8)
+            self.assertEqual(len(upcoming), 8)
+            self.assertEqual(playlist.whats_next(), upcoming[0])
+            self.assertEqual([playlist.get_next() for _ in xrange(8)], upcoming)
+
+
+if __name__ == '__main__':
+    unittest.main()
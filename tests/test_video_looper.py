@@ -0,0 +1,105 @@
+# Copyright 2019 ITS NEW VISION
+# Author: Paul Bozan
+# License: GNU GPLv2, see LICENSE.txt
+"""Tests of the VideoLooper config defaults, playlist building and reporting,
+run on an instance that was not initialized, with just the attributes they
+use.  Skipped if pygame is not installed.
+
+Usage: python -m unittest discover tests
+"""
+import ConfigParser
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Adafruit_Video_Looper.model import Playlist, PlaylistEntry
+
+try:
+    from Adafruit_Video_Looper.video_looper import (CONFIG_DEFAULTS, VideoLooper,
+                                                    add_config_defaults)
+except ImportError:
+    VideoLooper = None
+
+INI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                        'video_looper.ini')
+
+
+@unittest.skipIf(VideoLooper is None, 'pygame is not installed')
+class ConfigDefaultsTest(unittest.TestCase):
+
+    def test_defaults_match_the_shipped_ini(self):
+        config = ConfigParser.SafeConfigParser()
+        config.read(INI_PATH)
+        for section, option, value in CONFIG_DEFAULTS:
+            self.assertEqual(config.get(section, option), value, option)
+
+    def test_old_config_gets_the_missing_options(self):
+        config = ConfigParser.SafeConfigParser()
+        config.add_section('video_looper')
+        config.set('video_looper', 'stop_timeout', '7')
+        add_config_defaults(config)
+        self.assertEqual(config.getfloat('video_looper', 'stop_timeout'), 7)
+        self.assertEqual(config.getint('video_looper', 'prefetch_count'), 3)
+        self.assertFalse(config.getboolean('conditioner', 'enabled'))
+        self.assertTrue(config.getboolean('omxplayer', 'dbus'))
+
+
+class BrokenLoader(object):
+    """Playlist loader failing like a bad row or an I/O error would."""
+
+    def load(self):
+        raise OverflowError('mktime argument out of range')
+
+
+@unittest.skipIf(VideoLooper is None, 'pygame is not installed')
+class PlaylistLoadingTest(unittest.TestCase):
+
+    def setUp(self):
+        looper = VideoLooper.__new__(VideoLooper)
+        looper._preload = None
+        looper._playlist_loader = BrokenLoader()
+        looper._is_random = False
+        looper._is_weighted = False
+        looper._content_path = '/nonexistent'
+        looper._sound_vol_file = 'sound_volume'
+        looper.indexed = []
+        looper._index_media = looper.indexed.append
+        looper.printed = []
+        looper._print = looper.printed.append
+        self.looper = looper
+
+    def test_failed_build_gives_an_empty_playlist(self):
+        playlist = self.looper._buildPlaylist()
+        self.assertEqual(playlist.length(), 0)
+        self.assertIn('mktime argument out of range', self.looper.printed[-1])
+
+    def test_failed_reload_keeps_the_playlist(self):
+        playlist = Playlist([PlaylistEntry('/content/a.mp4')], False)
+        self.looper._reload_playlist(playlist)
+        self.assertFalse(playlist.has_pending())
+        self.assertEqual(self.looper.indexed, [])
+        self.assertIn('mktime argument out of range', self.looper.printed[-1])
+
+
+class FakeTimeline(object):
+
+    def report_once(self, mark):
+        return 'Startup: ' + mark
+
+
+@unittest.skipIf(VideoLooper is None, 'pygame is not installed')
+class StartupReportTest(unittest.TestCase):
+
+    def test_report_goes_through_print(self):
+        looper = VideoLooper.__new__(VideoLooper)
+        looper._startup = FakeTimeline()
+        looper.printed = []
+        looper._print = looper.printed.append
+        looper._report_startup()
+        self.assertEqual(looper.printed, ['Startup: first frame'])
+
+
+if __name__ == '__main__':
+    unittest.main()